@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Optional
+
+import aiosqlite
+
+from app.db import connect
+
+# Persistent cache tier is optional: it is only enabled when a path is configured.
+CACHE_DB_PATH = os.getenv("LEARNING_ASSISTANT_CACHE_DB", "")
+
+
+class SqliteCacheTier:
+    """
+    Key/value cache tier persisted in SQLite so warm entries survive restarts.
+
+    Values are stored as JSON text alongside their expiry time (wall clock).
+    Expired rows are ignored on read and pruned, through an index on the
+    expiry time, at most every ``prune_interval`` seconds of writes. Each tier
+    keeps one connection open from ``init`` until ``close``.
+    """
+
+    def __init__(self, path: str, table: str, ttl_seconds: float, prune_interval: float = 60.0):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._db: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        self._next_prune = 0.0
+
+    async def init(self) -> None:
+        await self._connection()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._db is not None:
+            return self._db
+        async with self._open_lock:
+            if self._db is None:
+                db = await connect(self.path)
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                    """
+                )
+                await db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_expires_at "
+                    f"ON {self.table} (expires_at)"
+                )
+                await db.commit()
+                self._db = db
+        return self._db
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        db = await self._connection()
+        row = await (
+            await db.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            )
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    async def items(self) -> list[tuple[str, Any]]:
+        """All unexpired entries, oldest first."""
+        db = await self._connection()
+        rows = await (
+            await db.execute(
+                f"SELECT key, value FROM {self.table} WHERE expires_at > ? ORDER BY expires_at",
+                (time.time(),),
+            )
+        ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    async def set(self, key: str, value: Any) -> None:
+        db = await self._connection()
+        now = time.time()
+        await db.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl_seconds),
+        )
+        if now >= self._next_prune:
+            await db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self._next_prune = now + self.prune_interval
+        await db.commit()
+
+
+def get_cache_tier(table: str, ttl_seconds: float) -> Optional[SqliteCacheTier]:
+    if not CACHE_DB_PATH:
+        return None
+    return SqliteCacheTier(CACHE_DB_PATH, table, ttl_seconds)
@@ -1,31 +1,171 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 import aiosqlite
 
+from app.migrations import migrate
+
 DB_PATH = os.getenv("LEARNING_ASSISTANT_DB", "app/learning_assistant.db")
+DB_READERS = int(os.getenv("LEARNING_ASSISTANT_DB_READERS", "4"))
+
+# Applied to every pooled connection. WAL lets readers proceed while the
+# writer commits, and synchronous=NORMAL is durable in WAL mode except for the
+# last transactions on power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+# sqlite3 keeps a per-connection cache of prepared statements keyed by SQL
+# text; long-lived connections are what make that cache pay off.
+STATEMENT_CACHE_SIZE = 256
+
+
+async def create_schema(db: aiosqlite.Connection) -> None:
+    await migrate(db)
 
 
 async def init_db() -> None:
     async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS quiz_attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                created_at TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                year_group INTEGER NOT NULL,
-                topic TEXT,
-                score INTEGER NOT NULL,
-                total_questions INTEGER NOT NULL
-            )
-            """
-        )
-        await db.commit()
+        # journal_mode is persistent, so setting it once here covers every connection.
+        await db.execute("PRAGMA journal_mode=WAL")
+        await create_schema(db)
 
 
-async def get_db():
-    db = await aiosqlite.connect(DB_PATH)
+async def connect(path: str, read_only: bool = False) -> aiosqlite.Connection:
+    db = await aiosqlite.connect(path, cached_statements=STATEMENT_CACHE_SIZE)
     db.row_factory = aiosqlite.Row
-    try:
+    for pragma in CONNECTION_PRAGMAS:
+        await db.execute(pragma)
+    if read_only:
+        await db.execute("PRAGMA query_only=ON")
+    return db
+
+
+async def executemany_returning_ids(
+    db: aiosqlite.Connection, sql: str, rows: list[tuple]
+) -> list[int]:
+    """
+    Run a multi-row INSERT and return the new row ids in order, without committing.
+
+    executemany does not report row ids. On the (exclusive) writer connection
+    and an AUTOINCREMENT table, one statement's rows get consecutive ids
+    ending at last_insert_rowid().
+    """
+    await db.executemany(sql, rows)
+    (last_id,) = await (await db.execute("SELECT last_insert_rowid()")).fetchone()
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+class DatabasePool:
+    """
+    Long-lived SQLite connections for the app's lifetime: one writer and N readers.
+
+    SQLite allows a single writer at a time, so the writer connection is
+    handed to one request at a time. Readers are handed out from a queue and
+    run concurrently with the writer thanks to WAL.
+    """
+
+    def __init__(self, path: str, readers: int = DB_READERS):
+        self.path = path
+        self.size = max(1, readers)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: list[aiosqlite.Connection] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self) -> None:
+        if self.is_open:
+            return
+        self._writer = await connect(self.path)
+        for _ in range(self.size):
+            reader = await connect(self.path, read_only=True)
+            self._all_readers.append(reader)
+            self._readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        for db in [self._writer, *self._all_readers]:
+            if db is not None:
+                await db.close()
+        self._writer = None
+        self._all_readers = []
+        self._readers = asyncio.Queue()
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._writer_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                # Never leave a half-finished transaction for the next request.
+                await self._writer.rollback()
+                raise
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def dedicated_reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        A read-only connection of its own, for long scans such as exports that
+        would otherwise keep a pooled reader from other requests.
+        """
+        db = await connect(self.path, read_only=True)
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+pool = DatabasePool(DB_PATH)
+
+
+async def open_pool() -> None:
+    await pool.open()
+
+
+async def close_pool() -> None:
+    await pool.close()
+
+
+async def get_db():
+    """Writer connection; use for requests that modify data."""
+    async with pool.writer() as db:
         yield db
-    finally:
-        await db.close()
+
+
+async def get_writer():
+    """
+    The writer checkout itself, for requests that write in several short
+    transactions (e.g. bulk uploads) and should not hold the writer between them.
+    """
+    yield pool.writer
+
+
+async def get_read_db():
+    """Pooled read-only connection; use for requests that only read."""
+    async with pool.reader() as db:
+        yield db
+
+
+async def get_reader():
+    """The reader checkout itself, for requests that may not need the database at all."""
+    yield pool.reader
+
+
+async def get_dedicated_reader():
+    """Opens a connection outside the pool, for long streaming reads."""
+    yield pool.dedicated_reader
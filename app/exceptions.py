@@ -15,3 +15,17 @@ class ConfigurationError(Exception):
         self.message = message
         self.status_code = status_code
         super().__init__(message)
+
+class RateLimitError(Exception):
+    def __init__(self, message: str, retry_after: int = 1, status_code: int = 429):
+        self.message = message
+        self.retry_after = retry_after
+        self.status_code = status_code
+        super().__init__(message)
+
+class UpstreamUnavailableError(Exception):
+    def __init__(self, message: str, retry_after: int = 1, status_code: int = 503):
+        self.message = message
+        self.retry_after = retry_after
+        self.status_code = status_code
+        super().__init__(message)
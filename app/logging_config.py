@@ -0,0 +1,72 @@
+"""
+Structured logging for the app.
+
+Modules log through ``logging.getLogger(__name__)`` and pass fields with
+``extra``:
+
+    logger.warning("quiz generation failed", extra={"model": QUIZ_MODEL, "error": str(e)})
+
+LOG_FORMAT selects the output: ``json`` (default) writes one JSON object per
+line with the timestamp, level, logger, message and those fields; ``text``
+writes ``key=value`` pairs for reading in a terminal. LOG_LEVEL sets the
+level (default INFO).
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        pairs = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        line = " ".join(f"{k}={json.dumps(v, default=str)}" for k, v in pairs.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_handler = None
+
+
+def configure_logging(fmt: str = LOG_FORMAT, level: str = LOG_LEVEL) -> None:
+    """Install the formatter on the root logger. Safe to call more than once."""
+    global _handler
+    root = logging.getLogger()
+    if _handler is None:
+        _handler = logging.StreamHandler(sys.stderr)
+        root.addHandler(_handler)
+    _handler.setFormatter(KeyValueFormatter() if fmt == "text" else JsonFormatter())
+    root.setLevel(level)
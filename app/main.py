@@ -1,19 +1,54 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import lesson, quiz, default, scores
-from app.db import init_db
+from fastapi.responses import JSONResponse
+from app.routers import lesson, quiz, default, scores, daily_page, metrics
+from app.db import init_db, open_pool, close_pool, pool
+from app.write_buffer import start_score_buffer, stop_score_buffer
+from app.exceptions import LessonGenerationError, RateLimitError, UpstreamUnavailableError
+from app.logging_config import configure_logging
+from app.metrics import MetricsMiddleware
+from services.lesson_service import close_cache_stores, init_cache_stores
 from contextlib import asynccontextmanager
 
 
+async def retry_after_handler(
+    request: Request, exc: RateLimitError | UpstreamUnavailableError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.message},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def lesson_generation_handler(
+    request: Request, exc: LessonGenerationError
+) -> JSONResponse:
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.message})
+
+
 def create_app() -> FastAPI:
+    configure_logging()
+
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         # Startup logic
         await init_db()
+        await open_pool()
+        await init_cache_stores()
+        start_score_buffer(pool.writer)
         yield
+        # Shutdown logic: flush queued score writes before the writer closes.
+        await stop_score_buffer()
+        await close_pool()
+        await close_cache_stores()
 
     app = FastAPI(lifespan=lifespan, title="Learning Assistant API", version="0.1.0")
 
+    app.add_exception_handler(RateLimitError, retry_after_handler)
+    app.add_exception_handler(UpstreamUnavailableError, retry_after_handler)
+    app.add_exception_handler(LessonGenerationError, lesson_generation_handler)
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
@@ -21,11 +56,15 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Added last so it is outermost and times the whole request.
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(default.router)
     app.include_router(lesson.router)
     app.include_router(quiz.router)
+    app.include_router(daily_page.router)
     app.include_router(scores.router)
+    app.include_router(metrics.router)
     return app
 
 
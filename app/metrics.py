@@ -0,0 +1,348 @@
+"""
+In-process counters and latency histograms, served by GET /metrics in the
+Prometheus text exposition format.
+
+Metrics are module-level objects, like the other stats in this app, so any
+module can import one and record into it. They cover one process: run a
+single worker or scrape each worker separately.
+
+What is recorded:
+
+- ``http_request_duration_seconds``: per route template, method and status.
+- ``llm_upstream_duration_seconds``: each provider call (every retry
+  attempt), per endpoint, model and outcome. For the streamed lesson this is
+  the time to open the stream; the rest is the ``stream`` stage.
+- ``llm_tokens_total``: prompt, output and cached (served from a context
+  cache, included in prompt) tokens reported by the upstream, per endpoint
+  and model.
+- ``llm_context_cache_total``: context cache lookups for the static system
+  prompts by result (see llm_core/context_cache.py).
+- ``llm_prompt_tokens_estimated`` and ``llm_prompt_tokens_saved_total``:
+  estimated prompt size per endpoint, and the tokens removed by condensing
+  prompts to their budget (see llm_core/prompt_budget.py).
+- ``stage_duration_seconds``: the steps around the upstream call, per
+  endpoint: waiting for the rate limiter, JSON parsing, Pydantic validation,
+  and cache lookups and stores.
+- ``llm_json_responses_total`` and ``llm_json_repairs_total``: whether
+  structured responses parsed cleanly, were repaired, or needed a correction
+  call, and which repairs were applied (see llm_core/json_repair.py).
+- ``cache_lookups_total``: lesson and quiz cache lookups by result.
+- ``db_operation_duration_seconds``: score database operations.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Seconds; spans in-memory cache hits up to slow image generations.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: tuple[tuple[str, str], ...]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[dict, float]]:
+        with self._lock:
+            return [(dict(key), v) for key, v in sorted(self._values.items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(key)} {_number(v)}" for key, v in items)
+        return lines
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, _Series] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series.counts[i] += 1
+                    break
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the time spent in the block, including when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(
+                (key, list(s.counts), s.sum, s.count) for key, s in self._series.items()
+            )
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = key + (("le", _number(bound)),)
+                lines.append(f"{self.name}_bucket{_labels(le)} {cumulative}")
+            lines.append(f'{self.name}_bucket{_labels(key + (("le", "+Inf"),))} {count}')
+            lines.append(f"{self.name}_sum{_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to the end of the response, per route template.",
+        ("method", "route", "status"),
+    )
+)
+LLM_UPSTREAM_SECONDS = registry.register(
+    Histogram(
+        "llm_upstream_duration_seconds",
+        "Provider call latency, per attempt.",
+        ("endpoint", "model", "outcome"),
+    )
+)
+LLM_TOKENS = registry.register(
+    Counter(
+        "llm_tokens_total",
+        "Tokens reported by the upstream in usage metadata.",
+        ("endpoint", "model", "kind"),
+    )
+)
+LLM_PROMPT_TOKENS = registry.register(
+    Histogram(
+        "llm_prompt_tokens_estimated",
+        "Estimated prompt tokens per upstream call, after condensation.",
+        ("endpoint",),
+        buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+    )
+)
+LLM_PROMPT_TOKENS_SAVED = registry.register(
+    Counter(
+        "llm_prompt_tokens_saved_total",
+        "Estimated prompt tokens removed by condensing prompts to their budget.",
+        ("endpoint",),
+    )
+)
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "stage_duration_seconds",
+        "Time spent in a processing stage of a generation endpoint.",
+        ("endpoint", "stage"),
+    )
+)
+CONTEXT_CACHE_LOOKUPS = registry.register(
+    Counter(
+        "llm_context_cache_total",
+        "Upstream context cache lookups by result.",
+        ("result",),
+    )
+)
+LLM_JSON_RESPONSES = registry.register(
+    Counter(
+        "llm_json_responses_total",
+        "Structured responses by outcome: clean, repaired, regenerated or failed.",
+        ("endpoint", "outcome"),
+    )
+)
+LLM_JSON_REPAIRS = registry.register(
+    Counter(
+        "llm_json_repairs_total",
+        "Repairs applied to structured responses, by kind.",
+        ("endpoint", "repair"),
+    )
+)
+CACHE_LOOKUPS = registry.register(
+    Counter(
+        "cache_lookups_total",
+        "Lesson and quiz cache lookups by result (memory, store or miss).",
+        ("cache", "result"),
+    )
+)
+DB_OPERATION_SECONDS = registry.register(
+    Histogram(
+        "db_operation_duration_seconds",
+        "Score database operations, including waiting for a pooled connection.",
+        ("operation",),
+    )
+)
+
+
+def stage(endpoint: str, name: str):
+    """``with stage("quiz", "validate"): ...`` times one step of an endpoint."""
+    return STAGE_SECONDS.time(endpoint=endpoint, stage=name)
+
+
+def db_operation(name: str):
+    return DB_OPERATION_SECONDS.time(operation=name)
+
+
+def record_usage(endpoint: str, model: str, usage) -> None:
+    """Add a response's ``usage_metadata`` to the token counters."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_token_count", None)
+    output = getattr(usage, "candidates_token_count", None)
+    cached = getattr(usage, "cached_content_token_count", None)
+    if isinstance(prompt, int) and prompt:
+        LLM_TOKENS.inc(prompt, endpoint=endpoint, model=model, kind="prompt")
+    if isinstance(output, int) and output:
+        LLM_TOKENS.inc(output, endpoint=endpoint, model=model, kind="output")
+    if isinstance(cached, int) and cached:
+        LLM_TOKENS.inc(cached, endpoint=endpoint, model=model, kind="cached")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request. The route label is the
+    matched path template (``/v1/image/{digest}``), so it stays bounded;
+    requests that match no route are grouped under ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
@@ -0,0 +1,60 @@
+"""
+Versioned schema migrations, tracked with SQLite's ``PRAGMA user_version``.
+
+Each migration runs once, in order, and the version is bumped after it
+succeeds. Migrations use IF NOT EXISTS so databases created before
+versioning was introduced (user_version 0 with tables already present)
+upgrade cleanly. Append new migrations; never edit or reorder old ones.
+"""
+
+import aiosqlite
+
+from app.rollups import create_daily_rollup, create_rollups
+
+
+async def _base_schema(db: aiosqlite.Connection) -> None:
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quiz_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            year_group INTEGER NOT NULL,
+            topic TEXT,
+            score INTEGER NOT NULL,
+            total_questions INTEGER NOT NULL
+        )
+        """
+    )
+    await create_rollups(db)
+
+
+async def _attempt_indexes(db: aiosqlite.Connection) -> None:
+    # Every index ends in created_at (and implicitly the rowid id), so a filter
+    # on its leading columns also yields rows already in keyset order.
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_attempts_created ON quiz_attempts (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_subject_created ON quiz_attempts (subject, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_year_created ON quiz_attempts (year_group, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_subject_year_created "
+        "ON quiz_attempts (subject, year_group, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_attempts_topic_created ON quiz_attempts (topic, created_at)",
+    ):
+        await db.execute(statement)
+
+
+MIGRATIONS = [
+    _base_schema,
+    _attempt_indexes,
+    create_daily_rollup,
+]
+
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply pending migrations and return the resulting schema version."""
+    (version,) = await (await db.execute("PRAGMA user_version")).fetchone()
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        await migration(db)
+        await db.execute(f"PRAGMA user_version = {number}")
+        await db.commit()
+    return max(version, len(MIGRATIONS))
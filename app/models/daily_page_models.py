@@ -0,0 +1,34 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from app.models.lesson_models import LessonResponse
+from app.models.quiz_models import GeneratedQuiz, QuizQuestion
+
+
+class DailyPageRequest(BaseModel):
+    year_group: int = Field(..., ge=1, le=13)
+    subject: str = Field(..., examples=["Maths"])
+    topic_idea: Optional[str] = ""
+    # Start rendering the visual_prompt image in the background and return its URL
+    generate_image: bool = False
+
+
+class GeneratedDailyPage(BaseModel):
+    """Schema for one structured-output call producing the lesson and its quiz."""
+
+    # Field descriptions help the LLM understand what to generate
+    title: str = Field(description="A short, engaging lesson title.")
+    lesson_text: str = Field(description="The full lesson content.")
+    visual_prompt: str = Field(
+        description="A concise text-to-image prompt for the lesson (max 50 words)."
+    )
+    quiz_questions: List[QuizQuestion] = Field(
+        description="A list of 3 quiz questions based ONLY on the lesson_text."
+    )
+
+
+class DailyPageResponse(BaseModel):
+    lesson: LessonResponse
+    quiz: GeneratedQuiz
+    image_digest: Optional[str] = None
+    image_url: Optional[str] = None
@@ -8,6 +8,14 @@ class LessonRequest(BaseModel):
     topic_idea: Optional[str] = ""
 
 
+class GeneratedLesson(BaseModel):
+    """Schema the lesson JSON returned by the model is validated against."""
+
+    title: str
+    lesson_text: str
+    visual_prompt: str
+
+
 class LessonResponse(BaseModel):
     title: str
     lesson_text: str
@@ -18,7 +26,11 @@ class LessonResponse(BaseModel):
 
 class ImageRequest(BaseModel):
     prompt: str
+    # Set to False to get only the digest/URL and fetch bytes from GET /v1/image/{digest}
+    include_base64: bool = True
 
 
 class ImageResponse(BaseModel):
     image_base64: Optional[str] = None
+    digest: Optional[str] = None
+    url: Optional[str] = None
@@ -16,7 +16,9 @@ class QuizQuestion(BaseModel):
     # Field descriptions help the LLM understand what to generate
     question: str = Field(description="The multiple-choice question text.")
     options: List[str] = Field(
-        description="A list of 4 possible answer choices (A, B, C, D)."
+        description="A list of 4 possible answer choices (A, B, C, D).",
+        min_length=4,
+        max_length=4,
     )
     correct_key: AnswerKey = Field(
         description="The key representing the correct answer (must be 'A', 'B', 'C', or 'D')."
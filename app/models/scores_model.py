@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 
 class ScoreCreate(BaseModel):
@@ -14,6 +14,11 @@ class ScoreCreated(BaseModel):
     id: int
 
 
+class ScoresBulkCreated(BaseModel):
+    # In the same order as the uploaded items.
+    ids: list[int]
+
+
 class SubjectSummary(BaseModel):
     subject: str
     attempts: int
@@ -26,3 +31,36 @@ class ScoreSummary(BaseModel):
     total_attempts: int
     overall_avg_accuracy: float
     by_subject: list[SubjectSummary]
+
+
+class Attempt(BaseModel):
+    id: int
+    created_at: str
+    subject: str
+    year_group: int
+    topic: Optional[str] = None
+    score: int
+    total_questions: int
+
+
+class AttemptPage(BaseModel):
+    items: list[Attempt]
+    # Pass back as ?cursor= to fetch the next (older) page; None on the last page.
+    next_cursor: Optional[str] = None
+
+
+class TrendPoint(BaseModel):
+    # First day (UTC) of the bucket, YYYY-MM-DD.
+    period_start: str
+    attempts: int
+    avg_accuracy: float
+
+
+class SubjectTrend(BaseModel):
+    subject: str
+    points: list[TrendPoint]
+
+
+class ScoreTrend(BaseModel):
+    bucket: Literal["day", "week"]
+    series: list[SubjectTrend]
@@ -0,0 +1,171 @@
+"""
+Rollups of quiz attempts, so reports read pre-aggregated rows instead of
+scanning every attempt:
+
+- subject_rollup: one row per subject, for /scores/summary.
+- daily_rollup: one row per (UTC day, subject, year group), for /scores/trend.
+
+Both are maintained by triggers on quiz_attempts, so they are updated in the
+same transaction as every insert, whichever code path performs it. Existing
+databases are backfilled when a rollup is first created; to rebuild them from
+the raw history at any time, run:
+
+    python -m app.rollups rebuild
+"""
+
+import asyncio
+import sys
+
+import aiosqlite
+
+SUBJECT_ROLLUP_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS subject_rollup (
+        subject TEXT PRIMARY KEY,
+        attempts INTEGER NOT NULL,
+        sum_accuracy REAL NOT NULL,
+        best_accuracy REAL NOT NULL,
+        worst_accuracy REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quiz_attempts_subject_rollup
+    AFTER INSERT ON quiz_attempts
+    BEGIN
+        INSERT INTO subject_rollup (subject, attempts, sum_accuracy, best_accuracy, worst_accuracy)
+        VALUES (
+            NEW.subject,
+            1,
+            1.0 * NEW.score / NEW.total_questions,
+            1.0 * NEW.score / NEW.total_questions,
+            1.0 * NEW.score / NEW.total_questions
+        )
+        ON CONFLICT(subject) DO UPDATE SET
+            attempts = attempts + 1,
+            sum_accuracy = sum_accuracy + excluded.sum_accuracy,
+            best_accuracy = MAX(best_accuracy, excluded.best_accuracy),
+            worst_accuracy = MIN(worst_accuracy, excluded.worst_accuracy);
+    END
+    """,
+)
+
+REBUILD_SUBJECT_ROLLUP_SQL = """
+    INSERT INTO subject_rollup (subject, attempts, sum_accuracy, best_accuracy, worst_accuracy)
+    SELECT
+        subject,
+        COUNT(*),
+        SUM(1.0 * score / total_questions),
+        MAX(1.0 * score / total_questions),
+        MIN(1.0 * score / total_questions)
+    FROM quiz_attempts
+    GROUP BY subject
+"""
+
+
+# created_at is a UTC ISO-8601 string, so its first ten characters are the
+# UTC calendar day; no date parsing is needed on insert or when bucketing.
+DAILY_ROLLUP_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        day TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        year_group INTEGER NOT NULL,
+        attempts INTEGER NOT NULL,
+        sum_accuracy REAL NOT NULL,
+        PRIMARY KEY (day, subject, year_group)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_daily_rollup_subject_year_day
+    ON daily_rollup (subject, year_group, day)
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quiz_attempts_daily_rollup
+    AFTER INSERT ON quiz_attempts
+    BEGIN
+        INSERT INTO daily_rollup (day, subject, year_group, attempts, sum_accuracy)
+        VALUES (
+            substr(NEW.created_at, 1, 10),
+            NEW.subject,
+            NEW.year_group,
+            1,
+            1.0 * NEW.score / NEW.total_questions
+        )
+        ON CONFLICT(day, subject, year_group) DO UPDATE SET
+            attempts = attempts + 1,
+            sum_accuracy = sum_accuracy + excluded.sum_accuracy;
+    END
+    """,
+)
+
+REBUILD_DAILY_ROLLUP_SQL = """
+    INSERT INTO daily_rollup (day, subject, year_group, attempts, sum_accuracy)
+    SELECT
+        substr(created_at, 1, 10),
+        subject,
+        year_group,
+        COUNT(*),
+        SUM(1.0 * score / total_questions)
+    FROM quiz_attempts
+    GROUP BY 1, 2, 3
+"""
+
+
+async def create_rollups(db: aiosqlite.Connection) -> None:
+    created = not await _table_exists(db, "subject_rollup")
+    for statement in SUBJECT_ROLLUP_SCHEMA:
+        await db.execute(statement)
+    if created:
+        # First run against an existing database: backfill from history.
+        await rebuild_rollups(db, commit=False)
+
+
+async def create_daily_rollup(db: aiosqlite.Connection) -> None:
+    for statement in DAILY_ROLLUP_SCHEMA:
+        await db.execute(statement)
+    # Backfill from the existing history.
+    await rebuild_daily_rollup(db, commit=False)
+
+
+async def rebuild_daily_rollup(db: aiosqlite.Connection, commit: bool = True) -> None:
+    await db.execute("DELETE FROM daily_rollup")
+    await db.execute(REBUILD_DAILY_ROLLUP_SQL)
+    if commit:
+        await db.commit()
+
+
+async def rebuild_rollups(db: aiosqlite.Connection, commit: bool = True) -> None:
+    """Recompute the rollups from quiz_attempts in a single transaction."""
+    await db.execute("DELETE FROM subject_rollup")
+    await db.execute(REBUILD_SUBJECT_ROLLUP_SQL)
+    if await _table_exists(db, "daily_rollup"):
+        await rebuild_daily_rollup(db, commit=False)
+    if commit:
+        await db.commit()
+
+
+async def _table_exists(db: aiosqlite.Connection, name: str) -> bool:
+    (exists,) = await (
+        await db.execute(
+            "SELECT COUNT(*) > 0 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        )
+    ).fetchone()
+    return bool(exists)
+
+
+async def _rebuild(path: str) -> None:
+    async with aiosqlite.connect(path) as db:
+        await rebuild_rollups(db)
+        (subjects,) = await (await db.execute("SELECT COUNT(*) FROM subject_rollup")).fetchone()
+        (days,) = await (await db.execute("SELECT COUNT(DISTINCT day) FROM daily_rollup")).fetchone()
+    print(f"Rebuilt rollups for {subjects} subjects over {days} days in {path}")
+
+
+if __name__ == "__main__":
+    from app.db import DB_PATH, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m app.rollups rebuild")
+        raise SystemExit(2)
+    asyncio.run(init_db())
+    asyncio.run(_rebuild(DB_PATH))
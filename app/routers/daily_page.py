@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from app.models.daily_page_models import DailyPageRequest, DailyPageResponse
+from app.models.lesson_models import LessonResponse
+from services.lesson_service import get_daily_page
+from services.image_service import image_url, start_image
+from app.exceptions import LessonGenerationError
+
+router = APIRouter(prefix="/v1", tags=["Daily Page"])
+
+
+@router.post("/daily-page", response_model=DailyPageResponse)
+async def daily_page(req: DailyPageRequest):
+    try:
+        lesson, quiz = await get_daily_page(
+            year_group=req.year_group,
+            subject=req.subject,
+            topic_idea=req.topic_idea or "",
+        )
+    except LessonGenerationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    response = DailyPageResponse(
+        lesson=LessonResponse(
+            **lesson,
+            year_group=req.year_group,
+            subject=req.subject,
+        ),
+        quiz=quiz,
+    )
+
+    if req.generate_image and lesson.get("visual_prompt", "").strip():
+        # The image renders in the background; GET image_url waits for it.
+        digest = await start_image(lesson["visual_prompt"].strip())
+        response.image_digest = digest
+        response.image_url = image_url(digest)
+
+    return response
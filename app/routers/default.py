@@ -1,4 +1,10 @@
 from fastapi import APIRouter
+from services.lesson_service import get_cache_stats
+from llm_core.generation_service import get_json_repair_stats, get_single_flight_stats
+from llm_core.context_cache import get_context_cache_stats
+from llm_core.providers import get_provider_stats
+from llm_core.rate_limiter import get_limiter_stats
+from llm_core.resilience import get_resilience_stats
 
 router = APIRouter(prefix="/v1", tags=["Default"])
 
@@ -6,3 +12,20 @@ router = APIRouter(prefix="/v1", tags=["Default"])
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    return get_cache_stats()
+
+
+@router.get("/generation/stats")
+def generation_stats():
+    return {
+        "provider": get_provider_stats(),
+        "single_flight": get_single_flight_stats(),
+        "rate_limits": get_limiter_stats(),
+        "resilience": get_resilience_stats(),
+        "json": get_json_repair_stats(),
+        "context_cache": get_context_cache_stats(),
+    }
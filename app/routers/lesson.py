@@ -1,20 +1,37 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import ValidationError
 from app.models.lesson_models import (
     LessonRequest,
     LessonResponse,
     ImageRequest,
     ImageResponse,
 )
-from services.lesson_service import get_lesson
-from llm_core.generation_service import generate_image_from_prompt
-from app.exceptions import ImageGenerationError
+from services.lesson_service import get_lesson, stream_lesson
+from services.image_service import (
+    get_image,
+    image_url,
+    read_image_base64,
+    wait_for_image,
+)
+from services.image_store import is_valid_digest
+from app.exceptions import (
+    ImageGenerationError,
+    LessonGenerationError,
+    RateLimitError,
+    UpstreamUnavailableError,
+)
 
 router = APIRouter(prefix="/v1", tags=["Lesson"])
 
+# Stored images are content-addressed, so a digest's bytes never change.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 
 @router.post("/lesson")
-def lesson(req: LessonRequest) -> LessonResponse:
-    lesson_response = get_lesson(
+async def lesson(req: LessonRequest) -> LessonResponse:
+    lesson_response = await get_lesson(
         year_group=req.year_group,
         subject=req.subject,
         topic_idea=req.topic_idea or "",
@@ -29,12 +46,81 @@ def lesson(req: LessonRequest) -> LessonResponse:
     )
 
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/lesson/stream")
+async def lesson_stream(req: LessonRequest) -> StreamingResponse:
+    """
+    Server-sent events variant of /lesson. Emits ``title`` and ``lesson_text``
+    events with ``{"delta": ...}`` as the text is generated, then a ``lesson``
+    event with the validated LessonResponse, or an ``error`` event.
+    """
+
+    async def events():
+        try:
+            async for event, data in stream_lesson(
+                year_group=req.year_group,
+                subject=req.subject,
+                topic_idea=req.topic_idea or "",
+            ):
+                if event == "lesson":
+                    lesson_response = LessonResponse(
+                        title=data.get("title"),
+                        lesson_text=data.get("lesson_text"),
+                        visual_prompt=data.get("visual_prompt"),
+                        year_group=req.year_group,
+                        subject=req.subject,
+                    )
+                    yield _sse_event(event, lesson_response.model_dump())
+                else:
+                    yield _sse_event(event, {"delta": data})
+        except LessonGenerationError as e:
+            yield _sse_event("error", {"status_code": e.status_code, "detail": e.message})
+        except (RateLimitError, UpstreamUnavailableError) as e:
+            yield _sse_event(
+                "error",
+                {"status_code": e.status_code, "detail": e.message, "retry_after": e.retry_after},
+            )
+        except (ValueError, ValidationError) as e:
+            yield _sse_event("error", {"status_code": 502, "detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/image")
-def create_image(req: ImageRequest):
+async def create_image(req: ImageRequest):
     if not req.prompt.strip():
         raise HTTPException(status_code=400, detail="Prompt is required.")
     try:
-        img_b64 = generate_image_from_prompt(req.prompt.strip())
-        return ImageResponse(image_base64=img_b64)
+        stored = await get_image(req.prompt.strip())
     except ImageGenerationError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    return ImageResponse(
+        image_base64=await read_image_base64(stored) if req.include_base64 else None,
+        digest=stored.digest,
+        url=image_url(stored.digest),
+    )
+
+
+@router.get("/image/{digest}")
+async def read_image(digest: str, request: Request):
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    headers = {"ETag": f'"{digest}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+    # The digest is the ETag, so a matching client copy needs no disk access.
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    stored = await wait_for_image(digest)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    return FileResponse(stored.path, media_type=stored.content_type, headers=headers)
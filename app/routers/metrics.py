@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["Default"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint; see app/metrics.py for what is recorded."""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -7,8 +7,8 @@ router = APIRouter(prefix="/v1", tags=["Quiz"])
 
 
 @router.post("/quiz", response_model=GeneratedQuiz)
-def quiz(req: QuizRequest):
-    quiz_obj = get_quiz(
+async def quiz(req: QuizRequest):
+    quiz_obj = await get_quiz(
         lesson_text=req.lesson_text,
         year_group=req.year_group,
     )
@@ -1,74 +1,212 @@
-from datetime import datetime, timezone
-from fastapi import APIRouter, Depends
+import os
+from datetime import date, datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 import aiosqlite
 
-from app.db import get_db
+from app.db import (
+    executemany_returning_ids,
+    get_dedicated_reader,
+    get_read_db,
+    get_reader,
+    get_writer,
+)
+from app.metrics import db_operation
+from app.score_ingest import BulkFormatError, is_ndjson, iter_json_array, iter_ndjson
+from app.score_cache import summary_cache
+from app.score_export import MEDIA_TYPES, ExportFormat, export_attempts
+from app.write_buffer import score_buffer
+from app.score_queries import (
+    INSERT_ATTEMPT_SQL,
+    AttemptFilters,
+    TrendBucket,
+    attempts_page_query,
+    encode_cursor,
+    filtered_summary_query,
+    to_created_at,
+    trend_query,
+)
 from app.models.scores_model import (
+    Attempt,
+    AttemptPage,
     ScoreCreate,
     ScoreCreated,
+    ScoresBulkCreated,
     ScoreSummary,
+    ScoreTrend,
     SubjectSummary,
+    SubjectTrend,
+    TrendPoint,
 )
 
 router = APIRouter(prefix="/scores", tags=["Scores"])
 
+# Bulk uploads are written in transactions of this many attempts.
+SCORES_BULK_CHUNK_SIZE = int(os.getenv("SCORES_BULK_CHUNK_SIZE", "500"))
+SCORES_BULK_MAX_ITEMS = int(os.getenv("SCORES_BULK_MAX_ITEMS", "10000"))
+
+# Statements are kept as module constants (see also app/score_queries.py) so
+# each pooled connection prepares them once and reuses them from its statement
+# cache. This one reads the per-subject rollup kept up to date by a trigger on quiz_attempts
+# (see app/rollups.py), so the summary costs O(subjects) rather than O(attempts).
+SUBJECT_SUMMARY_SQL = """
+    SELECT
+        subject,
+        attempts,
+        sum_accuracy,
+        sum_accuracy / attempts AS avg_accuracy,
+        best_accuracy,
+        worst_accuracy
+    FROM subject_rollup
+    ORDER BY avg_accuracy DESC
+"""
+
 
 @router.post("", response_model=ScoreCreated)
-async def create_score(
-    payload: ScoreCreate, db: aiosqlite.Connection = Depends(get_db)
-):
-    created_at = datetime.now(timezone.utc).isoformat()
-
-    cursor = await db.execute(
-        """
-        INSERT INTO quiz_attempts (created_at, subject, year_group, topic, score, total_questions)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (
-            created_at,
-            payload.subject.strip(),
-            payload.year_group,
-            payload.topic.strip() if payload.topic else None,
-            payload.score,
-            payload.total_questions,
-        ),
-    )
-    await db.commit()
+async def create_score(payload: ScoreCreate, writer=Depends(get_writer)):
+    row = _attempt_row(payload, to_created_at(datetime.now(timezone.utc)))
+
+    if score_buffer.running:
+        # Group commit: returns once the batch holding this row has committed.
+        return ScoreCreated(id=await score_buffer.submit(row))
+
+    with db_operation("insert"):
+        async with writer() as db:
+            cursor = await db.execute(INSERT_ATTEMPT_SQL, row)
+            await db.commit()
+    summary_cache.invalidate()
 
     return ScoreCreated(id=cursor.lastrowid)
 
 
+def _attempt_row(payload: ScoreCreate, created_at: str) -> tuple:
+    return (
+        created_at,
+        payload.subject.strip(),
+        payload.year_group,
+        payload.topic.strip() if payload.topic else None,
+        payload.score,
+        payload.total_questions,
+    )
+
+
+async def _insert_chunk(writer, payloads: list[ScoreCreate]) -> list[int]:
+    created_at = to_created_at(datetime.now(timezone.utc))
+    rows = [_attempt_row(p, created_at) for p in payloads]
+    with db_operation("insert_bulk"):
+        async with writer() as db:
+            ids = await executemany_returning_ids(db, INSERT_ATTEMPT_SQL, rows)
+            await db.commit()
+    summary_cache.invalidate()
+    return ids
+
+
+def _bulk_error(status_code: int, message: str, inserted_ids: list[int], **extra) -> HTTPException:
+    # Earlier chunks are already committed; the client resumes from item len(inserted_ids).
+    return HTTPException(
+        status_code=status_code,
+        detail={"message": message, "inserted_ids": inserted_ids, **extra},
+    )
+
+
+@router.post("/bulk", response_model=ScoresBulkCreated)
+async def create_scores_bulk(request: Request, writer=Depends(get_writer)):
+    """
+    Insert many attempts from a JSON array or an NDJSON body
+    (Content-Type: application/x-ndjson).
+
+    Items are validated as they are read and written in transactions of
+    SCORES_BULK_CHUNK_SIZE. Ingestion stops at the first invalid item;
+    the error lists the ids of the items already stored.
+    """
+    body = request.stream()
+    if is_ndjson(request.headers.get("content-type", "")):
+        items = iter_ndjson(body)
+    else:
+        items = iter_json_array(body)
+
+    ids: list[int] = []
+    chunk: list[ScoreCreate] = []
+    index = 0
+    try:
+        async for item in items:
+            if index >= SCORES_BULK_MAX_ITEMS:
+                raise _bulk_error(
+                    413, f"At most {SCORES_BULK_MAX_ITEMS} attempts per upload.", ids
+                )
+            try:
+                chunk.append(ScoreCreate.model_validate(item))
+            except ValidationError as e:
+                raise _bulk_error(
+                    422,
+                    f"Item {index} is invalid.",
+                    ids,
+                    index=index,
+                    errors=e.errors(include_url=False, include_context=False),
+                )
+            index += 1
+            if len(chunk) >= SCORES_BULK_CHUNK_SIZE:
+                ids.extend(await _insert_chunk(writer, chunk))
+                chunk = []
+    except BulkFormatError as e:
+        raise _bulk_error(400, str(e), ids)
+
+    if chunk:
+        ids.extend(await _insert_chunk(writer, chunk))
+    return ScoresBulkCreated(ids=ids)
+
+
+def attempt_filters(
+    subject: Optional[str] = None,
+    year_group: Optional[int] = Query(None, ge=1, le=13),
+    topic: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at."),
+    until: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at."),
+) -> AttemptFilters:
+    return AttemptFilters(
+        subject=subject, year_group=year_group, topic=topic, since=since, until=until
+    )
+
+
 @router.get("/summary", response_model=ScoreSummary)
-async def get_summary(db: aiosqlite.Connection = Depends(get_db)):
-    overall_row = await (
-        await db.execute(
-            """
-            SELECT
-                COUNT(*) AS total_attempts,
-                AVG(1.0 * score / total_questions) AS overall_avg_accuracy
-            FROM quiz_attempts
-            """
-        )
-    ).fetchone()
-
-    total_attempts = int(overall_row["total_attempts"] or 0)
-    overall_avg_accuracy = float(overall_row["overall_avg_accuracy"] or 0.0)
-
-    rows = await (
-        await db.execute(
-            """
-            SELECT
-                subject,
-                COUNT(*) AS attempts,
-                AVG(1.0 * score / total_questions) AS avg_accuracy,
-                MAX(1.0 * score / total_questions) AS best_accuracy,
-                MIN(1.0 * score / total_questions) AS worst_accuracy
-            FROM quiz_attempts
-            GROUP BY subject
-            ORDER BY avg_accuracy DESC
-            """
-        )
-    ).fetchall()
+async def get_summary(
+    response: Response,
+    filters: AttemptFilters = Depends(attempt_filters),
+    if_none_match: Optional[str] = Header(None),
+    reader=Depends(get_reader),
+):
+    # Cached summaries and the ETag are invalidated by every committed write
+    # (see app/score_cache.py), so a match needs no database access at all.
+    if summary_cache.matches(if_none_match):
+        return Response(status_code=304, headers={"ETag": summary_cache.etag})
+
+    etag, version = summary_cache.etag, summary_cache.version
+    summary = summary_cache.get(filters)
+    if summary is None:
+        with db_operation("summary"):
+            async with reader() as db:
+                summary = await _compute_summary(db, filters)
+        summary_cache.set(filters, version, summary)
+
+    if summary_cache.enabled:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return summary
+
+
+async def _compute_summary(db: aiosqlite.Connection, filters: AttemptFilters) -> ScoreSummary:
+    if filters.is_empty:
+        rows = await (await db.execute(SUBJECT_SUMMARY_SQL)).fetchall()
+    else:
+        # Filtered views aggregate the raw attempts through the composite indexes.
+        sql, params = filtered_summary_query(filters)
+        rows = await (await db.execute(sql, params)).fetchall()
+
+    total_attempts = sum(int(r["attempts"]) for r in rows)
+    total_accuracy = sum(float(r["sum_accuracy"]) for r in rows)
+    overall_avg_accuracy = total_accuracy / total_attempts if total_attempts else 0.0
 
     by_subject = [
         SubjectSummary(
@@ -86,3 +224,78 @@ async def get_summary(db: aiosqlite.Connection = Depends(get_db)):
         overall_avg_accuracy=overall_avg_accuracy,
         by_subject=by_subject,
     )
+
+
+@router.get("/attempts", response_model=AttemptPage)
+async def list_attempts(
+    filters: AttemptFilters = Depends(attempt_filters),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: aiosqlite.Connection = Depends(get_read_db),
+):
+    try:
+        sql, params = attempts_page_query(filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with db_operation("attempts"):
+        rows = await (await db.execute(sql, params)).fetchall()
+    items = [Attempt(**dict(r)) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return AttemptPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/trend", response_model=ScoreTrend)
+async def get_trend(
+    bucket: TrendBucket = "day",
+    subject: Optional[str] = None,
+    year_group: Optional[int] = Query(None, ge=1, le=13),
+    since: Optional[date] = Query(None, description="First UTC day to include."),
+    until: Optional[date] = Query(None, description="First UTC day to exclude."),
+    db: aiosqlite.Connection = Depends(get_read_db),
+):
+    """Accuracy over time per subject, from the daily rollup (see app/rollups.py)."""
+    sql, params = trend_query(bucket, subject, year_group, since, until)
+    with db_operation("trend"):
+        rows = await (await db.execute(sql, params)).fetchall()
+
+    series: dict[str, SubjectTrend] = {}
+    for r in rows:
+        trend = series.setdefault(r["subject"], SubjectTrend(subject=r["subject"], points=[]))
+        trend.points.append(
+            TrendPoint(
+                period_start=r["period_start"],
+                attempts=int(r["attempts"]),
+                avg_accuracy=float(r["avg_accuracy"]),
+            )
+        )
+
+    return ScoreTrend(bucket=bucket, series=list(series.values()))
+
+
+@router.get("/export")
+async def export_scores(
+    format: ExportFormat = "csv",
+    filters: AttemptFilters = Depends(attempt_filters),
+    reader=Depends(get_dedicated_reader),
+) -> StreamingResponse:
+    """
+    Stream matching attempts, oldest first, as CSV or NDJSON. The export reads
+    on a connection of its own, opened while the body is being sent, so long
+    exports never hold up the pooled readers.
+    """
+
+    async def body():
+        async with reader() as db:
+            async for piece in export_attempts(db, filters, format):
+                yield piece
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="quiz_attempts.{format}"'},
+    )
@@ -0,0 +1,86 @@
+"""
+In-memory cache of /scores/summary responses.
+
+Every write to quiz_attempts calls ``summary_cache.invalidate()`` after it
+commits, which bumps a version number and drops the cached summaries. The
+version doubles as the ETag, so a dashboard polling with If-None-Match gets a
+304 without the request touching the database.
+
+The version lives in this process only: with several worker processes, each
+one sees only its own writes until its cache is invalidated. The cache is
+therefore off by default; set SCORES_SUMMARY_CACHE=true only when running a
+single worker, or when summaries may lag other workers' writes.
+"""
+
+import os
+import secrets
+from collections import OrderedDict
+from typing import Optional
+
+from app.models.scores_model import ScoreSummary
+from app.score_queries import AttemptFilters
+
+SCORES_SUMMARY_CACHE = os.getenv("SCORES_SUMMARY_CACHE", "false").lower() in ("1", "true", "yes")
+SCORES_SUMMARY_CACHE_ENTRIES = int(os.getenv("SCORES_SUMMARY_CACHE_ENTRIES", "256"))
+
+
+class SummaryCache:
+    def __init__(self, max_entries: int = SCORES_SUMMARY_CACHE_ENTRIES, enabled: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        # Versions restart at 0 with the process; the epoch keeps an ETag
+        # issued before a restart from matching afterwards.
+        self._epoch = secrets.token_hex(4)
+        self.version = 0
+        self._entries: OrderedDict[AttemptFilters, ScoreSummary] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not self.enabled or not if_none_match:
+            return False
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if self.etag in tags or "*" in tags:
+            self.not_modified += 1
+            return True
+        return False
+
+    def get(self, filters: AttemptFilters) -> Optional[ScoreSummary]:
+        summary = self._entries.get(filters) if self.enabled else None
+        if summary is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(filters)
+        self.hits += 1
+        return summary
+
+    def set(self, filters: AttemptFilters, version: int, summary: ScoreSummary) -> None:
+        """Store a summary computed at ``version``, unless a write has landed since."""
+        if not self.enabled or version != self.version:
+            return
+        self._entries[filters] = summary
+        self._entries.move_to_end(filters)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+summary_cache = SummaryCache(enabled=SCORES_SUMMARY_CACHE)
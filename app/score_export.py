@@ -0,0 +1,132 @@
+"""
+Streaming export of quiz attempts as CSV or NDJSON.
+
+Rows are read with ``fetchmany`` and encoded one chunk at a time, so an export
+of any size runs in constant memory and the first bytes go out as soon as the
+first chunk is read. Served by GET /scores/export, and from the command line:
+
+    python -m app.score_export --format csv --subject Maths --since 2026-01-01 -o maths.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+from typing import AsyncIterator, Literal, Optional
+
+import aiosqlite
+
+from app.score_queries import AttemptFilters
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_COLUMNS = ("id", "created_at", "subject", "year_group", "topic", "score", "total_questions")
+EXPORT_FETCH_SIZE = 1000
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def export_query(filters: AttemptFilters) -> tuple[str, list]:
+    """Matching attempts oldest first, in the (created_at, id) order of the indexes."""
+    clauses, params = filters.where()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"""
+        SELECT {', '.join(EXPORT_COLUMNS)}
+        FROM quiz_attempts
+        {where}
+        ORDER BY created_at, id
+    """
+    return sql, params
+
+
+async def iter_attempt_chunks(
+    db: aiosqlite.Connection, filters: AttemptFilters, fetch_size: Optional[int] = None
+) -> AsyncIterator[list[tuple]]:
+    sql, params = export_query(filters)
+    async with db.execute(sql, params) as cursor:
+        while True:
+            rows = await cursor.fetchmany(fetch_size or EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            yield [tuple(r) for r in rows]
+
+
+def _csv_chunk(rows: list[tuple], header: bool = False) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def _ndjson_chunk(rows: list[tuple]) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, r))) + "\n" for r in rows)
+
+
+async def export_attempts(
+    db: aiosqlite.Connection,
+    filters: AttemptFilters,
+    fmt: ExportFormat = "csv",
+    fetch_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Encoded export, one piece per fetched chunk (the CSV header comes first)."""
+    if fmt == "csv":
+        yield _csv_chunk([], header=True).encode()
+    async for rows in iter_attempt_chunks(db, filters, fetch_size):
+        text = _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(rows)
+        yield text.encode()
+
+
+def _parse_day_or_time(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
+
+
+async def _export(path: str, filters: AttemptFilters, fmt: ExportFormat, output) -> int:
+    written = 0
+    async with aiosqlite.connect(f"file:{path}?mode=ro", uri=True) as db:
+        async for piece in export_attempts(db, filters, fmt):
+            output.write(piece)
+            written += len(piece)
+    output.flush()
+    return written
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from app.db import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Export quiz attempts as CSV or NDJSON.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--subject")
+    parser.add_argument("--year-group", type=int)
+    parser.add_argument("--topic")
+    parser.add_argument("--since", type=_parse_day_or_time, help="Inclusive, date or ISO time.")
+    parser.add_argument("--until", type=_parse_day_or_time, help="Exclusive, date or ISO time.")
+    parser.add_argument("-o", "--output", help="File to write (default: stdout).")
+    args = parser.parse_args(argv)
+
+    filters = AttemptFilters(
+        subject=args.subject,
+        year_group=args.year_group,
+        topic=args.topic,
+        since=args.since,
+        until=args.until,
+    )
+    if args.output:
+        with open(args.output, "wb") as f:
+            written = asyncio.run(_export(args.db, filters, args.format, f))
+        print(f"Wrote {written} bytes to {args.output}", file=sys.stderr)
+    else:
+        asyncio.run(_export(args.db, filters, args.format, sys.stdout.buffer))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
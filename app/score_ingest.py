@@ -0,0 +1,128 @@
+"""
+Incremental parsing of bulk score uploads.
+
+Tablets that were offline replay their attempts in one request, either as a
+JSON array or as NDJSON (one object per line). Both are parsed from the body
+as it arrives, so an upload is validated and written chunk by chunk rather
+than buffered whole.
+"""
+
+import codecs
+import json
+import os
+from typing import AsyncIterable, AsyncIterator
+
+# Longest text one item may span while the parser waits for the rest of it.
+# Past this, a decode error is a malformed item rather than a cut-off one.
+SCORES_BULK_MAX_ITEM_BYTES = int(os.getenv("SCORES_BULK_MAX_ITEM_BYTES", "65536"))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class BulkFormatError(ValueError):
+    """The body is not a JSON array or NDJSON stream of objects."""
+
+
+def is_ndjson(content_type: str) -> bool:
+    return content_type.split(";", 1)[0].strip().lower() in NDJSON_CONTENT_TYPES
+
+
+async def _text_chunks(body: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    # Multi-byte characters may be split across network chunks.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for chunk in body:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise BulkFormatError("Body is not valid UTF-8.") from e
+    if tail:
+        yield tail
+
+
+def _skip(buffer: str, pos: int, chars: str = _WHITESPACE) -> int:
+    while pos < len(buffer) and buffer[pos] in chars:
+        pos += 1
+    return pos
+
+
+async def iter_json_array(body: AsyncIterable[bytes]) -> AsyncIterator[object]:
+    """Yield the elements of a top-level JSON array as soon as each is complete."""
+    buffer, pos = "", 0
+    opened = closed = False
+    expect_item, seen_item = True, False
+
+    async for text in _text_chunks(body):
+        buffer = buffer[pos:] + text
+        pos = 0
+        while True:
+            pos = _skip(buffer, pos)
+            if pos >= len(buffer):
+                break
+            if closed:
+                raise BulkFormatError("Unexpected data after the closing ']'.")
+            if not opened:
+                if buffer[pos] != "[":
+                    raise BulkFormatError("Expected a JSON array.")
+                opened = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                if expect_item and seen_item:
+                    raise BulkFormatError("Trailing ',' before ']'.")
+                closed = True
+                pos += 1
+                continue
+            if not expect_item:
+                if buffer[pos] != ",":
+                    raise BulkFormatError("Expected ',' between array items.")
+                expect_item = True
+                pos += 1
+                continue
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Most likely the item is cut off at the end of this chunk;
+                # wait for more data, unless it is already longer than any
+                # item should be, and the rest of the body would pile up.
+                if len(buffer) - pos > SCORES_BULK_MAX_ITEM_BYTES:
+                    raise BulkFormatError(f"Malformed array item: {e.msg}.") from e
+                break
+            if end >= len(buffer) and not isinstance(item, (dict, list)):
+                # A scalar at the end of the buffer may continue in the next chunk.
+                break
+            yield item
+            pos = end
+            expect_item, seen_item = False, True
+
+    if _skip(buffer, pos) < len(buffer) or not closed:
+        raise BulkFormatError("Truncated or malformed JSON array.")
+
+
+async def iter_ndjson(body: AsyncIterable[bytes]) -> AsyncIterator[object]:
+    """Yield one decoded value per non-blank line."""
+    pending = ""
+    line_no = 0
+
+    def decode(line: str):
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BulkFormatError(f"Line {line_no}: {e.msg}.") from e
+
+    async for text in _text_chunks(body):
+        *lines, pending = (pending + text).split("\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield decode(line)
+        if len(pending) > SCORES_BULK_MAX_ITEM_BYTES:
+            raise BulkFormatError(f"Line {line_no + 1} is too long.")
+    if pending.strip():
+        line_no += 1
+        yield decode(pending)
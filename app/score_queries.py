@@ -0,0 +1,166 @@
+"""
+SQL builders for filtered score queries.
+
+Filters map onto the composite indexes created in app/migrations.py, and
+listings page with a keyset on (created_at, id) rather than OFFSET, so the
+cost of a page does not grow with how deep into the history it is.
+"""
+
+import base64
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Literal, Optional
+
+
+INSERT_ATTEMPT_SQL = """
+    INSERT INTO quiz_attempts (created_at, subject, year_group, topic, score, total_questions)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def to_created_at(value: datetime) -> str:
+    """Format a timestamp the way quiz_attempts.created_at stores it (UTC, microseconds)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+@dataclass(frozen=True)
+class AttemptFilters:
+    subject: Optional[str] = None
+    year_group: Optional[int] = None
+    topic: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return all(
+            v is None for v in (self.subject, self.year_group, self.topic, self.since, self.until)
+        )
+
+    def where(self) -> tuple[list[str], list]:
+        clauses, params = [], []
+        if self.subject is not None:
+            clauses.append("subject = ?")
+            params.append(self.subject.strip())
+        if self.year_group is not None:
+            clauses.append("year_group = ?")
+            params.append(self.year_group)
+        if self.topic is not None:
+            clauses.append("topic = ?")
+            params.append(self.topic.strip())
+        if self.since is not None:
+            clauses.append("created_at >= ?")
+            params.append(to_created_at(self.since))
+        if self.until is not None:
+            clauses.append("created_at < ?")
+            params.append(to_created_at(self.until))
+        return clauses, params
+
+
+def encode_cursor(created_at: str, attempt_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{attempt_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        created_at, attempt_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return created_at, int(attempt_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def attempts_page_query(
+    filters: AttemptFilters, limit: int, cursor: Optional[str] = None
+) -> tuple[str, list]:
+    """
+    Newest-first page of attempts. Fetches ``limit + 1`` rows so the caller
+    can tell whether there is a next page.
+    """
+    clauses, params = filters.where()
+    if cursor:
+        created_at, attempt_id = decode_cursor(cursor)
+        # Equivalent to (created_at, id) < (?, ?), written so the created_at
+        # bound can drive an index range scan.
+        clauses.append("created_at <= ? AND (created_at < ? OR id < ?)")
+        params.extend([created_at, created_at, attempt_id])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"""
+        SELECT id, created_at, subject, year_group, topic, score, total_questions
+        FROM quiz_attempts
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """
+    return sql, [*params, limit + 1]
+
+
+def filtered_summary_query(filters: AttemptFilters) -> tuple[str, list]:
+    clauses, params = filters.where()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"""
+        SELECT
+            subject,
+            COUNT(*) AS attempts,
+            SUM(1.0 * score / total_questions) AS sum_accuracy,
+            AVG(1.0 * score / total_questions) AS avg_accuracy,
+            MAX(1.0 * score / total_questions) AS best_accuracy,
+            MIN(1.0 * score / total_questions) AS worst_accuracy
+        FROM quiz_attempts
+        {where}
+        GROUP BY subject
+        ORDER BY avg_accuracy DESC
+    """
+    return sql, params
+
+
+TrendBucket = Literal["day", "week"]
+
+# Period start for each bucket, computed from daily_rollup.day (YYYY-MM-DD).
+# Weeks start on Monday: step back six days, then forward to the next Monday.
+_BUCKET_START = {
+    "day": "day",
+    "week": "date(day, '-6 days', 'weekday 1')",
+}
+
+
+def trend_query(
+    bucket: TrendBucket,
+    subject: Optional[str] = None,
+    year_group: Optional[int] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> tuple[str, list]:
+    """
+    Accuracy per subject per day or week, read from daily_rollup. ``since``
+    is inclusive and ``until`` exclusive; buckets are clipped to that window.
+    """
+    clauses, params = [], []
+    if subject is not None:
+        clauses.append("subject = ?")
+        params.append(subject.strip())
+    if year_group is not None:
+        clauses.append("year_group = ?")
+        params.append(year_group)
+    if since is not None:
+        clauses.append("day >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        clauses.append("day < ?")
+        params.append(until.isoformat())
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"""
+        SELECT
+            subject,
+            {_BUCKET_START[bucket]} AS period_start,
+            SUM(attempts) AS attempts,
+            SUM(sum_accuracy) / SUM(attempts) AS avg_accuracy
+        FROM daily_rollup
+        {where}
+        GROUP BY subject, period_start
+        ORDER BY subject, period_start
+    """
+    return sql, params
@@ -0,0 +1,185 @@
+"""
+Group commit for score inserts.
+
+With SCORES_WRITE_BEHIND enabled, POST /scores hands its row to an in-process
+queue instead of committing on its own. A single flusher task inserts whatever
+has queued up in one transaction, every SCORES_FLUSH_MS milliseconds or
+SCORES_FLUSH_ROWS rows, whichever comes first, so a burst of submissions costs
+one fsync per batch rather than one per attempt. Callers still wait for the
+commit and get their row id, so a 200 remains a durable acknowledgement.
+"""
+
+import asyncio
+import os
+from typing import Callable, Optional
+
+from app.db import executemany_returning_ids
+from app.metrics import db_operation
+from app.score_cache import summary_cache
+from app.score_queries import INSERT_ATTEMPT_SQL
+
+SCORES_WRITE_BEHIND = os.getenv("SCORES_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+SCORES_FLUSH_MS = float(os.getenv("SCORES_FLUSH_MS", "10"))
+SCORES_FLUSH_ROWS = int(os.getenv("SCORES_FLUSH_ROWS", "256"))
+# Submitters wait for space once this many rows are queued (backpressure).
+SCORES_QUEUE_SIZE = int(os.getenv("SCORES_QUEUE_SIZE", "10000"))
+
+
+class GroupCommitBuffer:
+    """
+    Bounded queue of rows for one INSERT statement, flushed by a single task.
+
+    ``writer`` is a factory returning an async context manager that yields
+    the writer connection (``DatabasePool.writer``); it is entered once per
+    batch, so the writer is shared fairly with other requests between flushes.
+    """
+
+    def __init__(
+        self,
+        sql: str,
+        flush_interval: float = SCORES_FLUSH_MS / 1000,
+        max_rows: int = SCORES_FLUSH_ROWS,
+        max_queue: int = SCORES_QUEUE_SIZE,
+        on_commit: Optional[Callable[[], None]] = None,
+    ):
+        self.sql = sql
+        self.on_commit = on_commit
+        self.flush_interval = flush_interval
+        self.max_rows = max(1, max_rows)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self._writer: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushes = 0
+        self.rows = 0
+        self.failed_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def start(self, writer: Callable) -> None:
+        if self._task is not None:
+            return
+        self._writer = writer
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop accepting rows, flush everything already queued and wait for it."""
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            self._queue.put_nowait(None)  # wakes the flusher if it is idle
+        except asyncio.QueueFull:
+            pass  # it is busy, and checks _closing before it waits again
+        await self._task
+        self._task = None
+
+    async def submit(self, row: tuple) -> int:
+        """Queue one row and return its id once the batch holding it has committed."""
+        if not self.running:
+            raise RuntimeError("Write buffer is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _next_batch(self) -> tuple[list, bool]:
+        """Wait for the first row, then gather more until the batch is full or due."""
+        batch, stopping = [], False
+        if self._closing:
+            # Draining: take whatever is left without waiting.
+            while len(batch) < self.max_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            return batch, True
+
+        item = await self._queue.get()
+        if item is None:
+            stopping = True
+        else:
+            batch.append(item)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.max_rows:
+            if stopping:
+                # Draining: take whatever is left without waiting.
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+        return batch, stopping
+
+    async def _run(self) -> None:
+        while True:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+            if stopping and self._queue.empty():
+                # Submitters that were blocked on a full queue were woken by
+                # the gets above; let them enqueue before deciding we are done.
+                await asyncio.sleep(0)
+                if self._queue.empty():
+                    return
+
+    async def _flush(self, batch: list) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            with db_operation("group_commit"):
+                async with self._writer() as db:
+                    ids = await executemany_returning_ids(db, self.sql, rows)
+                    await db.commit()
+        except Exception as e:
+            self.failed_flushes += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if self.on_commit is not None:
+            self.on_commit()
+        self.flushes += 1
+        self.rows += len(rows)
+        for row_id, (_, future) in zip(ids, batch):
+            if not future.done():
+                future.set_result(row_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queued": self._queue.qsize(),
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "failed_flushes": self.failed_flushes,
+            "avg_batch": self.rows / self.flushes if self.flushes else 0.0,
+        }
+
+
+score_buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, on_commit=summary_cache.invalidate)
+
+
+def start_score_buffer(writer: Callable) -> None:
+    if SCORES_WRITE_BEHIND:
+        score_buffer.start(writer)
+
+
+async def stop_score_buffer() -> None:
+    await score_buffer.stop()
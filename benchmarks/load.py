@@ -0,0 +1,275 @@
+"""
+End-to-end load and latency benchmark.
+
+Runs the real app from app.main.create_app (lifespan included) in-process
+against the local stand-in LLM provider and a throwaway database, then drives
+a weighted mix of endpoints with a fixed number of concurrent clients.
+Prints (and optionally writes) a JSON report with throughput, status counts
+and p50/p95/p99 latency per endpoint, so runs can be compared across changes.
+
+    python -m benchmarks.load --requests 5000 --concurrency 64 \\
+        --mix lesson=2,quiz=1,image=1,score=4,summary=6 \\
+        --llm-latency-ms 800 --llm-p95-ms 2500 --distinct 50 --output load.json
+
+--distinct sets how many different lessons, quizzes and image prompts the
+mix rotates through, which controls the cache hit rate. Upstream budgets
+come from LLM_RATE_LIMITS as usual; pass --rate-limits to override them.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from typing import Optional
+
+import httpx
+
+ENDPOINTS = ("lesson", "quiz", "image", "score", "summary")
+DEFAULT_MIX = "lesson=2,quiz=1,image=1,score=4,summary=6"
+SUBJECTS = ("Maths", "Science", "History", "Geography", "English", "Art", "Music")
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}; use {', '.join(ENDPOINTS)}.")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one positive weight.")
+    return mix
+
+
+def percentile(ordered: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[max(0, index)]
+
+
+def _summarize(latencies: list[float], statuses: Counter, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 2)  # noqa: E731
+    return {
+        "requests": len(ordered),
+        "errors": sum(n for status, n in statuses.items() if status == "exception" or status >= 400),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+def _request(kind: str, i: int, distinct: int) -> tuple[str, str, Optional[dict]]:
+    n = i % distinct
+    subject = SUBJECTS[n % len(SUBJECTS)]
+    year_group = 7 + n % 5
+    if kind == "lesson":
+        return "POST", "/v1/lesson", {
+            "year_group": year_group,
+            "subject": subject,
+            "topic_idea": f"topic {n}",
+        }
+    if kind == "quiz":
+        return "POST", "/v1/quiz", {
+            "lesson_text": f"Lesson {n} about {subject}.",
+            "year_group": year_group,
+        }
+    if kind == "image":
+        return "POST", "/v1/image", {"prompt": f"A diagram for lesson {n}", "include_base64": False}
+    if kind == "score":
+        return "POST", "/scores", {
+            "subject": subject,
+            "year_group": year_group,
+            "score": i % 4,
+            "total_questions": 3,
+        }
+    return "GET", "/scores/summary", None
+
+
+async def drive(
+    app,
+    requests: int,
+    concurrency: int,
+    mix: dict[str, float],
+    distinct: int,
+    seed: int,
+    warmup: int = 0,
+) -> dict:
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    plan = rng.choices(kinds, weights=weights, k=warmup + requests)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    next_index = iter(range(len(plan)))
+
+    # App exceptions become 500s instead of aborting the run.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def worker():
+            for i in next_index:
+                kind = plan[i]
+                method, url, body = _request(kind, i, distinct)
+                started = time.perf_counter()
+                try:
+                    res = await client.request(method, url, json=body)
+                    status = res.status_code
+                except Exception:
+                    status = "exception"
+                if i < warmup:
+                    continue
+                latencies[kind].append(time.perf_counter() - started)
+                statuses[kind][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    every = [v for values in latencies.values() for v in values]
+    return {
+        "overall": _summarize(every, sum(statuses.values(), Counter()), elapsed),
+        "endpoints": {
+            kind: _summarize(latencies[kind], statuses[kind], elapsed) for kind in sorted(latencies)
+        },
+        "seconds": round(elapsed, 3),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace, workdir: str) -> dict:
+    # Imported here so the environment set up in main() is seen at import time.
+    from app import db as app_db
+    from app.main import create_app
+    from llm_core.providers import LatencyProfile, LocalProfile, LocalProvider, set_provider
+    from services import image_service
+    from services.image_store import ImageStore
+
+    provider = LocalProvider(
+        LocalProfile(
+            text_latency=LatencyProfile(args.llm_latency_ms, args.llm_p95_ms),
+            image_latency=LatencyProfile(args.image_latency_ms, args.image_p95_ms),
+            error_rate=args.error_rate,
+            malformed_rate=args.malformed_rate,
+            output_tokens=args.output_tokens,
+            seed=args.seed,
+        )
+    )
+    set_provider(provider)
+
+    db_path = os.path.join(workdir, "bench.db")
+    app_db.DB_PATH = db_path
+    app_db.pool.path = db_path
+    image_service.image_store = ImageStore(os.path.join(workdir, "images"))
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        result = await drive(
+            app,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            mix=args.mix,
+            distinct=args.distinct,
+            seed=args.seed,
+            warmup=args.warmup,
+        )
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            result["server_stats"] = {
+                "cache": (await client.get("/v1/cache/stats")).json(),
+                "generation": (await client.get("/v1/generation/stats")).json(),
+            }
+
+    return {
+        "benchmark": "load",
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "distinct": args.distinct,
+            "seed": args.seed,
+            "llm_latency_ms": [args.llm_latency_ms, args.llm_p95_ms],
+            "image_latency_ms": [args.image_latency_ms, args.image_p95_ms],
+            "error_rate": args.error_rate,
+            "malformed_rate": args.malformed_rate,
+        },
+        **result,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end load and latency benchmark.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=0, help="Requests sent but not measured.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Median text latency.")
+    parser.add_argument("--llm-p95-ms", type=float, default=0)
+    parser.add_argument("--image-latency-ms", type=float, default=0)
+    parser.add_argument("--image-p95-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of upstream 503s.")
+    parser.add_argument(
+        "--malformed-rate", type=float, default=0, help="Share of responses needing JSON repair."
+    )
+    parser.add_argument("--output-tokens", type=int, default=0)
+    parser.add_argument("--rate-limits", help="JSON for LLM_RATE_LIMITS.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args(argv)
+    args.distinct = max(1, args.distinct)
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Keep the run self-contained: no persistent cache tier, no real upstream.
+        os.environ["LEARNING_ASSISTANT_CACHE_DB"] = ""
+        os.environ["LLM_PROVIDER"] = "local"
+        # Per-request INFO logs would be measured along with the app.
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        if args.rate_limits:
+            os.environ["LLM_RATE_LIMITS"] = args.rate_limits
+        # The app logs to stderr; send anything else printed during the run
+        # there too, keeping stdout for the report.
+        with redirect_stdout(sys.stderr):
+            report = asyncio.run(run(args, workdir))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Scores API throughput: a new connection per request vs the pooled WAL connections.
+
+"before" reproduces the original get_db (a fresh aiosqlite connection, and so
+a fresh thread, per request on a rollback-journal database); "after" uses the
+app's DatabasePool, and "after_group_commit" adds the write-behind buffer from
+app/write_buffer.py. All drive the real scores router in-process.
+
+    python -m benchmarks.scores_db --requests 2000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+import httpx
+from fastapi import FastAPI
+
+from app import db as app_db
+from app.routers.scores import router as scores_router
+from app.score_cache import summary_cache
+from app.write_buffer import score_buffer
+
+
+async def _create_db(path: str, wal: bool) -> None:
+    async with aiosqlite.connect(path) as db:
+        await db.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        await app_db.create_schema(db)
+
+
+def _per_request_app(path: str) -> FastAPI:
+    async def per_request_db():
+        db = await aiosqlite.connect(path)
+        db.row_factory = aiosqlite.Row
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    @asynccontextmanager
+    async def per_request_connection():
+        async for db in per_request_db():
+            yield db
+
+    async def checkout():
+        yield per_request_connection
+
+    app = FastAPI()
+    app.include_router(scores_router)
+    app.dependency_overrides[app_db.get_writer] = checkout
+    app.dependency_overrides[app_db.get_read_db] = per_request_db
+    app.dependency_overrides[app_db.get_reader] = checkout
+    return app
+
+
+def _pooled_app(pool: app_db.DatabasePool) -> FastAPI:
+    async def writer():
+        yield pool.writer
+
+    async def reader_db():
+        async with pool.reader() as db:
+            yield db
+
+    async def reader():
+        yield pool.reader
+
+    app = FastAPI()
+    app.include_router(scores_router)
+    app.dependency_overrides[app_db.get_writer] = writer
+    app.dependency_overrides[app_db.get_read_db] = reader_db
+    app.dependency_overrides[app_db.get_reader] = reader
+    return app
+
+
+async def _drive(app: FastAPI, requests: int, concurrency: int, write_ratio: float) -> dict:
+    # The app's exceptions propagate through ASGITransport; count them rather
+    # than abort, since lock timeouts under contention are part of the result.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    writes_every = max(1, round(1 / write_ratio)) if write_ratio else 0
+    counter = iter(range(requests))
+    errors = 0
+    # Each run uses a new database; drop summaries cached by the previous one.
+    summary_cache.invalidate()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                if writes_every and i % writes_every == 0:
+                    res = await client.post(
+                        "/scores",
+                        json={"subject": f"S{i % 7}", "year_group": 8, "score": 2, "total_questions": 3},
+                    )
+                else:
+                    res = await client.get("/scores/summary")
+                if res.is_error:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+    }
+
+
+async def run(requests: int, concurrency: int, write_ratio: float, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        await _create_db(before_path, wal=False)
+        before = await _drive(_per_request_app(before_path), requests, concurrency, write_ratio)
+
+        after_path = os.path.join(tmp, "after.db")
+        await _create_db(after_path, wal=True)
+        pool = app_db.DatabasePool(after_path, readers=readers)
+        await pool.open()
+        try:
+            after = await _drive(_pooled_app(pool), requests, concurrency, write_ratio)
+        finally:
+            await pool.close()
+
+        grouped_path = os.path.join(tmp, "grouped.db")
+        await _create_db(grouped_path, wal=True)
+        pool = app_db.DatabasePool(grouped_path, readers=readers)
+        await pool.open()
+        score_buffer.start(pool.writer)
+        try:
+            grouped = await _drive(_pooled_app(pool), requests, concurrency, write_ratio)
+            grouped["buffer"] = score_buffer.stats()
+        finally:
+            await score_buffer.stop()
+            await pool.close()
+
+    return {
+        "concurrency": concurrency,
+        "write_ratio": write_ratio,
+        "before_per_request_connection": before,
+        "after_pooled_wal": after,
+        "after_group_commit": grouped,
+        "speedup": round(after["rps"] / before["rps"], 2),
+        "group_commit_speedup": round(grouped["rps"] / after["rps"], 2),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--readers", type=int, default=app_db.DB_READERS)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.requests, args.concurrency, args.write_ratio, args.readers))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
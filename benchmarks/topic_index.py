@@ -0,0 +1,86 @@
+"""
+Near-duplicate topic lookups against a large index.
+
+Fills a TopicIndex with synthetic topics spread over year groups and
+subjects, then times lookups of unseen topics and of near-duplicates
+(one character changed), and compares with scoring every stored topic.
+
+    python -m benchmarks.topic_index --topics 30000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from services.topic_index import TopicIndex, jaccard, normalize_topic, shingles
+
+SUBJECTS = ["Maths", "Science", "History", "Geography", "English"]
+
+
+def _timed(fn, queries) -> tuple[list, dict]:
+    results, samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(*query))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return results, {
+        "p50_ms": round(statistics.median(samples), 4),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topics", type=int, default=30000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+        for _ in range(5000)
+    ]
+
+    def topic() -> str:
+        return " ".join(rng.sample(vocab, rng.randint(1, 4)))
+
+    stored = [(rng.randint(7, 11), rng.choice(SUBJECTS), topic()) for _ in range(args.topics)]
+    index = TopicIndex(enabled=True, max_entries=args.topics)
+    start = time.perf_counter()
+    for i, (year_group, subject, text) in enumerate(stored):
+        index.add(str(i), year_group, subject, text)
+    build_seconds = time.perf_counter() - start
+
+    unseen = [(rng.randint(7, 11), rng.choice(SUBJECTS), topic()) for _ in range(args.lookups)]
+    near = [(y, s, t[:-1] + "x") for y, s, t in rng.sample(stored, args.lookups)]
+
+    def scan(year_group: int, subject: str, text: str) -> float:
+        grams = shingles(normalize_topic(text))
+        scores = [
+            jaccard(grams, shingles(normalize_topic(t)))
+            for y, s, t in stored
+            if (y, s) == (year_group, subject)
+        ]
+        return max(scores, default=0.0)
+
+    _, unseen_stats = _timed(index.match, unseen)
+    matches, near_stats = _timed(index.match, near)
+    _, scan_stats = _timed(scan, near[:20])
+    report = {
+        "topics": args.topics,
+        "build_seconds": round(build_seconds, 3),
+        "unseen": unseen_stats,
+        "near_duplicate": {**near_stats, "matched": sum(m is not None for m in matches)},
+        "linear_scan": scan_stats,
+        "index": index.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Upstream context caching of the static system prompts.
+
+The persona and rules text at the start of every lesson, quiz and daily page
+prompt depends only on the year group (and subject), so it is registered
+once per model with the provider as a cached context and later calls name
+that cache instead of resending the text. Cached prompt tokens are billed at
+a discount and do not have to be re-processed.
+
+Caches are created with LLM_CONTEXT_CACHE_TTL_SECONDS and are treated as gone
+LLM_CONTEXT_CACHE_REFRESH_SECONDS before they expire, so a new one is
+created rather than a request naming a cache that expires in flight. At most
+LLM_CONTEXT_CACHE_MAX_ENTRIES prefixes are cached (subjects are free text);
+beyond that, and for prefixes shorter than the provider's minimum
+(``provider.min_cache_tokens``; the Gemini API refuses small caches), the
+text is sent inline as before.
+"""
+
+import hashlib
+import os
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.metrics import CONTEXT_CACHE_LOOKUPS
+from llm_core.rate_limiter import estimate_tokens
+from llm_core.single_flight import SingleFlight
+
+LLM_CONTEXT_CACHE = os.getenv("LLM_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes")
+LLM_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+LLM_CONTEXT_CACHE_REFRESH_SECONDS = float(os.getenv("LLM_CONTEXT_CACHE_REFRESH_SECONDS", "60"))
+LLM_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CONTEXT_CACHE_MAX_ENTRIES", "256"))
+
+
+@dataclass
+class _Entry:
+    name: str
+    expires_at: float
+    tokens: int
+
+
+class ContextCache:
+    def __init__(
+        self,
+        enabled: bool = LLM_CONTEXT_CACHE,
+        ttl_seconds: float = LLM_CONTEXT_CACHE_TTL_SECONDS,
+        refresh_seconds: float = LLM_CONTEXT_CACHE_REFRESH_SECONDS,
+        max_entries: int = LLM_CONTEXT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = min(refresh_seconds, ttl_seconds / 2)
+        self.max_entries = max_entries
+        self._clock = clock
+        # Per provider object, so a replaced provider never sees old names.
+        self._providers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._creating = SingleFlight("context_cache")
+        self.hits = 0
+        self.created = 0
+        self.recreated = 0
+        self.inline = 0
+        self.failures = 0
+        self.cached_tokens = 0
+
+    def _count(self, result: str) -> None:
+        CONTEXT_CACHE_LOOKUPS.inc(result=result)
+
+    async def lookup(self, provider, model: str, text: str) -> Optional[str]:
+        """
+        Name of a live cached context holding ``text`` as the system
+        instruction for ``model``, creating one if needed. None means send
+        the text inline.
+        """
+        create = getattr(provider, "create_cached_content", None)
+        tokens = estimate_tokens(text)
+        if not self.enabled or create is None or tokens < getattr(provider, "min_cache_tokens", 0):
+            return None
+
+        entries: dict[tuple, _Entry] = self._providers.setdefault(provider, {})
+        key = (model, hashlib.sha256(text.encode("utf-8")).hexdigest())
+        now = self._clock()
+        entry = entries.get(key)
+        if entry is not None and entry.expires_at - self.refresh_seconds > now:
+            self.hits += 1
+            self.cached_tokens += entry.tokens
+            self._count("hit")
+            return entry.name
+
+        if entry is None:
+            self._prune(entries, now)
+            if len(entries) >= self.max_entries:
+                self.inline += 1
+                self._count("full")
+                return None
+
+        try:
+            entry = await self._creating.do(
+                (id(provider), *key), lambda: self._create(create, model, text, tokens)
+            )
+        except Exception:
+            # Caching is an optimisation; the call goes ahead with the text inline.
+            self.failures += 1
+            self._count("error")
+            return None
+        if entries.get(key) is not entry:
+            if key in entries:
+                self.recreated += 1
+                self._count("recreated")
+            else:
+                self.created += 1
+                self._count("created")
+            entries[key] = entry
+        self.cached_tokens += entry.tokens
+        return entry.name
+
+    async def _create(self, create, model: str, text: str, tokens: int) -> _Entry:
+        cached = await create(model=model, system_instruction=text, ttl_seconds=self.ttl_seconds)
+        expire_time = getattr(cached, "expire_time", None)
+        expires_at = expire_time.timestamp() if expire_time else self._clock() + self.ttl_seconds
+        usage = getattr(cached, "usage_metadata", None)
+        return _Entry(cached.name, expires_at, getattr(usage, "total_token_count", None) or tokens)
+
+    def forget(self, name: str) -> None:
+        """Drop a cache the upstream no longer knows, e.g. deleted or expired early."""
+        for entries in self._providers.values():
+            for key, entry in list(entries.items()):
+                if entry.name == name:
+                    del entries[key]
+        self._count("expired_upstream")
+
+    @staticmethod
+    def _prune(entries: dict, now: float) -> None:
+        for key, entry in list(entries.items()):
+            if entry.expires_at <= now:
+                del entries[key]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": sum(len(entries) for entries in self._providers.values()),
+            "hits": self.hits,
+            "created": self.created,
+            "recreated": self.recreated,
+            "inline": self.inline,
+            "failures": self.failures,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+context_cache = ContextCache()
+
+
+def get_context_cache_stats() -> dict:
+    return context_cache.stats()
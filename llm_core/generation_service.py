@@ -1,72 +1,448 @@
-import os
+import asyncio
 import json
-from typing import Optional
-from dotenv import load_dotenv
-from google import genai
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from google.genai import types
 from google.genai.errors import APIError, ClientError
-from app.exceptions import ImageGenerationError, ConfigurationError, LessonGenerationError
+from app.exceptions import (
+    ImageGenerationError,
+    LessonGenerationError,
+    RateLimitError,
+    UpstreamUnavailableError,
+)
 from llm_core.prompt_templates import (
     get_lesson_request_template,
     get_system_instructions,
     get_quiz_system_instruction,
+    get_quiz_request_template,
+    get_daily_page_request_template,
+    get_correction_prompt,
 )
+from pydantic import BaseModel
+from app.metrics import (
+    LLM_JSON_REPAIRS,
+    LLM_JSON_RESPONSES,
+    LLM_PROMPT_TOKENS,
+    LLM_PROMPT_TOKENS_SAVED,
+    LLM_UPSTREAM_SECONDS,
+    STAGE_SECONDS,
+    record_usage,
+    stage,
+)
+from app.models.lesson_models import GeneratedLesson
 from app.models.quiz_models import GeneratedQuiz
-from testing.testing_data import TEST_LESSON_OUTPUT, TEST_QUIZ_OBJECT_PERFECT, TEST_IMAGE_BASE64
+from app.models.daily_page_models import GeneratedDailyPage
+from llm_core import json_repair
+from llm_core.context_cache import context_cache
+from llm_core.prompt_budget import condense_text, get_prompt_budget
+from llm_core.single_flight import SingleFlight
+from llm_core.rate_limiter import estimate_tokens, get_limiter
+from llm_core.resilience import LLM_IMAGE_TIMEOUT_SECONDS, get_policy
+
+# The provider (Gemini or the local stand-in) is chosen with LLM_PROVIDER;
+# see llm_core/providers.py.
+from llm_core.providers import get_provider
+
+LESSON_MODEL = "gemini-2.5-flash"  # Use the cost-effective model
+QUIZ_MODEL = "gemini-2.5-flash"
+IMAGE_MODEL = "imagen-4.0-generate-001"
+
+logger = logging.getLogger(__name__)
+
+# Output tokens budgeted up front for a text call; the limiter is corrected
+# with the real usage once the response arrives.
+OUTPUT_TOKEN_ALLOWANCE = 1024
+
+# Correction calls allowed per response when local repair fails; 0 disables them.
+LLM_JSON_CORRECTIONS = int(os.getenv("LLM_JSON_CORRECTIONS", "1"))
+
+
+def _lesson_contents(year_group: int, subject: str, topic_idea: str) -> list:
+    return [
+        {
+            "role": "user",
+            "parts": [
+                {"text": get_system_instructions(year_group, subject)},
+                {"text": get_lesson_request_template(year_group, subject, topic_idea)},
+            ],
+        }
+    ]
+
+
+def _quiz_contents(lesson_text: str, year_group: int) -> list:
+    # 1. System Instruction (Persona and Constraint)
+    system_instruction = get_quiz_system_instruction(year_group)
+
+    # 2. User Prompt (The Context)
+    prompt_content = get_quiz_request_template(lesson_text)
+
+    return [
+        {
+            "role": "user",
+            "parts": [{"text": system_instruction}, {"text": prompt_content}],
+        }
+    ]
+
+
+def _quiz_config() -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        # This is the key line: we force the output to be JSON
+        response_mime_type="application/json",
+        # This tells the LLM the exact structure it must follow
+        response_schema=GeneratedQuiz,
+    )
+
+
+def _daily_page_contents(year_group: int, subject: str, topic_idea: str) -> list:
+    return [
+        {
+            "role": "user",
+            "parts": [
+                {"text": get_system_instructions(year_group, subject)},
+                {"text": get_daily_page_request_template(year_group, subject, topic_idea)},
+            ],
+        }
+    ]
+
+
+def _daily_page_config() -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=GeneratedDailyPage,
+    )
+
+
+def _image_config() -> types.GenerateImagesConfig:
+    return types.GenerateImagesConfig(
+        number_of_images=1,
+        aspect_ratio="16:9",
+    )
+
+
+def _parse_structured(
+    endpoint: str, text: str, schema: type[BaseModel], normalize: Optional[Callable] = None
+) -> tuple[BaseModel, list[str]]:
+    """Parse, repair (see llm_core/json_repair.py) and validate a structured response."""
+    with stage(endpoint, "parse"):
+        data, repairs = json_repair.loads(text)
+        if normalize is not None:
+            data = normalize(data, repairs)
 
-_client = None
-load_dotenv()
+    # Use the Pydantic model to validate and instantiate the object
+    with stage(endpoint, "validate"):
+        return schema.model_validate(data), repairs
 
 
-def get_genai_client():
-    global _client
+def _record_json(endpoint: str, outcome: str, repairs: list[str] = ()) -> None:
+    LLM_JSON_RESPONSES.inc(endpoint=endpoint, outcome=outcome)
+    for repair in set(repairs):
+        LLM_JSON_REPAIRS.inc(endpoint=endpoint, repair=repair)
 
-    if _client is not None:
-        return _client
 
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ConfigurationError(
-            "GOOGLE_API_KEY is not set",
-            status_code=503,
+def get_json_repair_stats() -> dict:
+    stats: dict = {}
+    for labels, value in LLM_JSON_RESPONSES.samples():
+        stats.setdefault(labels["endpoint"], {})[labels["outcome"]] = int(value)
+    return stats
+
+
+def _prompt_tokens(contents: list) -> int:
+    return estimate_tokens(*(part["text"] for content in contents for part in content["parts"]))
+
+
+def _request_tokens(endpoint: str, contents: list) -> int:
+    prompt_tokens = _prompt_tokens(contents)
+    LLM_PROMPT_TOKENS.observe(prompt_tokens, endpoint=endpoint)
+    return prompt_tokens + OUTPUT_TOKEN_ALLOWANCE
+
+
+def _fit_quiz_lesson_text(lesson_text: str, year_group: int) -> str:
+    """
+    Condense the lesson so the quiz prompt fits its budget (see
+    llm_core/prompt_budget.py), logging and counting the tokens saved.
+    """
+    budget = get_prompt_budget("quiz")
+    if budget is None:
+        return lesson_text
+    overhead = _prompt_tokens(_quiz_contents("", year_group))
+    condensed = condense_text(lesson_text, budget - overhead)
+    if condensed.saved_tokens > 0:
+        LLM_PROMPT_TOKENS_SAVED.inc(condensed.saved_tokens, endpoint="quiz")
+        logger.info(
+            "condensed lesson text for quiz prompt",
+            extra={
+                "endpoint": "quiz",
+                "budget": budget,
+                "lesson_tokens": condensed.original_tokens,
+                "condensed_tokens": condensed.tokens,
+                "saved_tokens": condensed.saved_tokens,
+            },
         )
+    return condensed.text
+
 
-    _client = genai.Client(api_key=api_key)
-    return _client
+def _usage(response):
+    return getattr(response, "usage_metadata", None)
 
-LIVERUN = False
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = _usage(response)
+    return getattr(usage, "total_token_count", None) if usage else None
+
+
+@asynccontextmanager
+async def _slot(endpoint: str, limiter, tokens: int = 0):
+    """Hold a rate limiter slot, recording the wait for it as a stage."""
+    started = time.perf_counter()
+    async with limiter.acquire(tokens):
+        STAGE_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, stage="rate_limit_wait")
+        yield
+
+
+async def _timed_call(endpoint: str, model: str, request: Awaitable):
+    """
+    Await one provider call, recording its latency and outcome. Attempts
+    abandoned by a timeout or a winning hedge are recorded as ``cancelled``.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await request
+        outcome = "ok"
+        return response
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        LLM_UPSTREAM_SECONDS.observe(
+            time.perf_counter() - started, endpoint=endpoint, model=model, outcome=outcome
+        )
 
 
-def generate_daily_lesson(
-    year_group: int, subject: str, topic_idea: str = "", liverun: bool = LIVERUN
+async def _with_cached_prefix(fn, model: str, contents: list, config=None):
+    """
+    Call ``fn`` (a provider's generate_content or generate_content_stream).
+    The first part of every prompt here is its static system text; when the
+    provider holds it as a cached context (see llm_core/context_cache.py) the
+    call names the cache and sends only the rest.
+    """
+    first, *others = contents
+    name = await context_cache.lookup(get_provider(), model, first["parts"][0]["text"])
+    if name is None:
+        return await fn(model=model, contents=contents, config=config)
+
+    rest = [{"role": first["role"], "parts": first["parts"][1:]}, *others]
+    if config is None:
+        cached_config = types.GenerateContentConfig(cached_content=name)
+    else:
+        cached_config = config.model_copy(update={"cached_content": name})
+    try:
+        return await fn(model=model, contents=rest, config=cached_config)
+    except ClientError as e:
+        if e.code not in (403, 404):
+            raise
+        # Gone upstream before its expiry time; the next lookup creates a new one.
+        context_cache.forget(name)
+        return await fn(model=model, contents=contents, config=config)
+
+
+def _correction_contents(contents: list, text: str, error: Exception) -> list:
+    # The rejected answer goes back as the model's turn, so the follow-up only
+    # has to say what is wrong with it.
+    return contents + [
+        {"role": "model", "parts": [{"text": text or ""}]},
+        {
+            "role": "user",
+            "parts": [{"text": get_correction_prompt(json_repair.describe_error(error))}],
+        },
+    ]
+
+
+async def _request_correction(
+    endpoint: str, model: str, contents: list, config, text: str, error: Exception
 ) -> str:
+    name = f"{endpoint}_correction"
+    provider = get_provider()
+    contents = _correction_contents(contents, text, error)
+    limiter = get_limiter(model)
+    estimated = _request_tokens(name, contents)
+
+    async def call():
+        async with _slot(name, limiter, estimated):
+            return await _timed_call(
+                name,
+                model,
+                _with_cached_prefix(provider.generate_content, model, contents, config),
+            )
+
+    response = await get_policy(name, model).call(call)
+    limiter.record_usage(estimated, _usage_tokens(response))
+    record_usage(name, model, _usage(response))
+    return response.text
+
+
+async def _parse_or_correct(
+    endpoint: str,
+    model: str,
+    contents: list,
+    config,
+    text: str,
+    schema: type[BaseModel],
+    normalize: Optional[Callable] = None,
+) -> BaseModel:
+    """
+    Validate a structured response, repairing malformed JSON locally when
+    possible. Only when that fails is the model sent a short correction
+    prompt, at most LLM_JSON_CORRECTIONS times. Raises ValueError (or the
+    correction call's error) when nothing usable comes back.
+    """
+    try:
+        value, repairs = _parse_structured(endpoint, text, schema, normalize)
+    except ValueError as e:
+        error = e
+    else:
+        _record_json(endpoint, "repaired" if repairs else "clean", repairs)
+        if repairs:
+            logger.debug("repaired structured response", extra={"endpoint": endpoint, "repairs": repairs})
+        return value
+
+    for _ in range(LLM_JSON_CORRECTIONS):
+        logger.info(
+            "structured response rejected, requesting a correction",
+            extra={"endpoint": endpoint, "model": model, "error": json_repair.describe_error(error)},
+        )
+        try:
+            # Callers sharing one bad response (coalesced requests) share its correction.
+            text = await correction_flight.do(
+                (endpoint, model, text),
+                lambda text=text, error=error: _request_correction(
+                    endpoint, model, contents, config, text, error
+                ),
+            )
+        except Exception:
+            _record_json(endpoint, "failed")
+            raise
+        try:
+            value, _ = _parse_structured(endpoint, text, schema, normalize)
+        except ValueError as e:
+            error = e
+            continue
+        _record_json(endpoint, "regenerated")
+        return value
+
+    _record_json(endpoint, "failed")
+    raise error
+
+
+def _image_bytes(response) -> bytes:
+    generated = response.generated_images[0]
+    image_bytes = generated.image.image_bytes
+
+    if not image_bytes:
+        raise ImageGenerationError(message="No Image", status_code=502)
+
+    return image_bytes
+
+
+# --- SYNC API ---
+# Blocking wrappers over the async API below, for scripts. They start their
+# own event loop, so call them only from code that is not already running one.
+
+
+def generate_daily_lesson(year_group: int, subject: str, topic_idea: str = "") -> str:
     """Generates the lesson content and a prompt for a visual aid."""
+    return asyncio.run(generate_daily_lesson_async(year_group, subject, topic_idea))
+
 
-    if not liverun:
-        print("returning test results")
-        return TEST_LESSON_OUTPUT
+def generate_quiz_from_lesson(lesson_text: str, year_group: int) -> Optional[GeneratedQuiz]:
+    """
+    Generates a structured quiz based on the lesson text using Pydantic schema.
 
-    client = get_genai_client()
+    :param lesson_text: The BODY of the lesson generated in Phase 1.
+    :param year_group: The student's year group for difficulty tuning.
+    :return: A Pydantic object containing the quiz, or None on failure.
+    """
+    return asyncio.run(generate_quiz_from_lesson_async(lesson_text, year_group))
 
 
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",  # Use the cost-effective model
-            contents=[
-                {
-                    "role": "user",
-                    "parts": [
-                        {"text": get_system_instructions(year_group, subject)},
-                        {
-                            "text": get_lesson_request_template(
-                                year_group, subject, topic_idea
-                            )
-                        },
-                    ],
-                }
-            ],
+def generate_image_from_prompt(prompt: str) -> bytes:
+    return asyncio.run(generate_image_from_prompt_async(prompt))
+
+
+# --- ASYNC API ---
+# The functions below await the provider's async client, so route handlers can
+# keep many slow LLM calls in flight on the event loop instead of tying up a
+# threadpool slot per call.
+#
+# Concurrent identical requests (same normalized inputs) are coalesced so they
+# share one upstream call and all receive its result or its error.
+
+lesson_flight = SingleFlight("lesson")
+quiz_flight = SingleFlight("quiz")
+image_flight = SingleFlight("image")
+daily_page_flight = SingleFlight("daily_page")
+correction_flight = SingleFlight("correction")
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def get_single_flight_stats() -> dict:
+    return {
+        flight.name: flight.stats()
+        for flight in (
+            lesson_flight,
+            quiz_flight,
+            image_flight,
+            daily_page_flight,
+            correction_flight,
         )
+    }
+
+
+async def generate_daily_lesson_async(
+    year_group: int, subject: str, topic_idea: str = ""
+) -> str:
+    """Async variant of generate_daily_lesson."""
+
+    key = (year_group, _normalize(subject), _normalize(topic_idea))
+    return await lesson_flight.do(
+        key, lambda: _generate_daily_lesson_async(year_group, subject, topic_idea)
+    )
+
+
+async def _generate_daily_lesson_async(
+    year_group: int, subject: str, topic_idea: str
+) -> str:
+    provider = get_provider()
+    contents = _lesson_contents(year_group, subject, topic_idea)
+    limiter = get_limiter(LESSON_MODEL)
+    estimated = _request_tokens("lesson", contents)
+
+    async def call():
+        async with _slot("lesson", limiter, estimated):
+            return await _timed_call(
+                "lesson",
+                LESSON_MODEL,
+                _with_cached_prefix(provider.generate_content, LESSON_MODEL, contents),
+            )
+
+    try:
+        response = await get_policy("lesson", LESSON_MODEL).call(call)
+        limiter.record_usage(estimated, _usage_tokens(response))
+        record_usage("lesson", LESSON_MODEL, _usage(response))
         return response.text
+    except (RateLimitError, UpstreamUnavailableError):
+        raise
+    except asyncio.TimeoutError as e:
+        raise LessonGenerationError(
+            message="Timed out while generating lesson.",
+            status_code=504,
+        ) from e
     except ClientError as e:
         raise LessonGenerationError(
             message=str(e),
@@ -80,96 +456,231 @@ def generate_daily_lesson(
         ) from e
 
 
-def generate_quiz_from_lesson(
-    lesson_text: str, year_group: int, liverun: bool = LIVERUN
-) -> Optional[GeneratedQuiz]:
+async def parse_lesson_async(
+    text: str, year_group: int, subject: str, topic_idea: str = "", endpoint: str = "lesson"
+) -> dict:
     """
-    Generates a structured quiz based on the lesson text using Pydantic schema.
-
-    :param lesson_text: The BODY of the lesson generated in Phase 1.
-    :param year_group: The student's year group for difficulty tuning.
-    :return: A Pydantic object containing the quiz, or None on failure.
+    Parse the lesson JSON from generate_daily_lesson_async or the lesson
+    stream, repairing it or asking the model for a correction if needed.
     """
+    try:
+        lesson = await _parse_or_correct(
+            endpoint,
+            LESSON_MODEL,
+            _lesson_contents(year_group, subject, topic_idea),
+            None,
+            text,
+            GeneratedLesson,
+        )
+    except (RateLimitError, UpstreamUnavailableError):
+        raise
+    except Exception as e:
+        raise LessonGenerationError(
+            message="The generated lesson could not be parsed.",
+            status_code=502,
+        ) from e
+    return lesson.model_dump()
 
-    if not liverun:
-        print("returning test quiz")
-        return TEST_QUIZ_OBJECT_PERFECT
 
-    client = get_genai_client()
+async def generate_quiz_from_lesson_async(
+    lesson_text: str, year_group: int
+) -> Optional[GeneratedQuiz]:
+    """Async variant of generate_quiz_from_lesson. Returns None on failure."""
 
-    # 1. System Instruction (Persona and Constraint)
-    system_instruction = get_quiz_system_instruction(year_group)
+    key = (lesson_text, year_group)
+    return await quiz_flight.do(
+        key, lambda: _generate_quiz_from_lesson_async(lesson_text, year_group)
+    )
 
-    # 2. User Prompt (The Context)
-    prompt_content = f"""
-    Please generate 3 questions based on the following lesson text:
-    
-    --- LESSON TEXT ---
-    {lesson_text}
-    --- END LESSON TEXT ---
-    
-    Ensure the 'correct_answer' field exactly matches one of the 'options'.
-    """
+
+async def _generate_quiz_from_lesson_async(
+    lesson_text: str, year_group: int
+) -> Optional[GeneratedQuiz]:
+    provider = get_provider()
+    contents = _quiz_contents(_fit_quiz_lesson_text(lesson_text, year_group), year_group)
+    limiter = get_limiter(QUIZ_MODEL)
+    estimated = _request_tokens("quiz", contents)
+
+    async def call():
+        async with _slot("quiz", limiter, estimated):
+            return await _timed_call(
+                "quiz",
+                QUIZ_MODEL,
+                _with_cached_prefix(
+                    provider.generate_content, QUIZ_MODEL, contents, _quiz_config()
+                ),
+            )
 
     try:
-        # 3. API Call with Structured Output Configuration
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[
-                {
-                    "role": "user",
-                    "parts": [{"text": system_instruction}, {"text": prompt_content}],
-                }
-            ],
-            config=types.GenerateContentConfig(
-                # This is the key line: we force the output to be JSON
-                response_mime_type="application/json",
-                # This tells the LLM the exact structure it must follow
-                response_schema=GeneratedQuiz,
-            ),
+        response = await get_policy("quiz", QUIZ_MODEL).call(call)
+        limiter.record_usage(estimated, _usage_tokens(response))
+        record_usage("quiz", QUIZ_MODEL, _usage(response))
+
+        quiz_object = await _parse_or_correct(
+            "quiz",
+            QUIZ_MODEL,
+            contents,
+            _quiz_config(),
+            response.text,
+            GeneratedQuiz,
+            json_repair.normalize_quiz,
         )
 
-        # 4. Parsing the Output
-        # The Gemini API returns the raw JSON text. We manually load it and validate with Pydantic.
-        quiz_data = json.loads(response.text)
-
-        # Use the Pydantic model to validate and instantiate the object
-        quiz_object = GeneratedQuiz(**quiz_data)
-
-        print("Quiz successfully generated and validated by Pydantic!")
+        logger.debug("quiz generated and validated", extra={"model": QUIZ_MODEL})
         return quiz_object
 
+    except (RateLimitError, UpstreamUnavailableError):
+        # Over budget or upstream down is not a generation failure; surface it as 429/503.
+        raise
     except (APIError, json.JSONDecodeError, Exception) as e:
-        print("ERROR: Failed to generate or parse quiz.")
-        print(f"Details: {e}")
-        # Optionally print the raw text response for debugging
-        # print(f"Raw Response: {response.text}")
+        logger.warning(
+            "failed to generate or parse quiz",
+            extra={"model": QUIZ_MODEL, "error_type": type(e).__name__, "error": str(e)},
+        )
         return None
 
 
-def generate_image_from_prompt(prompt: str, liverun: bool = LIVERUN) -> str:
+async def generate_image_from_prompt_async(prompt: str) -> bytes:
+    """Async variant of generate_image_from_prompt."""
 
-    if not liverun:
-        return TEST_IMAGE_BASE64
+    key = " ".join(prompt.split())
+    return await image_flight.do(
+        key, lambda: _generate_image_from_prompt_async(prompt)
+    )
 
-    client = get_genai_client()
-    try:
-        response = client.models.generate_images(
-            model="imagen-4.0-generate-001",
-            prompt=prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=1,
-                aspect_ratio="16:9",
-            ),
-        )
-        generated = response.generated_images[0]
-        image_bytes = generated.image.image_bytes
 
-        if not image_bytes:
-            raise ImageGenerationError(message="No Image", status_code=502)
+async def _generate_image_from_prompt_async(prompt: str) -> bytes:
+    provider = get_provider()
+
+    async def call():
+        async with _slot("image", get_limiter(IMAGE_MODEL)):
+            return await _timed_call(
+                "image",
+                IMAGE_MODEL,
+                provider.generate_images(model=IMAGE_MODEL, prompt=prompt, config=_image_config()),
+            )
 
-        return image_bytes
+    try:
+        response = await get_policy("image", IMAGE_MODEL, LLM_IMAGE_TIMEOUT_SECONDS).call(call)
+        return _image_bytes(response)
+    except asyncio.TimeoutError as e:
+        raise ImageGenerationError(message="Timed out while generating image.", status_code=504) from e
     except ClientError as e:
         status_code = getattr(e, "status_code", 400)
         message = str(e)
         raise ImageGenerationError(message=message, status_code=status_code) from e
+    except APIError as e:
+        raise ImageGenerationError(message=str(e), status_code=502) from e
+
+
+async def generate_daily_page_async(
+    year_group: int, subject: str, topic_idea: str = ""
+) -> GeneratedDailyPage:
+    """
+    Generates the lesson and its quiz in one structured-output call, saving the
+    second round trip and the re-upload of the lesson text as quiz context.
+    """
+
+    key = (year_group, _normalize(subject), _normalize(topic_idea))
+    return await daily_page_flight.do(
+        key, lambda: _generate_daily_page_async(year_group, subject, topic_idea)
+    )
+
+
+async def _generate_daily_page_async(
+    year_group: int, subject: str, topic_idea: str
+) -> GeneratedDailyPage:
+    provider = get_provider()
+    contents = _daily_page_contents(year_group, subject, topic_idea)
+    limiter = get_limiter(LESSON_MODEL)
+    estimated = _request_tokens("daily_page", contents)
+
+    async def call():
+        async with _slot("daily_page", limiter, estimated):
+            return await _timed_call(
+                "daily_page",
+                LESSON_MODEL,
+                _with_cached_prefix(
+                    provider.generate_content, LESSON_MODEL, contents, _daily_page_config()
+                ),
+            )
+
+    try:
+        response = await get_policy("daily_page", LESSON_MODEL).call(call)
+        limiter.record_usage(estimated, _usage_tokens(response))
+        record_usage("daily_page", LESSON_MODEL, _usage(response))
+        return await _parse_or_correct(
+            "daily_page",
+            LESSON_MODEL,
+            contents,
+            _daily_page_config(),
+            response.text,
+            GeneratedDailyPage,
+            json_repair.normalize_daily_page,
+        )
+    except (RateLimitError, UpstreamUnavailableError):
+        raise
+    except asyncio.TimeoutError as e:
+        raise LessonGenerationError(
+            message="Timed out while generating daily page.",
+            status_code=504,
+        ) from e
+    except ClientError as e:
+        raise LessonGenerationError(
+            message=str(e),
+            status_code=getattr(e, "status_code", 502),
+        ) from e
+
+    except Exception as e:
+        raise LessonGenerationError(
+            message="Unexpected error while generating daily page.",
+            status_code=502,
+        ) from e
+
+
+async def generate_daily_lesson_stream(
+    year_group: int, subject: str, topic_idea: str = ""
+) -> AsyncIterator[str]:
+    """Streams the raw lesson JSON text as the model generates it."""
+
+    provider = get_provider()
+    contents = _lesson_contents(year_group, subject, topic_idea)
+    limiter = get_limiter(LESSON_MODEL)
+    estimated = _request_tokens("lesson_stream", contents)
+
+    try:
+        # The slot is held for the whole stream, as the call is in flight until it ends.
+        async with _slot("lesson_stream", limiter, estimated):
+            # Retries and the breaker cover opening the stream; once text has
+            # been sent to the client a failure can no longer be retried.
+            with stage("lesson_stream", "open_stream"):
+                stream = await get_policy("lesson_stream", LESSON_MODEL).call(
+                    lambda: _timed_call(
+                        "lesson_stream",
+                        LESSON_MODEL,
+                        _with_cached_prefix(
+                            provider.generate_content_stream, LESSON_MODEL, contents
+                        ),
+                    )
+                )
+            usage = None
+            with stage("lesson_stream", "stream"):
+                async for chunk in stream:
+                    usage = _usage(chunk) or usage
+                    if chunk.text:
+                        yield chunk.text
+        limiter.record_usage(estimated, getattr(usage, "total_token_count", None))
+        record_usage("lesson_stream", LESSON_MODEL, usage)
+    except (RateLimitError, UpstreamUnavailableError):
+        raise
+    except ClientError as e:
+        raise LessonGenerationError(
+            message=str(e),
+            status_code=getattr(e, "status_code", 502),
+        ) from e
+
+    except Exception as e:
+        raise LessonGenerationError(
+            message="Unexpected error while generating lesson.",
+            status_code=502,
+        ) from e
@@ -0,0 +1,197 @@
+"""
+Tolerant parsing of JSON returned by the model.
+
+Most malformed responses fail for mechanical reasons: a markdown code fence
+around the object, a sentence before or after it, a trailing comma, or the
+closing brackets missing at the end. ``loads`` undoes those and reports what
+it changed. The ``normalize_*`` functions then fix quiz questions that are
+almost right (labelled or keyed options, more than four options, an answer
+given as text) before Pydantic validates the result.
+
+Anything that would mean guessing at content is left alone: a response cut
+off inside a string, or a question with fewer than four options, still
+raises, and the caller asks the model for a correction instead.
+"""
+
+import json
+import re
+from typing import Any
+
+OPTION_KEYS = "ABCD"
+
+_decoder = json.JSONDecoder()
+_FENCE = re.compile(r"```[A-Za-z]*[ \t]*\n?(.*?)(?:```|\Z)", re.S)
+_CLOSERS = {"{": "}", "[": "]"}
+# "A) ...", "(b) ...", "C. ...", "D: ..."
+_OPTION_LABEL = re.compile(r"^\s*\(?([A-Za-z])[).:]\s+")
+# "A", "a)", "(C)", "Option D"
+_KEY_FORMS = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\)?[.:]?\s*$", re.I)
+
+
+def _close_structure(text: str) -> tuple[str, list[str]]:
+    """
+    Drop trailing commas and close brackets left open at the end of the text.
+    Raises ValueError if the text ends inside a string.
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    repairs: list[str] = []
+    in_string = escape = False
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                repairs.append("trailing_comma")
+            if stack:
+                stack.pop()
+        out.append(ch)
+        if not stack and ch in "}]":
+            break
+
+    if in_string:
+        raise ValueError("The response was cut off inside a string.")
+    if stack:
+        while out and (out[-1].isspace() or out[-1] == ","):
+            out.pop()
+        out.extend(reversed(stack))
+        repairs.append("unclosed_brackets")
+    return "".join(out), repairs
+
+
+def loads(text: str) -> tuple[Any, list[str]]:
+    """
+    Parse ``text`` as JSON, repairing it if needed. Returns the value and the
+    list of repairs applied (empty when the text was valid as it stood).
+    Raises ValueError when the text cannot be salvaged.
+    """
+    try:
+        return json.loads(text), []
+    except (json.JSONDecodeError, TypeError):
+        pass
+    if not isinstance(text, str):
+        raise ValueError("The response has no text.")
+
+    repairs = []
+    s = text.strip().lstrip("\ufeff")
+    fence = _FENCE.search(s)
+    if fence:
+        s = fence.group(1).strip()
+        repairs.append("code_fence")
+
+    start = min((i for i in (s.find("{"), s.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("No JSON object in the response.")
+    if start:
+        repairs.append("leading_text")
+        s = s[start:]
+
+    try:
+        value, end = _decoder.raw_decode(s)
+    except json.JSONDecodeError:
+        s, fixes = _close_structure(s)
+        repairs.extend(fixes)
+        try:
+            value, end = _decoder.raw_decode(s)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON returned by LLM: {e}") from e
+    if s[end:].strip():
+        repairs.append("trailing_text")
+    return value, repairs
+
+
+def _answer_key(answer: str, options: Any) -> str | None:
+    form = _KEY_FORMS.match(answer)
+    if form:
+        return form.group(1).upper()
+    if isinstance(options, list):
+        wanted = answer.strip().casefold()
+        for index, option in enumerate(options[: len(OPTION_KEYS)]):
+            if isinstance(option, str) and option.strip().casefold() == wanted:
+                return OPTION_KEYS[index]
+    return None
+
+
+def normalize_question(question: Any, repairs: list[str]) -> Any:
+    if not isinstance(question, dict):
+        return question
+    q = dict(question)
+
+    options = q.get("options")
+    if isinstance(options, dict):
+        options = [options[k] for k in sorted(options)]
+        repairs.append("options_mapping")
+    if isinstance(options, list) and options and all(isinstance(o, str) for o in options):
+        labels = [_OPTION_LABEL.match(o) for o in options]
+        if all(m and m.group(1).upper() == chr(65 + i) for i, m in enumerate(labels)):
+            options = [o[m.end():] for o, m in zip(options, labels)]
+            repairs.append("option_labels")
+
+    # Earlier quiz prompts asked for "correct_answer"; accept it by that name too.
+    if "correct_key" not in q and "correct_answer" in q:
+        q["correct_key"] = q.pop("correct_answer")
+        repairs.append("correct_key_name")
+    key = q.get("correct_key")
+    if isinstance(key, str) and key not in OPTION_KEYS:
+        fixed = _answer_key(key, options)
+        if fixed is not None:
+            q["correct_key"] = key = fixed
+            repairs.append("correct_key")
+
+    # Extra options can go as long as the right answer is among the first four.
+    if isinstance(options, list) and len(options) > len(OPTION_KEYS) and key in OPTION_KEYS:
+        options = options[: len(OPTION_KEYS)]
+        repairs.append("options_length")
+
+    if options is not None:
+        q["options"] = options
+    return q
+
+
+def normalize_quiz(data: Any, repairs: list[str]) -> Any:
+    if isinstance(data, list):
+        data = {"quiz_questions": data}
+        repairs.append("bare_list")
+    if isinstance(data, dict) and isinstance(data.get("quiz_questions"), list):
+        data = {
+            **data,
+            "quiz_questions": [normalize_question(q, repairs) for q in data["quiz_questions"]],
+        }
+    return data
+
+
+def normalize_daily_page(data: Any, repairs: list[str]) -> Any:
+    if isinstance(data, dict) and isinstance(data.get("quiz_questions"), list):
+        data = {
+            **data,
+            "quiz_questions": [normalize_question(q, repairs) for q in data["quiz_questions"]],
+        }
+    return data
+
+
+def describe_error(error: Exception, limit: int = 5) -> str:
+    """A short account of why a response was rejected, for the correction prompt."""
+    errors = getattr(error, "errors", None)
+    if callable(errors):
+        problems = [
+            f"{'.'.join(str(p) for p in e['loc']) or 'response'}: {e['msg']}"
+            for e in errors(include_url=False)[:limit]
+        ]
+        return "; ".join(problems)
+    return str(error)
@@ -0,0 +1,141 @@
+"""
+Prompt token budgets and extractive condensation of lesson text.
+
+The quiz prompt carries the whole lesson, although three questions need far
+less of it. LLM_PROMPT_TOKEN_BUDGETS caps the estimated prompt size per
+endpoint, as a JSON object such as ``{"quiz": 1500}``; a missing or zero
+budget means no cap. When a prompt would exceed its budget the lesson text is
+condensed: sentences are scored by how many of the lesson's recurring content
+words they contain, and the best ones are kept, in their original order,
+until the budget is filled.
+
+Token counts here are estimates from rate_limiter.estimate_tokens, the same
+figure the rate limiter budgets with.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from llm_core.rate_limiter import estimate_tokens
+
+DEFAULT_PROMPT_TOKEN_BUDGETS = {"quiz": 1500}
+# A condensed lesson never goes below this, whatever the fixed prompt costs.
+MIN_TEXT_TOKENS = 200
+
+_STOP_WORDS = frozenset(
+    """
+    a about above after again all also an and any are as at be because been before being
+    below between both but by can could did do does doing down during each few for from
+    further had has have having he her here hers him his how i if in into is it its itself
+    just let lets like me more most much my no nor not now of off on once only or other our
+    ours out over own same she should so some such than that the their theirs them then there
+    these they this those through to too under until up us very was we were what when where
+    which while who whom why will with would you your yours
+    """.split()
+)
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def _load_budgets() -> dict[str, int]:
+    budgets = dict(DEFAULT_PROMPT_TOKEN_BUDGETS)
+    raw = os.getenv("LLM_PROMPT_TOKEN_BUDGETS")
+    if raw:
+        budgets.update({k: int(v) for k, v in json.loads(raw).items()})
+    return budgets
+
+
+PROMPT_TOKEN_BUDGETS = _load_budgets()
+
+
+def get_prompt_budget(endpoint: str) -> Optional[int]:
+    return PROMPT_TOKEN_BUDGETS.get(endpoint) or None
+
+
+@dataclass(frozen=True)
+class CondensedText:
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def _sentences(text: str) -> list[tuple[int, int, str]]:
+    """
+    (paragraph, line, sentence) triples; list items and headings on their own
+    line count as sentences.
+    """
+    units = []
+    for p_index, paragraph in enumerate(re.split(r"\n\s*\n", text)):
+        for l_index, line in enumerate(paragraph.splitlines()):
+            for sentence in _SENTENCE_END.split(line.strip()):
+                if sentence.strip():
+                    units.append((p_index, l_index, sentence.strip()))
+    return units
+
+
+def _content_words(sentence: str) -> list[str]:
+    return [w for w in _WORD.findall(sentence.lower()) if len(w) > 2 and w not in _STOP_WORDS]
+
+
+def condense_text(text: str, max_tokens: int) -> CondensedText:
+    """
+    Keep the most informative sentences of ``text`` within ``max_tokens``
+    (estimated), in their original order. Text already within budget is
+    returned unchanged.
+    """
+    original = estimate_tokens(text)
+    max_tokens = max(max_tokens, MIN_TEXT_TOKENS)
+    if original <= max_tokens:
+        return CondensedText(text, original, original)
+
+    # estimate_tokens is len // 4 + 1, so this many characters fit.
+    max_chars = (max_tokens - 1) * 4
+    units = _sentences(text)
+    words = [_content_words(sentence) for _, _, sentence in units]
+    frequency = Counter(w for sentence_words in words for w in set(sentence_words))
+
+    def score(i: int) -> float:
+        distinct = set(words[i])
+        if not distinct:
+            return 0.0
+        # Mean frequency rewards sentences about the lesson's recurring topics;
+        # the bonus keeps each paragraph's opening sentence in contention.
+        opening = i == 0 or units[i - 1][0] != units[i][0]
+        return sum(frequency[w] for w in distinct) / len(distinct) * (1.25 if opening else 1.0)
+
+    chosen, used = set(), 0
+    for i in sorted(range(len(units)), key=lambda i: (-score(i), i)):
+        cost = len(units[i][2]) + 2
+        if used + cost <= max_chars:
+            chosen.add(i)
+            used += cost
+
+    # Rejoin with the separators the sentences had: a space within a line,
+    # a newline between lines, a blank line between paragraphs.
+    parts: list[str] = []
+    previous = None
+    for i in sorted(chosen):
+        paragraph, line, sentence = units[i]
+        if previous is not None:
+            if paragraph != previous[0]:
+                parts.append("\n\n")
+            elif line != previous[1]:
+                parts.append("\n")
+            else:
+                parts.append(" ")
+        parts.append(sentence)
+        previous = (paragraph, line)
+    condensed = "".join(parts)
+
+    if not condensed:
+        # One sentence longer than the whole budget: cut it at a word boundary.
+        condensed = text[:max_chars].rsplit(" ", 1)[0]
+    return CondensedText(condensed, original, estimate_tokens(condensed))
@@ -1,3 +1,6 @@
+import hashlib
+
+
 # 1. System Instruction (Persona and Rules)
 def get_system_instructions(year_group: int, subject: str) -> str:
     """Return system instructions"""
@@ -47,3 +50,74 @@ def get_quiz_system_instruction(year_group) -> str:
     Year '{year_group}' student. You MUST return the output as a valid JSON object that strictly adheres
     to the provided schema.
     """
+
+
+def get_quiz_request_template(lesson_text: str) -> str:
+    return f"""
+    Please generate 3 questions based on the following lesson text:
+
+    --- LESSON TEXT ---
+    {lesson_text}
+    --- END LESSON TEXT ---
+
+    Give each question exactly 4 options, and set 'correct_key' to the key
+    ('A', 'B', 'C' or 'D') of the correct option.
+    """
+
+
+def get_correction_prompt(problem: str) -> str:
+    return f"""
+    Your previous response could not be used: {problem}
+    Return the complete corrected JSON object only, with no markdown or other text.
+    """
+
+
+def get_daily_page_request_template(
+    year_group: int, subject: str, topic_idea: str | None = None
+) -> str:
+    topic_line = (
+        f'The lesson must focus specifically on "{topic_idea}".' if topic_idea else ""
+    )
+
+    return f"""
+        You are generating a daily page for a learning application: a lesson
+        and a short quiz on that lesson, returned together.
+
+        Generate a lesson on one specific sub-topic within {subject}
+        suitable for a Year {year_group} student.
+        {topic_line}
+
+        Rules:
+        - lesson_text should be the full lesson content.
+        - visual_prompt must be a concise text-to-image prompt (max 50 words).
+        - quiz_questions must contain exactly 3 multiple-choice questions based
+          ONLY on lesson_text, each with 4 options and correct_key set to the
+          key ('A', 'B', 'C' or 'D') of the correct option.
+        - Return a valid JSON object that strictly adheres to the provided schema.
+        """
+
+
+# 3. Prompt versions
+# A short fingerprint of the rendered templates. Anything cached from a prompt
+# should include its version in the key so editing a template invalidates it.
+def _fingerprint(*rendered: str) -> str:
+    return hashlib.sha256("\x1f".join(rendered).encode("utf-8")).hexdigest()[:16]
+
+
+def get_lesson_prompt_version() -> str:
+    return _fingerprint(
+        get_system_instructions(0, "{subject}"),
+        get_lesson_request_template(0, "{subject}", "{topic_idea}"),
+        get_lesson_request_template(0, "{subject}"),
+    )
+
+
+def get_quiz_prompt_version() -> str:
+    return _fingerprint(
+        get_quiz_system_instruction("{year_group}"),
+        get_quiz_request_template("{lesson_text}"),
+    )
+
+
+LESSON_PROMPT_VERSION = get_lesson_prompt_version()
+QUIZ_PROMPT_VERSION = get_quiz_prompt_version()
@@ -0,0 +1,371 @@
+"""
+LLM providers behind the generation functions in generation_service.
+
+A provider exposes the three calls the app makes, with the same signatures
+and response types as the google-genai async client (``client.aio.models``):
+``generate_content``, ``generate_content_stream`` and ``generate_images``.
+Everything above them (rate limits, retries, the circuit breaker, parsing)
+runs unchanged whichever provider is selected.
+
+LLM_PROVIDER picks the provider:
+
+- ``gemini``: the Gemini API (needs GEMINI_API_KEY).
+- ``local`` (default): an in-process stand-in that returns realistic canned
+  payloads without network access. By default it answers instantly; set the
+  LOCAL_LLM_* variables to give it latency, errors and token counts that look
+  like the real upstream for capacity testing.
+
+Providers may also offer ``create_cached_content`` for the context caching
+in llm_core/context_cache.py; the stand-in emulates it, including expiry.
+"""
+
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+from google.genai.errors import ClientError, ServerError
+
+from app.exceptions import ConfigurationError
+from app.models.daily_page_models import GeneratedDailyPage
+from app.models.quiz_models import GeneratedQuiz
+from llm_core.rate_limiter import estimate_tokens
+from testing.testing_data import TEST_IMAGE_BASE64, TEST_LESSON_OUTPUT, TEST_QUIZ_DATA_PERFECT
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "local").lower()
+# The Gemini API refuses cached contents smaller than this.
+LLM_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("LLM_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+_client = None
+
+
+def get_genai_client():
+    global _client
+
+    if _client is not None:
+        return _client
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ConfigurationError(
+            "GOOGLE_API_KEY is not set",
+            status_code=503,
+        )
+
+    _client = genai.Client(api_key=api_key)
+    return _client
+
+
+class GeminiProvider:
+    name = "gemini"
+    min_cache_tokens = LLM_CONTEXT_CACHE_MIN_TOKENS
+
+    async def generate_content(self, model: str, contents: list, config=None):
+        return await get_genai_client().aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+
+    async def generate_content_stream(self, model: str, contents: list, config=None):
+        return await get_genai_client().aio.models.generate_content_stream(
+            model=model, contents=contents, config=config
+        )
+
+    async def generate_images(self, model: str, prompt: str, config=None):
+        return await get_genai_client().aio.models.generate_images(
+            model=model, prompt=prompt, config=config
+        )
+
+    async def create_cached_content(self, model: str, system_instruction: str, ttl_seconds: float):
+        return await get_genai_client().aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                ttl=f"{int(ttl_seconds)}s",
+                display_name="learning-assistant-system-prompt",
+            ),
+        )
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Log-normal latency given by its median and p95, in milliseconds. A p95
+    at or below the median means a fixed latency.
+    """
+
+    median_ms: float = 0.0
+    p95_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        if self.p95_ms <= self.median_ms:
+            return self.median_ms / 1000
+        # p95 = median * exp(1.645 * sigma)
+        sigma = math.log(self.p95_ms / self.median_ms) / 1.645
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+@dataclass
+class LocalProfile:
+    text_latency: LatencyProfile = field(default_factory=LatencyProfile)
+    image_latency: LatencyProfile = field(default_factory=LatencyProfile)
+    # Share of streamed text latency spent before the first chunk arrives.
+    first_chunk_share: float = 0.3
+    stream_chunk_chars: int = 64
+    # Share of calls failing with a retryable 503, and with a 429.
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Share of text responses returned fenced in markdown with the closing
+    # brace missing, as models occasionally do; see llm_core/json_repair.py.
+    malformed_rate: float = 0.0
+    # Output tokens reported in usage; 0 means estimate from the payload.
+    output_tokens: int = 0
+    # Smallest cached context accepted, the real API's minimum by default, so
+    # prompts too short to cache upstream are not reported as cache savings.
+    cache_min_tokens: int = LLM_CONTEXT_CACHE_MIN_TOKENS
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "LocalProfile":
+        seed = os.getenv("LOCAL_LLM_SEED")
+        return cls(
+            text_latency=LatencyProfile(
+                _env_float("LOCAL_LLM_LATENCY_MS", 0), _env_float("LOCAL_LLM_LATENCY_P95_MS", 0)
+            ),
+            image_latency=LatencyProfile(
+                _env_float("LOCAL_LLM_IMAGE_LATENCY_MS", 0),
+                _env_float("LOCAL_LLM_IMAGE_LATENCY_P95_MS", 0),
+            ),
+            first_chunk_share=_env_float("LOCAL_LLM_FIRST_CHUNK_SHARE", 0.3),
+            error_rate=_env_float("LOCAL_LLM_ERROR_RATE", 0),
+            rate_limit_rate=_env_float("LOCAL_LLM_RATE_LIMIT_RATE", 0),
+            malformed_rate=_env_float("LOCAL_LLM_MALFORMED_RATE", 0),
+            output_tokens=int(os.getenv("LOCAL_LLM_OUTPUT_TOKENS", "0")),
+            cache_min_tokens=int(
+                os.getenv("LOCAL_LLM_CACHE_MIN_TOKENS", str(LLM_CONTEXT_CACHE_MIN_TOKENS))
+            ),
+            seed=int(seed) if seed else None,
+        )
+
+
+def _lesson_payload() -> str:
+    return TEST_LESSON_OUTPUT
+
+
+def _quiz_payload() -> str:
+    return json.dumps({"quiz_questions": TEST_QUIZ_DATA_PERFECT})
+
+
+def _daily_page_payload() -> str:
+    return json.dumps({**json.loads(TEST_LESSON_OUTPUT), "quiz_questions": TEST_QUIZ_DATA_PERFECT})
+
+
+class LocalProvider:
+    """
+    In-process stand-in for the Gemini API.
+
+    Returns the canned lesson, quiz or daily page payload matching the
+    request's response schema, after a sampled latency, and fails a
+    configurable share of calls with the same error types the SDK raises.
+    Cached contents are kept in memory until their TTL passes; calls naming
+    one report its tokens as cached, and calls naming an unknown or expired
+    one fail with a 404 as the API does.
+    """
+
+    name = "local"
+
+    def __init__(self, profile: Optional[LocalProfile] = None):
+        self.profile = profile or LocalProfile()
+        self.min_cache_tokens = self.profile.cache_min_tokens
+        self._rng = random.Random(self.profile.seed)
+        # name -> (tokens, expires_at)
+        self._cached_contents: dict[str, tuple[int, float]] = {}
+        self._cache_seq = 0
+        self.calls = 0
+        self.errors = 0
+        self.malformed = 0
+        self.cache_hits = 0
+
+    def _payload(self, config) -> str:
+        schema = getattr(config, "response_schema", None)
+        if schema is GeneratedQuiz:
+            text = _quiz_payload()
+        elif schema is GeneratedDailyPage:
+            text = _daily_page_payload()
+        else:
+            text = _lesson_payload()
+        if self._rng.random() < self.profile.malformed_rate:
+            self.malformed += 1
+            text = "```json\n" + text.rstrip().removesuffix("}")
+        return text
+
+    def _maybe_fail(self) -> None:
+        roll = self._rng.random()
+        if roll < self.profile.rate_limit_rate:
+            self.errors += 1
+            raise ClientError(
+                429,
+                {"error": {"code": 429, "message": "Resource exhausted.", "status": "RESOURCE_EXHAUSTED"}},
+            )
+        if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            self.errors += 1
+            raise ServerError(
+                503,
+                {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}},
+            )
+
+    async def create_cached_content(self, model: str, system_instruction: str, ttl_seconds: float):
+        tokens = estimate_tokens(system_instruction)
+        if tokens < self.min_cache_tokens:
+            raise ClientError(
+                400,
+                {"error": {"code": 400, "message": "Cached content is too small.", "status": "INVALID_ARGUMENT"}},
+            )
+        self._cache_seq += 1
+        name = f"cachedContents/local-{self._cache_seq}"
+        expires_at = time.time() + ttl_seconds
+        self._cached_contents[name] = (tokens, expires_at)
+        return types.CachedContent(
+            name=name,
+            model=model,
+            expire_time=datetime.fromtimestamp(expires_at, timezone.utc),
+            usage_metadata=types.CachedContentUsageMetadata(total_token_count=tokens),
+        )
+
+    def _cached_tokens(self, config) -> int:
+        name = getattr(config, "cached_content", None)
+        if not name:
+            return 0
+        tokens, expires_at = self._cached_contents.get(name, (0, 0.0))
+        if expires_at <= time.time():
+            self._cached_contents.pop(name, None)
+            raise ClientError(
+                404,
+                {"error": {"code": 404, "message": f"{name} not found.", "status": "NOT_FOUND"}},
+            )
+        self.cache_hits += 1
+        return tokens
+
+    def _usage(
+        self, contents: list, text: str, cached_tokens: int = 0
+    ) -> types.GenerateContentResponseUsageMetadata:
+        prompt = [part["text"] for content in contents for part in content["parts"]]
+        # As with the API, prompt_token_count includes the cached tokens.
+        prompt_tokens = estimate_tokens(*prompt) + cached_tokens
+        output_tokens = self.profile.output_tokens or estimate_tokens(text)
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens or None,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    @staticmethod
+    def _response(text: str, usage=None) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))
+            ],
+            usage_metadata=usage,
+        )
+
+    async def generate_content(self, model: str, contents: list, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.profile.text_latency.sample(self._rng))
+        self._maybe_fail()
+        cached_tokens = self._cached_tokens(config)
+        text = self._payload(config)
+        return self._response(text, self._usage(contents, text, cached_tokens))
+
+    async def generate_content_stream(self, model: str, contents: list, config=None):
+        self.calls += 1
+        latency = self.profile.text_latency.sample(self._rng)
+        first_chunk = latency * self.profile.first_chunk_share
+        await asyncio.sleep(first_chunk)
+        self._maybe_fail()
+        cached_tokens = self._cached_tokens(config)
+
+        text = self._payload(config)
+        size = max(1, self.profile.stream_chunk_chars)
+        pieces = [text[i : i + size] for i in range(0, len(text), size)]
+        gap = (latency - first_chunk) / max(1, len(pieces) - 1)
+
+        async def chunks() -> AsyncIterator[types.GenerateContentResponse]:
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(gap)
+                last = index == len(pieces) - 1
+                yield self._response(
+                    piece, self._usage(contents, text, cached_tokens) if last else None
+                )
+
+        return chunks()
+
+    async def generate_images(self, model: str, prompt: str, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.profile.image_latency.sample(self._rng))
+        self._maybe_fail()
+        return types.GenerateImagesResponse(
+            generated_images=[
+                types.GeneratedImage(
+                    image=types.Image(
+                        image_bytes=base64.b64decode(TEST_IMAGE_BASE64), mime_type="image/svg+xml"
+                    )
+                )
+            ]
+        )
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "malformed": self.malformed,
+            "cached_contents": len(self._cached_contents),
+            "cache_hits": self.cache_hits,
+        }
+
+
+_provider = None
+
+
+def create_provider(name: str):
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "local":
+        return LocalProvider(LocalProfile.from_env())
+    raise ConfigurationError(f"Unknown LLM_PROVIDER {name!r}.", status_code=503)
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = create_provider(LLM_PROVIDER)
+    return _provider
+
+
+def get_provider_stats() -> dict:
+    provider = get_provider()
+    stats = provider.stats() if hasattr(provider, "stats") else {}
+    return {"name": provider.name, **stats}
+
+
+def set_provider(provider) -> None:
+    """Replace the active provider, e.g. with a LocalProvider in load tests."""
+    global _provider
+    _provider = provider
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from app.exceptions import RateLimitError
+
+# Per-model budgets. Override with LLM_RATE_LIMITS, a JSON object of
+# {"<model>": {"rpm": ..., "tpm": ..., "max_in_flight": ...}}. A missing or
+# zero rpm/tpm means that dimension is not limited.
+DEFAULT_MODEL_LIMITS = {
+    "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000, "max_in_flight": 64},
+    "imagen-4.0-generate-001": {"rpm": 20, "tpm": 0, "max_in_flight": 8},
+}
+DEFAULT_LIMITS = {"rpm": 60, "tpm": 0, "max_in_flight": 16}
+
+# Requests waiting for budget beyond this are rejected immediately with a 429.
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+# How long a queued request may wait for budget before giving up with a 429.
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token estimate (about 4 characters per token) for budgeting."""
+    return sum(len(t) for t in texts) // 4 + 1
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute`` units per minute up to one minute's worth."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        self._refill()
+        # A single request larger than the bucket only waits for a full bucket.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        # May go negative, e.g. when actual usage exceeds the estimate; later
+        # requests then wait for the debt to be repaid.
+        self._refill()
+        self.tokens -= amount
+
+
+class ModelLimiter:
+    """
+    Shared request budget for one model: RPM and TPM token buckets plus a cap
+    on concurrent in-flight calls.
+
+    Callers queue in FIFO order for at most ``queue_timeout`` seconds. When
+    ``max_queue`` callers are already waiting, or the budget cannot be met
+    before the deadline, a RateLimitError (429) with a Retry-After hint is
+    raised instead of piling up more work.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_in_flight: int = 16,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.model = model
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _budget_wait(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def _reject(self, reason: str, retry_after: float) -> RateLimitError:
+        self.rejected += 1
+        return RateLimitError(
+            f"{self.model} is over its request budget ({reason}); retry later.",
+            retry_after=max(1, math.ceil(retry_after)),
+        )
+
+    async def _wait_until(self, acquire: Callable, deadline: float, reason: str):
+        remaining = deadline - self._clock()
+        if remaining <= 0:
+            raise self._reject(reason, self.queue_timeout)
+        try:
+            return await asyncio.wait_for(acquire(), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise self._reject(reason, self.queue_timeout) from None
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0) -> AsyncIterator["ModelLimiter"]:
+        """Wait for a slot and budget for one call estimated at ``tokens`` tokens."""
+        if self.waiting >= self.max_queue:
+            raise self._reject("queue full", self.queue_timeout)
+
+        self.waiting += 1
+        deadline = self._clock() + self.queue_timeout
+        slot_acquired = False
+        try:
+            await self._wait_until(self._lock.acquire, deadline, "queue timeout")
+            try:
+                await self._wait_until(self._slots.acquire, deadline, "max in flight")
+                slot_acquired = True
+
+                wait = self._budget_wait(tokens)
+                if wait > deadline - self._clock():
+                    raise self._reject("rate limit", wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                if self.requests is not None:
+                    self.requests.consume(1)
+                if self.tokens is not None and tokens:
+                    self.tokens.consume(tokens)
+            finally:
+                self._lock.release()
+        except BaseException:
+            if slot_acquired:
+                self._slots.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Charge the TPM bucket for the difference between actual and estimated usage."""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def _configured_limits() -> dict:
+    limits = {model: dict(budget) for model, budget in DEFAULT_MODEL_LIMITS.items()}
+    override = os.getenv("LLM_RATE_LIMITS")
+    if override:
+        for model, budget in json.loads(override).items():
+            limits.setdefault(model, dict(DEFAULT_LIMITS)).update(budget)
+    return limits
+
+
+_limiters: dict[str, ModelLimiter] = {}
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    limiter = _limiters.get(model)
+    if limiter is None:
+        budget = {**DEFAULT_LIMITS, **_configured_limits().get(model, {})}
+        limiter = ModelLimiter(
+            model,
+            rpm=budget["rpm"],
+            tpm=budget["tpm"],
+            max_in_flight=budget["max_in_flight"],
+        )
+        _limiters[model] = limiter
+    return limiter
+
+
+def get_limiter_stats() -> dict:
+    return {model: limiter.stats() for model, limiter in _limiters.items()}
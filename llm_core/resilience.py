@@ -0,0 +1,259 @@
+import asyncio
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from google.genai.errors import ClientError, ServerError
+
+from app.exceptions import RateLimitError, UpstreamUnavailableError
+
+T = TypeVar("T")
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_IMAGE_TIMEOUT_SECONDS = float(os.getenv("LLM_IMAGE_TIMEOUT_SECONDS", "120"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Hedging sends a second identical request when the first is slower than the
+# recent p95, trading some extra upstream calls for a shorter tail.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Upstream status codes worth retrying: timeouts and rate limiting.
+RETRYABLE_CLIENT_CODES = {408, 429}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for transient upstream failures: timeouts, 5xx, 408/429 and transport errors."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(exc, ServerError):
+        return True
+    if isinstance(exc, ClientError):
+        return getattr(exc, "code", None) in RETRYABLE_CLIENT_CODES
+    return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the breaker
+    opens and calls fail fast with UpstreamUnavailableError (503). Once
+    ``reset_timeout`` seconds have passed a single probe call is let through
+    (half-open); its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURES,
+        reset_timeout: float = LLM_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise UpstreamUnavailableError(
+                    f"{self.name} is temporarily unavailable.",
+                    retry_after=max(1, math.ceil(remaining)),
+                )
+            self.state = "half_open"
+            self._probe_in_flight = False
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise UpstreamUnavailableError(
+                    f"{self.name} is recovering; retry shortly.", retry_after=1
+                )
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """The call ended without an upstream answer; let the next call probe."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = self._clock()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+
+class UpstreamPolicy:
+    """
+    Timeout, retry and hedging policy for one kind of upstream call, guarded
+    by the circuit breaker of the model it calls.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        hedge: bool = LLM_HEDGE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedged = 0
+        self.timeouts = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(95)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                result = await self._attempt(fn)
+            except (RateLimitError, UpstreamUnavailableError):
+                # Raised locally (our rate limiter): says nothing about the upstream.
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; this is not a health problem.
+                    self.breaker.record_success()
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+            except BaseException:
+                # Cancelled, e.g. a streaming client went away mid-probe.
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                self.latency.record(time.monotonic() - started)
+                return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and delay < self.timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(fn()))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait(
+                    tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Whichever request lost the race (or everything, on timeout) is cancelled.
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "timeouts": self.timeouts,
+            "p95_seconds": self.latency.percentile(95),
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_policies: dict[str, UpstreamPolicy] = {}
+
+
+def get_policy(name: str, model: str, timeout: float = LLM_TIMEOUT_SECONDS) -> UpstreamPolicy:
+    """Policy for one kind of call; calls to the same model share a circuit breaker."""
+    policy = _policies.get(name)
+    if policy is None:
+        breaker = _breakers.setdefault(model, CircuitBreaker(model))
+        policy = UpstreamPolicy(name, breaker, timeout=timeout)
+        _policies[name] = policy
+    return policy
+
+
+def get_resilience_stats() -> dict:
+    return {name: policy.stats() for name, policy in _policies.items()}
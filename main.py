@@ -1,114 +1,98 @@
-import re
-from llm_core.generation_service import generate_daily_lesson, generate_quiz_from_lesson
-from testing.testing_data import *
+"""
+Overnight curriculum pre-generation.
 
+Generates lessons, quizzes and optionally images for a matrix of year groups,
+subjects and topic ideas, so the caches are warm before school hours. Enable
+the persistent cache tier (LEARNING_ASSISTANT_CACHE_DB) so results outlive this
+process; re-running with the same --checkpoint file resumes after a crash.
 
-RUN_LIVE_LLM_LESSON_GENERATION = False
+Examples:
 
+    python main.py --year-groups 7 8 9 --subjects Maths Science --topics "" fractions
+    python main.py --matrix curriculum.json --concurrency 8 --rpm 120 --images
+"""
 
-def parse_lesson_output(lesson_text: str) -> dict:
-    """
-    Parses the lesson string output based on the rigid tags used in the prompt.
-    Uses non-greedy matching to capture content accurately between tags.
-    """
-    data = {}
+import argparse
+import asyncio
+import json
+import os
+
+from services.pregeneration import build_jobs, pregenerate
+from app.cache_db import CACHE_DB_PATH
+from app.logging_config import configure_logging
 
-    # 1. Title Match: Capture everything after **TITLE:** and before the next **BODY:** tag.
-    # We use a non-greedy match (.*?) to stop before the next tag.
-    title_match = re.search(
-        r"\*\*TITLE:\*\*\s*(.*?)\s*\*\*BODY:\*\*", lesson_text, re.DOTALL
-    )
-    if title_match:
-        data["title"] = title_match.group(1).strip()
 
-    # 2. Body Match: Capture everything after **BODY:** and before **VISUAL-PROMPT:**
-    # We are flexible with any characters (including newlines) between them.
-    body_match = re.search(
-        r"\*\*BODY:\*\*\s*(.*?)\s*\*\*VISUAL-PROMPT:\*\*", lesson_text, re.DOTALL
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pre-generate lessons and quizzes.")
+    parser.add_argument(
+        "--matrix",
+        help='JSON file with "year_groups", "subjects" and optional "topic_ideas" lists.',
     )
-    if body_match:
-        # The body often contains trailing Markdown elements (like the '---' you noticed).
-        # We perform one extra strip to remove common tail noise like '---' or newlines.
-        data["body"] = body_match.group(1).strip().strip("---").strip()
-
-    # 3. Visual Prompt Match: Capture everything after **VISUAL-PROMPT:** to the end of the text.
-    visual_match = re.search(r"\*\*VISUAL-PROMPT:\*\*\s*(.*)$", lesson_text, re.DOTALL)
-    if visual_match:
-        data["visual_prompt"] = visual_match.group(1).strip()
-
-    # Fallback to handle malformed output where a tag is completely missing
-    if not all(k in data for k in ["title", "body", "visual_prompt"]):
-        print("Warning: One or more tags were not found. Falling back to simple split.")
-        # You could add your simple split fallback here if necessary, but the regex should handle most cases.
-    return data
-
-
-# --- MAIN WORKFLOW ---
-def run_tutor_workflow():
-    print(f"--- Running AI Tutor for {TEST_YEAR} {TEST_SUBJECT} ---")
-
-    # 1. Lesson Generation (or use Test Data)
-    print(f"1. Generating Lesson (LIVE API CALL: {RUN_LIVE_LLM_LESSON_GENERATION})...")
-    lesson_raw_output = generate_daily_lesson(
-        TEST_YEAR, TEST_SUBJECT, RUN_LIVE_LLM_LESSON_GENERATION
+    parser.add_argument("--year-groups", nargs="*", type=int, default=[])
+    parser.add_argument("--subjects", nargs="*", default=[])
+    parser.add_argument(
+        "--topics", nargs="*", default=[], help='Topic ideas; "" means no specific topic.'
     )
-
-    # 2. Parsing the Lesson Content
-    print("2. Parsing Lesson Content...")
-    lesson_data = parse_lesson_output(lesson_raw_output)
-
-    # Check if we got the core lesson content (the BODY)
-    if not lesson_data.get("body"):
-        print("FAILED: Could not parse lesson body. Exiting.")
-        return
-
-    # Print the extracted parts
-    print(f"   > TITLE: {lesson_data.get('title', 'N/A')}")
-    print(f"   > VISUAL PROMPT: {lesson_data.get('visual_prompt', 'N/A')[:50]}...")
-
-    # 3. Quiz Generation (API Call)
-    print(f"\n3. Generating Quiz (LIVE API CALL: {RUN_LIVE_LLM_LESSON_GENERATION})...")
-
-    # We pass the extracted BODY content to the quiz generator
-    quiz_object = generate_quiz_from_lesson(
-        lesson_data["body"], TEST_YEAR, RUN_LIVE_LLM_LESSON_GENERATION
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--rpm", type=float, default=None, help="Maximum jobs started per minute."
+    )
+    parser.add_argument("--images", action="store_true", help="Also render lesson images.")
+    parser.add_argument(
+        "--combined",
+        action="store_true",
+        help="Generate lesson and quiz in one call (as /v1/daily-page does).",
+    )
+    parser.add_argument("--checkpoint", default="pregeneration_checkpoint.jsonl")
+    parser.add_argument("--report", help="Write the JSON report to this file as well.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Per-job progress is logged; the summary and report go to stdout.
+    configure_logging()
+
+    year_groups, subjects, topics = args.year_groups, args.subjects, args.topics
+    if args.matrix:
+        with open(args.matrix, encoding="utf-8") as f:
+            matrix = json.load(f)
+        year_groups = year_groups or matrix.get("year_groups", [])
+        subjects = subjects or matrix.get("subjects", [])
+        topics = topics or matrix.get("topic_ideas", [])
+
+    jobs = build_jobs(year_groups, subjects, topics or [""])
+    if not jobs:
+        print("Nothing to do: give at least one year group and one subject.")
+        return 2
+
+    if not CACHE_DB_PATH:
+        print(
+            "Warning: LEARNING_ASSISTANT_CACHE_DB is not set, so lessons and quizzes "
+            "are only cached in this process."
+        )
+
+    print(f"--- Pre-generating {len(jobs)} pages (concurrency {args.concurrency}) ---")
+    report = asyncio.run(
+        pregenerate(
+            jobs,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            images=args.images,
+            combined=args.combined,
+            checkpoint_path=args.checkpoint,
+        )
     )
 
-    # 4. Displaying/Using the Results
-    if quiz_object and quiz_object.quiz_questions:
-        print("\n---Daily Page Ready ---")
-        print(f"Lesson Title: {lesson_data.get('title')}")
-        print("--- Lesson Content (BODY) Displayed Here ---")
-
-        print("\n--- QUIZ TIME ---")
-
-        # Demonstrating how to use the structured quiz data
-        for i, q in enumerate(quiz_object.quiz_questions):
-            print(f"Q{i + 1}: {q.question}")
-            # Note: We display the options using their index for the user
-            for j, option_text in enumerate(q.options):
-                print(f"   {['A', 'B', 'C', 'D'][j]}. {option_text}")
-
-            # --- Answer Check Logic (for your backend) ---
-            # Simulate user choosing the 2nd option (Index 1, which is key 'B')
-            simulated_user_choice_key = "B"
-
-            is_correct = simulated_user_choice_key == q.correct_key
-
-            print(
-                f"   [DEV CHECK] Correct Key: {q.correct_key} | User Chose: {simulated_user_choice_key} | Correct: {is_correct}"
-            )
-
-            if is_correct:
-                print(f"   CORRECT! Explanation: {q.explanation}")
-            else:
-                print(
-                    f"   INCORRECT. The correct answer was {q.correct_key}. Explanation: {q.explanation}"
-                )
+    summary = json.dumps(report.to_dict(), indent=2)
+    print(summary)
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(summary)
 
-    else:
-        print("\nFINAL FAILURE: Could not generate a valid quiz.")
+    return 1 if report.failed else 0
 
 
 if __name__ == "__main__":
-    run_tutor_workflow()
+    raise SystemExit(main())
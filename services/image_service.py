@@ -0,0 +1,97 @@
+import asyncio
+import base64
+import logging
+import os
+from typing import Optional
+
+from app.exceptions import ImageGenerationError, RateLimitError, UpstreamUnavailableError
+from llm_core.generation_service import IMAGE_MODEL, generate_image_from_prompt_async
+from services.image_store import ImageStore, StoredImage, image_digest
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "app/image_store")
+
+image_store = ImageStore(IMAGE_STORE_DIR)
+
+logger = logging.getLogger(__name__)
+
+# Images started in the background, by digest, so GET /v1/image/{digest} can
+# wait for an image that is still rendering instead of returning 404.
+_pending_images: dict[str, asyncio.Task] = {}
+# Background images that failed with a retryable upstream error, by digest, so
+# GET /v1/image/{digest} answers 429/503 with Retry-After as POST /v1/image
+# does, rather than 404. Cleared when the image is started again.
+_failed_images: dict[str, RateLimitError | UpstreamUnavailableError] = {}
+MAX_FAILED_IMAGES = 1024
+
+
+def image_url(digest: str) -> str:
+    return f"/v1/image/{digest}"
+
+
+async def get_image(prompt: str) -> StoredImage:
+    """Return the stored image for a prompt, generating and storing it on a miss."""
+    digest = image_digest(prompt, IMAGE_MODEL)
+
+    stored = await asyncio.to_thread(image_store.get, digest)
+    if stored is not None:
+        return stored
+
+    image = await generate_image_from_prompt_async(prompt)
+    return await asyncio.to_thread(image_store.put, digest, image)
+
+
+async def start_image(prompt: str) -> str:
+    """Start generating the image for a prompt in the background and return its digest."""
+    digest = image_digest(prompt, IMAGE_MODEL)
+    if digest in _pending_images:
+        return digest
+    stored = await asyncio.to_thread(image_store.get, digest)
+    # Another request may have started it while the store was read.
+    if stored is None and digest not in _pending_images:
+        _failed_images.pop(digest, None)
+        task = asyncio.create_task(get_image(prompt))
+        _pending_images[digest] = task
+        task.add_done_callback(lambda t: _forget_pending(digest, t))
+    return digest
+
+
+def _forget_pending(digest: str, task: asyncio.Task) -> None:
+    _pending_images.pop(digest, None)
+    if task.cancelled() or task.exception() is None:
+        return
+    error = task.exception()
+    logger.error(
+        "background image generation failed",
+        extra={"digest": digest, "error": str(error)},
+    )
+    if isinstance(error, (RateLimitError, UpstreamUnavailableError)):
+        while len(_failed_images) >= MAX_FAILED_IMAGES:
+            _failed_images.pop(next(iter(_failed_images)))
+        _failed_images[digest] = error
+
+
+async def wait_for_image(digest: str) -> Optional[StoredImage]:
+    """
+    Return a stored image, waiting for it first if it is still being generated.
+    RateLimitError and UpstreamUnavailableError from the generation are raised,
+    also after it has finished, for the app to answer 429/503 with Retry-After.
+    """
+    task = _pending_images.get(digest)
+    if task is not None:
+        try:
+            return await asyncio.shield(task)
+        except ImageGenerationError:
+            return None
+    failed = _failed_images.get(digest)
+    if failed is not None:
+        # A fresh error each time, so tracebacks don't pile up on one instance.
+        raise type(failed)(failed.message, failed.retry_after, failed.status_code)
+    return await asyncio.to_thread(image_store.get, digest)
+
+
+async def read_image_base64(stored: StoredImage) -> str:
+    def _read() -> str:
+        with open(stored.path, "rb") as f:
+            return base64.b64encode(f.read()).decode("ascii")
+
+    return await asyncio.to_thread(_read)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+# Known image signatures, checked in order, mapped to (extension, content type).
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"RIFF", ".webp", "image/webp"),
+    (b"<svg", ".svg", "image/svg+xml"),
+    (b"<?xml", ".svg", "image/svg+xml"),
+]
+_DEFAULT_TYPE = (".bin", "application/octet-stream")
+_EXTENSIONS = {ext: content_type for _, ext, content_type in _SIGNATURES}
+_EXTENSIONS[_DEFAULT_TYPE[0]] = _DEFAULT_TYPE[1]
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    digest: str
+    path: str
+    content_type: str
+
+
+def sniff_image_type(data: bytes) -> tuple[str, str]:
+    head = data[:16].lstrip()
+    for signature, ext, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return ext, content_type
+    return _DEFAULT_TYPE
+
+
+def is_valid_digest(digest: str) -> bool:
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+class ImageStore:
+    """
+    Content-addressed image files on local disk.
+
+    Images live at ``<root>/<digest[:2]>/<digest><ext>`` where the extension
+    records the sniffed content type. Writes go to a temporary file first and
+    are renamed into place, so readers never see a partial image.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2])
+
+    def get(self, digest: str) -> Optional[StoredImage]:
+        if not is_valid_digest(digest):
+            return None
+        directory = self._dir_for(digest)
+        for ext, content_type in _EXTENSIONS.items():
+            path = os.path.join(directory, digest + ext)
+            if os.path.isfile(path):
+                return StoredImage(digest=digest, path=path, content_type=content_type)
+        return None
+
+    def put(self, digest: str, data: bytes) -> StoredImage:
+        if not is_valid_digest(digest):
+            raise ValueError(f"Invalid image digest: {digest!r}")
+        ext, content_type = sniff_image_type(data)
+        directory = self._dir_for(digest)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, digest + ext)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return StoredImage(digest=digest, path=path, content_type=content_type)
+
+
+def image_digest(prompt: str, model: str) -> str:
+    """Digest of a normalized image prompt and the model that renders it."""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(f"{model}\x1f{normalized}".encode("utf-8")).hexdigest()
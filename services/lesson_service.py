@@ -1,29 +1,321 @@
-import json
-from typing import Optional
+import hashlib
+import os
+from typing import AsyncIterator, Optional
+from app.exceptions import LessonGenerationError, UpstreamUnavailableError
+from app.metrics import CACHE_LOOKUPS, stage
+from app.models.lesson_models import GeneratedLesson
 from app.models.quiz_models import GeneratedQuiz
+from app.models.daily_page_models import GeneratedDailyPage
 
-from llm_core.generation_service import generate_daily_lesson, generate_quiz_from_lesson
+from llm_core.generation_service import (
+    generate_daily_lesson_async,
+    generate_daily_lesson_stream,
+    generate_daily_page_async,
+    generate_quiz_from_lesson_async,
+    parse_lesson_async,
+)
+from llm_core import json_repair
+from app.cache_db import get_cache_tier
+from llm_core.prompt_templates import LESSON_PROMPT_VERSION, QUIZ_PROMPT_VERSION
+from services.cache import TTLCache
+from services.lesson_stream import LessonStreamParser
+from services.topic_index import TopicIndex
 # adjust the import path to wherever your functions live
 
+LESSON_CACHE_MAX_ENTRIES = int(os.getenv("LESSON_CACHE_MAX_ENTRIES", "512"))
+LESSON_CACHE_TTL_SECONDS = float(os.getenv("LESSON_CACHE_TTL_SECONDS", "86400"))
+QUIZ_CACHE_MAX_ENTRIES = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "1024"))
+QUIZ_CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", "86400"))
+# How long expired entries are still served when the upstream is failing.
+CACHE_STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "604800"))
+
+lesson_cache = TTLCache(
+    max_entries=LESSON_CACHE_MAX_ENTRIES,
+    ttl_seconds=LESSON_CACHE_TTL_SECONDS,
+    stale_seconds=CACHE_STALE_SECONDS,
+)
+# Quiz cache holds validated GeneratedQuiz objects, so hits skip both the LLM
+# call and JSON/Pydantic parsing.
+quiz_cache = TTLCache(
+    max_entries=QUIZ_CACHE_MAX_ENTRIES,
+    ttl_seconds=QUIZ_CACHE_TTL_SECONDS,
+    stale_seconds=CACHE_STALE_SECONDS,
+)
+# Topics of cached lessons, so near-duplicate topics are served the same lesson.
+topic_index = TopicIndex()
+# Optional persistent tiers, enabled by LEARNING_ASSISTANT_CACHE_DB.
+lesson_store = get_cache_tier("lesson_cache", LESSON_CACHE_TTL_SECONDS)
+quiz_store = get_cache_tier("quiz_cache", QUIZ_CACHE_TTL_SECONDS)
+topic_store = get_cache_tier("lesson_topics", LESSON_CACHE_TTL_SECONDS)
+
+
+async def init_cache_stores() -> None:
+    for store in (lesson_store, quiz_store, topic_store):
+        if store is not None:
+            await store.init()
+    if topic_store is not None:
+        for key, topic in await topic_store.items():
+            # Lessons from an earlier prompt version are not served again.
+            if topic.get("prompt_version") != LESSON_PROMPT_VERSION:
+                continue
+            topic_index.add(
+                key,
+                topic["year_group"],
+                topic["subject"],
+                topic["topic_idea"],
+                LESSON_PROMPT_VERSION,
+            )
+
+
+async def close_cache_stores() -> None:
+    for store in (lesson_store, quiz_store, topic_store):
+        if store is not None:
+            await store.close()
+
 
 def parse_lesson_response(text: str) -> dict:
+    """
+    Parse and validate lesson JSON, repairing formatting faults such as code
+    fences or missing closing braces. Unlike parse_lesson_async it never
+    calls the model again, so it raises ValueError on anything else.
+    """
     try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
+        data, _ = json_repair.loads(text)
+        return GeneratedLesson.model_validate(data).model_dump()
+    except ValueError as e:
         raise ValueError(f"Invalid JSON returned by LLM: {e}")
 
 
-def get_lesson(year_group: int, subject: str, topic_idea: str) -> str:
-    res = generate_daily_lesson(
+def lesson_cache_key(year_group: int, subject: str, topic_idea: str) -> str:
+    """Cache key for a lesson request, tied to the current lesson prompt version."""
+    normalized = "\x1f".join(
+        [
+            str(year_group),
+            " ".join(subject.split()).casefold(),
+            " ".join((topic_idea or "").split()).casefold(),
+            LESSON_PROMPT_VERSION,
+        ]
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def quiz_cache_key(lesson_text: str, year_group: int) -> str:
+    """Content-addressed key for a quiz: digest of the lesson text and prompt version."""
+    digest = hashlib.sha256()
+    for part in (lesson_text, str(year_group), QUIZ_PROMPT_VERSION):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def get_cache_stats() -> dict:
+    return {
+        "lesson": lesson_cache.stats(),
+        "quiz": quiz_cache.stats(),
+        "topics": topic_index.stats(),
+    }
+
+
+async def _load_lesson(key: str) -> tuple[Optional[dict], str]:
+    lesson = lesson_cache.get(key)
+    if lesson is not None:
+        return lesson, "memory"
+
+    if lesson_store is not None:
+        with stage("lesson", "cache_store_get"):
+            lesson = await lesson_store.get(key)
+        if lesson is not None:
+            lesson_cache.set(key, lesson)
+            return lesson, "store"
+    return None, "miss"
+
+
+async def _cached_lesson(
+    key: str, year_group: int, subject: str, topic_idea: str
+) -> Optional[dict]:
+    """
+    The lesson cached under ``key`` or, failing that, the cached lesson for
+    the most similar earlier topic in the same year group and subject.
+    """
+    lesson, result = await _load_lesson(key)
+    if lesson is None:
+        with stage("lesson", "topic_match"):
+            similar = topic_index.match(year_group, subject, topic_idea, LESSON_PROMPT_VERSION)
+        if similar is not None and similar != key:
+            lesson, _ = await _load_lesson(similar)
+            if lesson is not None:
+                # Later requests with this exact topic skip the matching.
+                lesson_cache.set(key, lesson)
+                result = "similar"
+            else:
+                topic_index.discard(similar)
+    CACHE_LOOKUPS.inc(cache="lesson", result=result)
+    return lesson
+
+
+async def _store_lesson(
+    key: str, lesson: dict, year_group: int, subject: str, topic_idea: str
+) -> None:
+    lesson_cache.set(key, lesson)
+    topic_index.add(key, year_group, subject, topic_idea, LESSON_PROMPT_VERSION)
+    if lesson_store is not None:
+        with stage("lesson", "cache_store_set"):
+            await lesson_store.set(key, lesson)
+    if topic_store is not None:
+        topic = {
+            "year_group": year_group,
+            "subject": subject,
+            "topic_idea": topic_idea,
+            "prompt_version": LESSON_PROMPT_VERSION,
+        }
+        with stage("lesson", "cache_store_set"):
+            await topic_store.set(key, topic)
+
+
+async def _cached_quiz(key: str) -> Optional[GeneratedQuiz]:
+    quiz = quiz_cache.get(key)
+    if quiz is not None:
+        CACHE_LOOKUPS.inc(cache="quiz", result="memory")
+        return quiz
+
+    if quiz_store is not None:
+        with stage("quiz", "cache_store_get"):
+            data = await quiz_store.get(key)
+            quiz = GeneratedQuiz.model_validate(data) if data is not None else None
+        if quiz is not None:
+            quiz_cache.set(key, quiz)
+            CACHE_LOOKUPS.inc(cache="quiz", result="store")
+            return quiz
+    CACHE_LOOKUPS.inc(cache="quiz", result="miss")
+    return None
+
+
+async def _store_quiz(key: str, quiz: GeneratedQuiz) -> None:
+    quiz_cache.set(key, quiz)
+    if quiz_store is not None:
+        with stage("quiz", "cache_store_set"):
+            await quiz_store.set(key, quiz.model_dump())
+
+
+async def get_lesson(year_group: int, subject: str, topic_idea: str) -> dict:
+    key = lesson_cache_key(year_group, subject, topic_idea)
+
+    lesson = await _cached_lesson(key, year_group, subject, topic_idea)
+    if lesson is not None:
+        return dict(lesson)
+
+    try:
+        res = await generate_daily_lesson_async(
+            year_group=year_group,
+            subject=subject,
+            topic_idea=topic_idea,
+        )
+    except (LessonGenerationError, UpstreamUnavailableError):
+        # While the upstream is degraded an expired copy beats an error.
+        lesson = lesson_cache.get_stale(key)
+        if lesson is not None:
+            return dict(lesson)
+        raise
+    lesson = await parse_lesson_async(res, year_group, subject, topic_idea)
+
+    await _store_lesson(key, lesson, year_group, subject, topic_idea)
+    return dict(lesson)
+
+
+async def stream_lesson(
+    year_group: int, subject: str, topic_idea: str
+) -> AsyncIterator[tuple[str, object]]:
+    """
+    Yields ``("title" | "lesson_text", delta)`` pairs while the lesson is
+    generated, then ``("lesson", lesson_dict)`` once the full response has been
+    parsed. Cached lessons are replayed as one delta per field.
+    """
+    key = lesson_cache_key(year_group, subject, topic_idea)
+
+    lesson = await _cached_lesson(key, year_group, subject, topic_idea)
+    if lesson is not None:
+        yield "title", lesson.get("title", "")
+        yield "lesson_text", lesson.get("lesson_text", "")
+        yield "lesson", dict(lesson)
+        return
+
+    parser = LessonStreamParser()
+    chunks = []
+    async for chunk in generate_daily_lesson_stream(
         year_group=year_group,
         subject=subject,
         topic_idea=topic_idea,
+    ):
+        chunks.append(chunk)
+        for field, delta in parser.feed(chunk):
+            yield field, delta
+
+    lesson = await parse_lesson_async(
+        "".join(chunks), year_group, subject, topic_idea, endpoint="lesson_stream"
     )
-    return parse_lesson_response(res)
+    await _store_lesson(key, lesson, year_group, subject, topic_idea)
+    yield "lesson", dict(lesson)
 
 
-def get_quiz(lesson_text: str, year_group: int) -> Optional[GeneratedQuiz]:
-    return generate_quiz_from_lesson(
-        lesson_text=lesson_text,
-        year_group=year_group,
-    )
+async def get_quiz(lesson_text: str, year_group: int) -> Optional[GeneratedQuiz]:
+    key = quiz_cache_key(lesson_text, year_group)
+
+    quiz = await _cached_quiz(key)
+    if quiz is not None:
+        return quiz
+
+    try:
+        quiz = await generate_quiz_from_lesson_async(
+            lesson_text=lesson_text,
+            year_group=year_group,
+        )
+    except UpstreamUnavailableError:
+        quiz = quiz_cache.get_stale(key)
+        if quiz is not None:
+            return quiz
+        raise
+    # Failed generations (None) are not cached so the next request retries.
+    if quiz is None:
+        return quiz_cache.get_stale(key)
+    await _store_quiz(key, quiz)
+    return quiz
+
+
+async def get_daily_page(
+    year_group: int, subject: str, topic_idea: str
+) -> tuple[dict, GeneratedQuiz]:
+    """
+    Returns the lesson and its quiz for a daily page. A cached lesson is kept,
+    since learners may already have seen it, and only its quiz is fetched or
+    generated. Otherwise both are produced by a single structured-output call,
+    and the results are written to the lesson and quiz caches so later
+    /v1/lesson and /v1/quiz requests for the same page are hits.
+    """
+    key = lesson_cache_key(year_group, subject, topic_idea)
+
+    lesson = await _cached_lesson(key, year_group, subject, topic_idea)
+    if lesson is not None:
+        quiz = await get_quiz(lesson["lesson_text"], year_group)
+        if quiz is None:
+            raise LessonGenerationError("Quiz generation failed.", status_code=502)
+        return dict(lesson), quiz
+
+    try:
+        page: GeneratedDailyPage = await generate_daily_page_async(
+            year_group=year_group,
+            subject=subject,
+            topic_idea=topic_idea,
+        )
+    except (LessonGenerationError, UpstreamUnavailableError):
+        lesson = lesson_cache.get_stale(key)
+        if lesson is not None:
+            quiz = quiz_cache.get_stale(quiz_cache_key(lesson["lesson_text"], year_group))
+            if quiz is not None:
+                return dict(lesson), quiz
+        raise
+    lesson = page.model_dump(include={"title", "lesson_text", "visual_prompt"})
+    quiz = GeneratedQuiz(quiz_questions=page.quiz_questions)
+
+    await _store_lesson(key, lesson, year_group, subject, topic_idea)
+    await _store_quiz(quiz_cache_key(lesson["lesson_text"], year_group), quiz)
+    return dict(lesson), quiz
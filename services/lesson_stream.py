@@ -0,0 +1,82 @@
+import json
+from typing import Optional
+
+STREAMED_FIELDS = ("title", "lesson_text")
+
+
+class LessonStreamParser:
+    """
+    Incrementally extracts string fields from a lesson JSON object as it streams.
+
+    The model returns ``{"title": ..., "lesson_text": ..., "visual_prompt": ...}``
+    a few tokens at a time. ``feed`` takes the next raw chunk and returns the
+    newly decoded text for the fields in ``STREAMED_FIELDS`` as
+    ``(field, delta)`` pairs, so callers can forward them before the object is
+    complete. Anything outside string literals (whitespace, markdown fences) is
+    ignored; the complete text should still be parsed and validated at the end.
+    """
+
+    def __init__(self, fields: tuple[str, ...] = STREAMED_FIELDS):
+        self.fields = fields
+        self._state = "seek"  # seek | key | value
+        self._expect = "key"  # what the next string literal is: key | value
+        self._key: list[str] = []
+        self._last_key: Optional[str] = None
+        self._escape = ""
+        self._high_surrogate = ""
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        deltas: dict[str, list[str]] = {}
+
+        for ch in chunk:
+            if self._state == "seek":
+                if ch == '"':
+                    self._state = self._expect
+                    self._key = []
+                elif ch in "{,":
+                    self._expect = "key"
+                elif ch == ":":
+                    self._expect = "value"
+                continue
+
+            if self._escape:
+                self._escape += ch
+                if self._escape[1] == "u" and len(self._escape) < 6:
+                    continue
+                decoded = self._decode_escape(self._escape)
+                self._escape = ""
+            elif ch == "\\":
+                self._escape = ch
+                continue
+            elif ch == '"':
+                if self._state == "key":
+                    self._last_key = "".join(self._key)
+                self._state = "seek"
+                self._expect = "key"
+                continue
+            else:
+                decoded = ch
+
+            if self._state == "key":
+                self._key.append(decoded)
+            elif self._last_key in self.fields and decoded:
+                deltas.setdefault(self._last_key, []).append(decoded)
+
+        return [(field, "".join(parts)) for field, parts in deltas.items()]
+
+    def _decode_escape(self, escape: str) -> str:
+        try:
+            decoded = json.loads(f'"{escape}"')
+        except json.JSONDecodeError:
+            return ""
+
+        # Characters outside the BMP arrive as two \u escapes; join the pair.
+        if "\ud800" <= decoded <= "\udbff":
+            self._high_surrogate = decoded
+            return ""
+        if self._high_surrogate and "\udc00" <= decoded <= "\udfff":
+            pair = self._high_surrogate + decoded
+            self._high_surrogate = ""
+            return pair.encode("utf-16", "surrogatepass").decode("utf-16")
+        self._high_surrogate = ""
+        return decoded
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Iterable, Optional
+
+from app.exceptions import LessonGenerationError
+from services.image_service import get_image
+from services.lesson_service import (
+    close_cache_stores,
+    get_daily_page,
+    get_lesson,
+    get_quiz,
+    init_cache_stores,
+    lesson_cache_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PregenerationJob:
+    year_group: int
+    subject: str
+    topic_idea: str = ""
+
+    @property
+    def key(self) -> str:
+        # Tied to the lesson prompt version, so editing a prompt re-queues jobs.
+        return lesson_cache_key(self.year_group, self.subject, self.topic_idea)
+
+
+@dataclass
+class PregenerationReport:
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    failures: list[dict] = field(default_factory=list)
+
+    @property
+    def jobs_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+        return (self.succeeded + self.failed) / self.elapsed_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "jobs_per_second": round(self.jobs_per_second, 3),
+            "failures": self.failures,
+        }
+
+
+def build_jobs(
+    year_groups: Iterable[int], subjects: Iterable[str], topic_ideas: Iterable[str] = ("",)
+) -> list[PregenerationJob]:
+    """Expand a year group x subject x topic idea matrix into jobs."""
+    return [
+        PregenerationJob(year_group=y, subject=s, topic_idea=t)
+        for y, s, t in product(year_groups, subjects, list(topic_ideas) or [""])
+    ]
+
+
+class RateLimiter:
+    """Spaces out job starts so at most ``per_minute`` begin in any minute."""
+
+    def __init__(self, per_minute: Optional[float]):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of finished job keys.
+
+    Each finished job is flushed as its own line, so a crashed run can be
+    restarted with the same file and picks up where it left off.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)["key"])
+                    except (json.JSONDecodeError, KeyError):
+                        # A torn last line from a crash is simply redone.
+                        continue
+
+    def record(self, job: PregenerationJob) -> None:
+        self.done.add(job.key)
+        if not self.path:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "key": job.key,
+                        "year_group": job.year_group,
+                        "subject": job.subject,
+                        "topic_idea": job.topic_idea,
+                    }
+                )
+                + "\n"
+            )
+            f.flush()
+
+
+async def _run_job(job: PregenerationJob, images: bool, combined: bool) -> None:
+    if combined:
+        lesson, _ = await get_daily_page(job.year_group, job.subject, job.topic_idea)
+    else:
+        lesson = await get_lesson(job.year_group, job.subject, job.topic_idea)
+        quiz = await get_quiz(lesson["lesson_text"], job.year_group)
+        if quiz is None:
+            raise LessonGenerationError("Quiz generation failed.", status_code=502)
+
+    if images and lesson.get("visual_prompt", "").strip():
+        await get_image(lesson["visual_prompt"].strip())
+
+
+async def pregenerate(
+    jobs: list[PregenerationJob],
+    concurrency: int = 4,
+    requests_per_minute: Optional[float] = None,
+    images: bool = False,
+    combined: bool = False,
+    checkpoint_path: Optional[str] = None,
+) -> PregenerationReport:
+    """
+    Generate lessons, quizzes and optionally images for every job, writing
+    results into the lesson/quiz caches (and their persistent tiers) and the
+    image store as each job finishes.
+    """
+    await init_cache_stores()
+
+    checkpoint = Checkpoint(checkpoint_path)
+    report = PregenerationReport(total=len(jobs))
+    limiter = RateLimiter(requests_per_minute)
+    queue: asyncio.Queue[PregenerationJob] = asyncio.Queue()
+
+    for job in jobs:
+        if job.key in checkpoint.done:
+            report.skipped += 1
+        else:
+            queue.put_nowait(job)
+
+    async def worker() -> None:
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.wait()
+            job_fields = {
+                "year_group": job.year_group,
+                "subject": job.subject,
+                "topic_idea": job.topic_idea,
+            }
+            try:
+                await _run_job(job, images=images, combined=combined)
+            except Exception as e:
+                # Any failure, including a 429 or an open breaker, is one failed
+                # job; the run carries on and the job is redone next time.
+                report.failed += 1
+                report.failures.append(
+                    {
+                        "year_group": job.year_group,
+                        "subject": job.subject,
+                        "topic_idea": job.topic_idea,
+                        "error": getattr(e, "message", str(e)),
+                    }
+                )
+                logger.warning("pregeneration job failed", extra={**job_fields, "error": str(e)})
+                # Rate limited or breaker open: this worker waits as asked.
+                retry_after = getattr(e, "retry_after", 0)
+                if retry_after:
+                    await asyncio.sleep(retry_after)
+            else:
+                checkpoint.record(job)
+                report.succeeded += 1
+                logger.info("pregeneration job done", extra=job_fields)
+
+    started = time.monotonic()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        await close_cache_stores()
+    report.elapsed_seconds = time.monotonic() - started
+    return report
@@ -0,0 +1,239 @@
+"""
+Near-duplicate matching of free-text lesson topics.
+
+"photosynthesis", "Photosynthesis " and "how does photosynthesis work" ask
+for the same lesson, but they have different cache keys. The index holds the
+topics of the lessons already generated, grouped by (year group, subject),
+so that a new topic close enough to a stored one can be served that lesson.
+
+Topics are normalized first: case-folded, punctuation dropped, stop words and
+question framing removed, plurals reduced, and the remaining words sorted.
+Equal normalized topics match straight away. Otherwise the normalized text is
+split into character trigrams, and a MinHash signature of those trigrams,
+banded for locality-sensitive hashing, finds the few stored topics likely to
+be similar. Only those candidates are scored, by the exact Jaccard similarity
+of their trigram sets. A candidate must score at least TOPIC_MATCH_THRESHOLD
+and contain the same numbers ("World War 1" is not "World War 2"). A lookup
+therefore costs the same however many topics are stored.
+"""
+
+import hashlib
+import os
+import re
+import struct
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+TOPIC_MATCHING = os.getenv("TOPIC_MATCHING", "true").lower() in ("1", "true", "yes")
+TOPIC_MATCH_THRESHOLD = float(os.getenv("TOPIC_MATCH_THRESHOLD", "0.8"))
+TOPIC_INDEX_MAX_ENTRIES = int(os.getenv("TOPIC_INDEX_MAX_ENTRIES", "50000"))
+
+NGRAM = 3
+# 16 bands of 4 rows: a pair at similarity 0.8 shares a band 99.9% of the
+# time, a pair at 0.3 about 12% of the time.
+BANDS = 16
+ROWS = 4
+
+_STOP_WORDS = frozenset(
+    """
+    a about all also an and any are as at be been being by can could did do does doing
+    for from had has have how i if in into is it its me my of on or our so some than that
+    the their them then there these this those to us was we were what when where which
+    while who why will with would you your
+    basic basics explain explained intro introduction learn learning lesson lessons
+    overview please teach tell topic understand understanding
+    """.split()
+)
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+# "how does X work" asks for X; "work" alone is a physics topic, so it stays.
+_HOW_WORKS = re.compile(r"^\s*how\s+(?:do|does|did)\s+(.+?)\s+work\W*$")
+
+# BANDS * ROWS little-endian 32-bit hash values.
+_SIGNATURE = struct.Struct(f"<{BANDS * ROWS}I")
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic: str) -> str:
+    """Canonical form of a topic: content words, singular, sorted, de-duplicated."""
+    text = (topic or "").casefold()
+    framed = _HOW_WORKS.match(text)
+    if framed:
+        text = framed.group(1)
+    words = {_singular(w) for w in _WORD.findall(text) if w not in _STOP_WORDS}
+    return " ".join(sorted(words))
+
+
+def shingles(normalized: str) -> frozenset[str]:
+    padded = f" {normalized} "
+    return frozenset(padded[i : i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+
+
+def minhash(grams: frozenset[str]) -> tuple[int, ...]:
+    # One SHAKE digest per trigram supplies all BANDS * ROWS 32-bit hash
+    # functions at once, and the per-function minimum is taken in C by zip.
+    hashes = [
+        _SIGNATURE.unpack(hashlib.shake_128(g.encode("utf-8")).digest(_SIGNATURE.size))
+        for g in grams
+    ]
+    return tuple(map(min, zip(*hashes)))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _group(year_group: int, subject: str, version: str) -> tuple[int, str, str]:
+    return year_group, " ".join(subject.split()).casefold(), version
+
+
+@dataclass(frozen=True)
+class _Topic:
+    group: tuple[int, str, str]
+    normalized: str
+    grams: frozenset[str]
+    numbers: frozenset[str]
+    bands: tuple[tuple, ...]
+
+
+def _bands(signature: tuple[int, ...]) -> tuple[tuple, ...]:
+    return tuple((i, signature[i * ROWS : (i + 1) * ROWS]) for i in range(BANDS))
+
+
+class TopicIndex:
+    """
+    Maps topics to the cache keys of their lessons, per (year group, subject)
+    and prompt version, so a lesson from an edited prompt is never matched.
+    At most ``max_entries`` topics are held; the oldest is dropped to make room.
+    """
+
+    def __init__(
+        self,
+        threshold: float = TOPIC_MATCH_THRESHOLD,
+        max_entries: int = TOPIC_INDEX_MAX_ENTRIES,
+        enabled: bool = TOPIC_MATCHING,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._topics: "OrderedDict[str, _Topic]" = OrderedDict()
+        self._exact: dict[tuple, str] = {}
+        self._buckets: dict[tuple, set[str]] = {}
+        self.lookups = 0
+        self.exact_matches = 0
+        self.similar_matches = 0
+        self.candidates = 0
+
+    def __len__(self) -> int:
+        return len(self._topics)
+
+    def _topic(
+        self, year_group: int, subject: str, topic: str, version: str
+    ) -> Optional[_Topic]:
+        normalized = normalize_topic(topic)
+        if not normalized:
+            # An empty topic lets the model choose; nothing to compare.
+            return None
+        grams = shingles(normalized)
+        numbers = frozenset(w for w in normalized.split() if any(c.isdigit() for c in w))
+        return _Topic(
+            _group(year_group, subject, version),
+            normalized,
+            grams,
+            numbers,
+            _bands(minhash(grams)),
+        )
+
+    def add(
+        self, key: str, year_group: int, subject: str, topic: str, version: str = ""
+    ) -> None:
+        """
+        Record that the lesson cached under ``key`` was generated for ``topic``
+        with prompt ``version``.
+        """
+        if not self.enabled:
+            return
+        entry = self._topic(year_group, subject, topic, version)
+        if entry is None:
+            return
+        self.discard(key)
+        while len(self._topics) >= self.max_entries:
+            self.discard(next(iter(self._topics)))
+
+        self._topics[key] = entry
+        self._exact[(entry.group, entry.normalized)] = key
+        for band in entry.bands:
+            self._buckets.setdefault((entry.group, band), set()).add(key)
+
+    def discard(self, key: str) -> None:
+        entry = self._topics.pop(key, None)
+        if entry is None:
+            return
+        exact = (entry.group, entry.normalized)
+        if self._exact.get(exact) == key:
+            del self._exact[exact]
+        for band in entry.bands:
+            bucket = self._buckets.get((entry.group, band))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(entry.group, band)]
+
+    def match(
+        self, year_group: int, subject: str, topic: str, version: str = ""
+    ) -> Optional[str]:
+        """
+        Cache key of the stored lesson, from the same prompt ``version``, whose
+        topic is most similar to ``topic``, if it reaches the threshold;
+        otherwise None.
+        """
+        if not self.enabled or not self._topics:
+            return None
+        query = self._topic(year_group, subject, topic, version)
+        if query is None:
+            return None
+        self.lookups += 1
+
+        key = self._exact.get((query.group, query.normalized))
+        if key is not None:
+            self.exact_matches += 1
+            return key
+
+        candidates: set[str] = set()
+        for band in query.bands:
+            candidates.update(self._buckets.get((query.group, band), ()))
+        self.candidates += len(candidates)
+
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            entry = self._topics[candidate]
+            if entry.numbers != query.numbers:
+                continue
+            score = jaccard(query.grams, entry.grams)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            self.similar_matches += 1
+        return best
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._topics),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "exact_matches": self.exact_matches,
+            "similar_matches": self.similar_matches,
+            "candidates": self.candidates,
+        }
@@ -1,13 +1,37 @@
 import os
 import tempfile
+from contextlib import asynccontextmanager
 
 import aiosqlite
 import pytest
 import pytest_asyncio
 from fastapi import FastAPI
 
-from app.db import get_db
+from app.db import (
+    create_schema,
+    get_db,
+    get_dedicated_reader,
+    get_read_db,
+    get_reader,
+    get_writer,
+)
 from app.routers.scores import router as scores_router
+from app.score_cache import summary_cache
+
+
+class FakeClock:
+    """A clock for code that takes ``clock=``; tests move ``now`` by hand."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
 
 
 @pytest_asyncio.fixture
@@ -19,20 +43,7 @@ async def db_conn():
     conn.row_factory = aiosqlite.Row
 
     # Create schema needed for scores endpoints
-    await conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS quiz_attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            created_at TEXT NOT NULL,
-            subject TEXT NOT NULL,
-            year_group INTEGER NOT NULL,
-            topic TEXT NULL,
-            score INTEGER NOT NULL,
-            total_questions INTEGER NOT NULL
-        )
-        """
-    )
-    await conn.commit()
+    await create_schema(conn)
 
     try:
         yield conn
@@ -53,4 +64,22 @@ def app(db_conn):
         yield db_conn
 
     test_app.dependency_overrides[get_db] = override_get_db
+    test_app.dependency_overrides[get_read_db] = override_get_db
+
+    @asynccontextmanager
+    async def writer():
+        yield db_conn
+
+    async def override_get_writer():
+        yield writer
+
+    test_app.dependency_overrides[get_writer] = override_get_writer
+
+    async def override_get_reader():
+        yield writer
+
+    test_app.dependency_overrides[get_reader] = override_get_reader
+    test_app.dependency_overrides[get_dedicated_reader] = override_get_reader
+    # The summary cache is process-wide; start each test's database afresh.
+    summary_cache.invalidate()
     return test_app
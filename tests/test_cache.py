@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from app.cache_db import SqliteCacheTier
+from services import lesson_service
+from services.cache import TTLCache
+from testing.testing_data import TEST_LESSON_OUTPUT
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(max_entries=4, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lesson_cache_key_normalizes_and_includes_prompt_version(monkeypatch):
+    key = lesson_service.lesson_cache_key(8, "Science ", "Photosynthesis")
+    assert key == lesson_service.lesson_cache_key(8, "science", " photosynthesis")
+    assert key != lesson_service.lesson_cache_key(9, "science", "photosynthesis")
+
+    monkeypatch.setattr(lesson_service, "LESSON_PROMPT_VERSION", "changed")
+    assert key != lesson_service.lesson_cache_key(8, "science", "photosynthesis")
+
+
+@pytest.mark.asyncio
+async def test_get_lesson_serves_repeat_requests_from_cache(monkeypatch):
+    calls = []
+
+    async def fake_generate(**kwargs):
+        calls.append(kwargs)
+        return TEST_LESSON_OUTPUT
+
+    monkeypatch.setattr(lesson_service, "generate_daily_lesson_async", fake_generate)
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+
+    first = await lesson_service.get_lesson(8, "Science", "circuits")
+    second = await lesson_service.get_lesson(8, "Science", "circuits")
+
+    assert first == second == json.loads(TEST_LESSON_OUTPUT)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_tier_round_trip(tmp_path):
+    tier = SqliteCacheTier(str(tmp_path / "cache.db"), "lesson_cache", ttl_seconds=60)
+    await tier.init()
+
+    assert await tier.get("k") is None
+    await tier.set("k", {"title": "Circuits"})
+    assert await tier.get("k") == {"title": "Circuits"}
+
+    expired = SqliteCacheTier(tier.path, "lesson_cache", ttl_seconds=-1)
+    await expired.set("k", {"title": "Stale"})
+    assert await tier.get("k") is None
+    await expired.close()
+    await tier.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_tier_reuses_one_connection_and_prunes_periodically(tmp_path):
+    tier = SqliteCacheTier(str(tmp_path / "cache.db"), "lesson_cache", ttl_seconds=-1)
+    await tier.init()
+    db = tier._db
+
+    await tier.set("a", 1)
+    await tier.set("b", 2)
+    # Expired rows are pruned on the first write; the next prune waits for the interval.
+    rows = [r[0] for r in await (await db.execute("SELECT key FROM lesson_cache")).fetchall()]
+    plan = await (
+        await db.execute("EXPLAIN QUERY PLAN DELETE FROM lesson_cache WHERE expires_at <= 0")
+    ).fetchall()
+    await tier.get("a")
+
+    assert tier._db is db
+    assert rows == ["b"]
+    assert "lesson_cache_expires_at" in " ".join(r[3] for r in plan)
+    await tier.close()
+
+
+@pytest.mark.asyncio
+async def test_get_quiz_caches_validated_quiz_by_lesson_digest(monkeypatch):
+    from testing.testing_data import TEST_QUIZ_OBJECT_PERFECT
+
+    calls = []
+
+    async def fake_generate(**kwargs):
+        calls.append(kwargs)
+        return TEST_QUIZ_OBJECT_PERFECT
+
+    quiz_cache = TTLCache(max_entries=8)
+    monkeypatch.setattr(lesson_service, "generate_quiz_from_lesson_async", fake_generate)
+    monkeypatch.setattr(lesson_service, "quiz_cache", quiz_cache)
+
+    first = await lesson_service.get_quiz("Circuits need a power source.", 8)
+    second = await lesson_service.get_quiz("Circuits need a power source.", 8)
+    other = await lesson_service.get_quiz("Circuits need a power source.", 9)
+
+    assert first is second is TEST_QUIZ_OBJECT_PERFECT
+    assert other is TEST_QUIZ_OBJECT_PERFECT
+    assert len(calls) == 2
+    assert quiz_cache.stats()["hits"] == 1
+    assert quiz_cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_quiz_does_not_cache_failures(monkeypatch):
+    async def failing_generate(**kwargs):
+        return None
+
+    quiz_cache = TTLCache(max_entries=8)
+    monkeypatch.setattr(lesson_service, "generate_quiz_from_lesson_async", failing_generate)
+    monkeypatch.setattr(lesson_service, "quiz_cache", quiz_cache)
+
+    assert await lesson_service.get_quiz("Text", 8) is None
+    assert len(quiz_cache) == 0
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from app.metrics import LLM_TOKENS
+from llm_core import generation_service, providers
+from llm_core.context_cache import ContextCache
+from llm_core.generation_service import LESSON_MODEL
+from llm_core.prompt_templates import get_system_instructions
+from llm_core.providers import LocalProfile, LocalProvider
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    # The instructions in these tests are shorter than the real minimum.
+    provider = LocalProvider(LocalProfile(cache_min_tokens=0))
+    monkeypatch.setattr(providers, "_provider", provider)
+    return provider
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ContextCache(enabled=True, ttl_seconds=600, refresh_seconds=60)
+    monkeypatch.setattr(generation_service, "context_cache", cache)
+    return cache
+
+
+class RecordingLocalProvider(LocalProvider):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+
+    async def generate_content(self, model, contents, config=None):
+        self.sent.append((contents, getattr(config, "cached_content", None)))
+        return await super().generate_content(model=model, contents=contents, config=config)
+
+
+@pytest.mark.asyncio
+async def test_system_prompt_is_sent_once_then_referenced(monkeypatch, cache):
+    provider = RecordingLocalProvider(LocalProfile(cache_min_tokens=0))
+    monkeypatch.setattr(providers, "_provider", provider)
+    cached_before = LLM_TOKENS.value(endpoint="lesson", model=LESSON_MODEL, kind="cached")
+
+    await generation_service.generate_daily_lesson_async(8, "Science", "circuits")
+    await generation_service.generate_daily_lesson_async(8, "Science", "magnets")
+
+    system_text = get_system_instructions(8, "Science")
+    assert cache.stats()["created"] == 1
+    assert cache.stats()["hits"] == 1
+    for contents, cached_content in provider.sent:
+        assert cached_content == "cachedContents/local-1"
+        assert all(part["text"] != system_text for part in contents[0]["parts"])
+    assert provider.cache_hits == 2
+    assert LLM_TOKENS.value(endpoint="lesson", model=LESSON_MODEL, kind="cached") > cached_before
+
+
+@pytest.mark.asyncio
+async def test_expiring_cache_is_recreated(provider, clock):
+    # Start at the real time: the provider reports expiry from its own clock.
+    clock.now = time.time()
+    cache = ContextCache(enabled=True, ttl_seconds=600, refresh_seconds=60, clock=clock)
+
+    first = await cache.lookup(provider, "m", "You are a tutor.")
+    clock.now += 500
+    assert await cache.lookup(provider, "m", "You are a tutor.") == first
+    # Within the refresh margin of expiry: replaced rather than risked.
+    clock.now += 50
+    second = await cache.lookup(provider, "m", "You are a tutor.")
+
+    assert second != first
+    assert cache.stats()["created"] == 1
+    assert cache.stats()["recreated"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_gone_upstream_falls_back_to_inline(provider, cache):
+    await generation_service.generate_daily_lesson_async(9, "History", "castles")
+    # Expired or deleted upstream before our TTL said so.
+    provider._cached_contents.clear()
+
+    lesson = await generation_service.generate_daily_lesson_async(9, "History", "moats")
+    await generation_service.generate_daily_lesson_async(9, "History", "keeps")
+
+    assert lesson
+    assert provider.calls == 4
+    assert cache.stats()["created"] == 2
+
+
+@pytest.mark.asyncio
+async def test_short_prefixes_and_full_cache_stay_inline(cache):
+    provider = LocalProvider()
+    assert await cache.lookup(provider, "m", "You are a tutor.") is None
+
+    small = ContextCache(enabled=True, max_entries=1)
+    provider = LocalProvider(LocalProfile(cache_min_tokens=0))
+    assert await small.lookup(provider, "m", "Year 7 Maths tutor.") is not None
+    assert await small.lookup(provider, "m", "Year 8 Maths tutor.") is None
+    assert small.stats()["inline"] == 1
@@ -0,0 +1,100 @@
+import base64
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routers import daily_page, lesson
+from services import image_service, lesson_service
+from services.cache import TTLCache
+from services.image_store import ImageStore
+from testing.testing_data import TEST_IMAGE_BASE64, TEST_LESSON_OUTPUT
+
+
+@pytest.fixture
+def page_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(lesson_service, "quiz_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(image_service, "image_store", ImageStore(str(tmp_path)))
+    test_app = FastAPI()
+    test_app.include_router(daily_page.router)
+    test_app.include_router(lesson.router)
+    transport = httpx.ASGITransport(app=test_app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_daily_page_returns_lesson_and_quiz_and_fills_caches(page_client, monkeypatch):
+    calls = []
+    real_generate = lesson_service.generate_daily_page_async
+
+    async def counting_generate(**kwargs):
+        calls.append(kwargs)
+        return await real_generate(**kwargs)
+
+    monkeypatch.setattr(lesson_service, "generate_daily_page_async", counting_generate)
+
+    async with page_client as client:
+        res = await client.post(
+            "/v1/daily-page", json={"year_group": 8, "subject": "Science"}
+        )
+        again = await client.post(
+            "/v1/daily-page", json={"year_group": 8, "subject": "Science"}
+        )
+
+    body = res.json()
+    assert res.status_code == 200
+    assert body["lesson"]["title"] == json.loads(TEST_LESSON_OUTPUT)["title"]
+    assert len(body["quiz"]["quiz_questions"]) == 3
+    assert body["image_url"] is None
+    assert again.json() == body
+    assert len(calls) == 1
+
+    quiz = await lesson_service.get_quiz(body["lesson"]["lesson_text"], 8)
+    assert lesson_service.quiz_cache.hits == 2
+    assert quiz.model_dump() == body["quiz"]
+
+
+@pytest.mark.asyncio
+async def test_daily_page_starts_image_and_url_waits_for_it(page_client):
+    async with page_client as client:
+        res = await client.post(
+            "/v1/daily-page",
+            json={"year_group": 8, "subject": "Science", "generate_image": True},
+        )
+        body = res.json()
+        img = await client.get(body["image_url"])
+
+    assert body["image_url"] == f"/v1/image/{body['image_digest']}"
+    assert img.status_code == 200
+    assert img.content == base64.b64decode(TEST_IMAGE_BASE64)
+
+
+@pytest.mark.asyncio
+async def test_daily_page_keeps_a_cached_lesson_and_only_adds_its_quiz(page_client, monkeypatch):
+    old = {**json.loads(TEST_LESSON_OUTPUT), "title": "OLD"}
+    page_calls = []
+
+    async def old_lesson(**kwargs):
+        return json.dumps(old)
+
+    async def no_page(**kwargs):
+        page_calls.append(kwargs)
+        raise AssertionError("the lesson is cached")
+
+    monkeypatch.setattr(lesson_service, "generate_daily_lesson_async", old_lesson)
+    monkeypatch.setattr(lesson_service, "generate_daily_page_async", no_page)
+    request = {"year_group": 8, "subject": "Science", "topic_idea": "circuits"}
+
+    async with page_client as client:
+        first = await client.post("/v1/lesson", json=request)
+        page = await client.post("/v1/daily-page", json=request)
+        again = await client.post("/v1/lesson", json=request)
+
+    assert first.json()["title"] == "OLD"
+    assert page.status_code == 200
+    assert page.json()["lesson"]["title"] == "OLD"
+    assert len(page.json()["quiz"]["quiz_questions"]) == 3
+    assert again.json()["title"] == "OLD"
+    assert page_calls == []
@@ -0,0 +1,67 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routers import lesson, quiz
+from llm_core import generation_service, providers
+from testing.testing_data import TEST_LESSON_OUTPUT
+
+
+@pytest.fixture
+def llm_app():
+    test_app = FastAPI()
+    test_app.include_router(lesson.router)
+    test_app.include_router(quiz.router)
+    return test_app
+
+
+class FakeAsyncModels:
+    def __init__(self, text: str):
+        self.text = text
+        self.calls = 0
+
+    async def generate_content(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(text=self.text)
+
+
+@pytest.mark.asyncio
+async def test_lesson_route_returns_lesson(llm_app):
+    transport = httpx.ASGITransport(app=llm_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post(
+            "/v1/lesson", json={"year_group": 8, "subject": "Science"}
+        )
+
+    assert res.status_code == 200
+    body = res.json()
+    assert body["title"] == json.loads(TEST_LESSON_OUTPUT)["title"]
+    assert body["year_group"] == 8
+
+
+@pytest.mark.asyncio
+async def test_quiz_route_returns_three_questions(llm_app):
+    transport = httpx.ASGITransport(app=llm_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post(
+            "/v1/quiz", json={"lesson_text": "Circuits.", "year_group": 8}
+        )
+
+    assert res.status_code == 200
+    assert len(res.json()["quiz_questions"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_lesson_uses_async_client(monkeypatch):
+    models = FakeAsyncModels(TEST_LESSON_OUTPUT)
+    fake_client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    monkeypatch.setattr(providers, "get_genai_client", lambda: fake_client)
+    monkeypatch.setattr(providers, "_provider", providers.GeminiProvider())
+
+    text = await generation_service.generate_daily_lesson_async(8, "Science", "circuits")
+
+    assert text == TEST_LESSON_OUTPUT
+    assert models.calls == 1
@@ -0,0 +1,127 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.exceptions import RateLimitError, UpstreamUnavailableError
+from app.main import create_app
+from app.routers import lesson
+from services import image_service
+from services.image_store import ImageStore, image_digest, sniff_image_type
+from testing.testing_data import TEST_IMAGE_BASE64
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def image_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service, "image_store", ImageStore(str(tmp_path)))
+    test_app = FastAPI()
+    test_app.include_router(lesson.router)
+    transport = httpx.ASGITransport(app=test_app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def test_image_digest_normalizes_whitespace_and_includes_model():
+    assert image_digest("a  red\nkite", "m1") == image_digest(" a red kite ", "m1")
+    assert image_digest("a red kite", "m1") != image_digest("a red kite", "m2")
+
+
+def test_sniff_image_type():
+    assert sniff_image_type(PNG_BYTES) == (".png", "image/png")
+    assert sniff_image_type(base64.b64decode(TEST_IMAGE_BASE64))[1] == "image/svg+xml"
+
+
+def test_image_store_round_trip(tmp_path):
+    store = ImageStore(str(tmp_path))
+    digest = image_digest("a red kite", "m1")
+
+    assert store.get(digest) is None
+    stored = store.put(digest, PNG_BYTES)
+
+    assert store.get(digest) == stored
+    assert stored.content_type == "image/png"
+    with open(stored.path, "rb") as f:
+        assert f.read() == PNG_BYTES
+    assert store.get("../etc/passwd") is None
+
+
+@pytest.mark.asyncio
+async def test_create_image_returns_digest_and_serves_bytes(image_client, monkeypatch):
+    calls = []
+
+    async def fake_generate(prompt):
+        calls.append(prompt)
+        return PNG_BYTES
+
+    monkeypatch.setattr(image_service, "generate_image_from_prompt_async", fake_generate)
+
+    async with image_client as client:
+        res = await client.post(
+            "/v1/image", json={"prompt": "a red kite", "include_base64": False}
+        )
+        again = await client.post("/v1/image", json={"prompt": "a red kite"})
+
+        body = res.json()
+        assert res.status_code == 200
+        assert body["image_base64"] is None
+        assert body["url"] == f"/v1/image/{body['digest']}"
+        assert base64.b64decode(again.json()["image_base64"]) == PNG_BYTES
+        assert len(calls) == 1
+
+        img = await client.get(body["url"])
+        assert img.status_code == 200
+        assert img.content == PNG_BYTES
+        assert img.headers["content-type"] == "image/png"
+        assert img.headers["etag"] == f'"{body["digest"]}"'
+        assert "immutable" in img.headers["cache-control"]
+
+        cached = await client.get(body["url"], headers={"If-None-Match": img.headers["etag"]})
+        assert cached.status_code == 304
+
+        missing = await client.get("/v1/image/" + "0" * 64)
+        assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_background_image_upstream_errors_map_to_retry_after(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service, "image_store", ImageStore(str(tmp_path)))
+    monkeypatch.setattr(image_service, "_failed_images", {})
+    release = asyncio.Event()
+
+    async def unavailable(prompt):
+        await release.wait()
+        raise UpstreamUnavailableError("Image model unavailable.", retry_after=5)
+
+    async def rate_limited(prompt):
+        raise RateLimitError("Image quota used up.", retry_after=7)
+
+    async def generated(prompt):
+        return PNG_BYTES
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # Still rendering when the client asks: it waits and gets a 503.
+        monkeypatch.setattr(image_service, "generate_image_from_prompt_async", unavailable)
+        digest = await image_service.start_image("a grey kite")
+        waiting = asyncio.create_task(client.get(image_service.image_url(digest)))
+        await asyncio.sleep(0.01)
+        release.set()
+        res = await waiting
+        assert res.status_code == 503
+        assert res.headers["retry-after"] == "5"
+
+        # Already failed when the client asks: a 429, not a 404.
+        monkeypatch.setattr(image_service, "generate_image_from_prompt_async", rate_limited)
+        digest = await image_service.start_image("a blue kite")
+        await asyncio.gather(*image_service._pending_images.values(), return_exceptions=True)
+        res = await client.get(image_service.image_url(digest))
+        assert res.status_code == 429
+        assert res.headers["retry-after"] == "7"
+
+        # Starting the image again clears the failure.
+        monkeypatch.setattr(image_service, "generate_image_from_prompt_async", generated)
+        await image_service.start_image("a blue kite")
+        assert (await client.get(image_service.image_url(digest))).status_code == 200
@@ -0,0 +1,142 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.exceptions import LessonGenerationError
+from app.metrics import LLM_JSON_REPAIRS, LLM_JSON_RESPONSES
+from llm_core import generation_service, providers
+from llm_core.json_repair import loads, normalize_quiz
+from services.lesson_service import parse_lesson_response
+from testing.testing_data import TEST_LESSON_OUTPUT, TEST_QUIZ_DATA_PERFECT
+
+QUIZ_JSON = json.dumps({"quiz_questions": TEST_QUIZ_DATA_PERFECT})
+
+
+@pytest.mark.parametrize(
+    "text, repairs",
+    [
+        ('{"a": [1, 2]}', []),
+        ('```json\n{"a": [1, 2]}\n```', ["code_fence"]),
+        ('Here is your quiz:\n{"a": [1, 2]}\nHope this helps!', ["leading_text", "trailing_text"]),
+        ('{"a": [1, 2,],}', ["trailing_comma", "trailing_comma"]),
+        ('{"a": [1, 2]', ["unclosed_brackets"]),
+        ('```json\n{"a": [1, 2', ["code_fence", "unclosed_brackets"]),
+    ],
+)
+def test_loads_repairs_mechanical_faults(text, repairs):
+    value, applied = loads(text)
+
+    assert value == {"a": [1, 2]}
+    assert applied == repairs
+
+
+@pytest.mark.parametrize("text", ['{"title": "Circ', "no json here", '{"a" 1}', None])
+def test_loads_rejects_what_it_cannot_salvage(text):
+    with pytest.raises(ValueError):
+        loads(text)
+
+
+def test_normalize_quiz_fixes_near_misses():
+    question = {
+        "question": "Which part provides energy?",
+        "options": ["A) Battery", "B) Wire", "C) Bulb", "D) Switch", "E) Fuse"],
+        "correct_answer": "battery",
+        "explanation": "The battery is the power source.",
+    }
+    repairs = []
+
+    quiz = normalize_quiz([question], repairs)
+
+    fixed = quiz["quiz_questions"][0]
+    assert fixed["options"] == ["Battery", "Wire", "Bulb", "Switch"]
+    assert fixed["correct_key"] == "A"
+    assert set(repairs) == {
+        "bare_list",
+        "option_labels",
+        "correct_key_name",
+        "correct_key",
+        "options_length",
+    }
+
+
+def test_parse_lesson_response_repairs_fenced_truncated_json():
+    text = "```json\n" + TEST_LESSON_OUTPUT.rstrip().removesuffix("}")
+
+    lesson = parse_lesson_response(text)
+
+    assert lesson == json.loads(TEST_LESSON_OUTPUT)
+
+
+class ScriptedProvider:
+    """Answers generate_content calls with the given texts in turn."""
+
+    name = "scripted"
+
+    def __init__(self, *texts: str):
+        self.texts = list(texts)
+        self.contents = []
+
+    async def generate_content(self, model, contents, config=None):
+        self.contents.append(contents)
+        return SimpleNamespace(text=self.texts.pop(0), usage_metadata=None)
+
+
+def _counts(endpoint: str) -> dict:
+    return {
+        outcome: LLM_JSON_RESPONSES.value(endpoint=endpoint, outcome=outcome)
+        for outcome in ("clean", "repaired", "regenerated", "failed")
+    }
+
+
+@pytest.mark.asyncio
+async def test_repairable_quiz_needs_no_second_call(monkeypatch):
+    provider = ScriptedProvider("Sure! ```json\n" + QUIZ_JSON[:-1])
+    monkeypatch.setattr(providers, "_provider", provider)
+    before = _counts("quiz")
+    fences = LLM_JSON_REPAIRS.value(endpoint="quiz", repair="code_fence")
+
+    quiz = await generation_service.generate_quiz_from_lesson_async(f"Lesson {uuid.uuid4()}", 8)
+
+    assert len(quiz.quiz_questions) == 3
+    assert len(provider.contents) == 1
+    assert _counts("quiz")["repaired"] == before["repaired"] + 1
+    assert LLM_JSON_REPAIRS.value(endpoint="quiz", repair="code_fence") == fences + 1
+
+
+@pytest.mark.asyncio
+async def test_unrepairable_quiz_gets_a_targeted_correction(monkeypatch):
+    short = json.loads(QUIZ_JSON)
+    short["quiz_questions"][1]["options"] = short["quiz_questions"][1]["options"][:2]
+    provider = ScriptedProvider(json.dumps(short), QUIZ_JSON)
+    monkeypatch.setattr(providers, "_provider", provider)
+    before = _counts("quiz")
+
+    quiz = await generation_service.generate_quiz_from_lesson_async(f"Lesson {uuid.uuid4()}", 8)
+
+    assert len(quiz.quiz_questions) == 3
+    assert len(provider.contents) == 2
+    # The follow-up carries the rejected answer and what was wrong with it.
+    rejected, correction = provider.contents[1][-2:]
+    assert rejected == {"role": "model", "parts": [{"text": json.dumps(short)}]}
+    assert "quiz_questions.1.options" in correction["parts"][0]["text"]
+    assert _counts("quiz")["regenerated"] == before["regenerated"] + 1
+
+
+@pytest.mark.asyncio
+async def test_lesson_fails_with_502_after_a_bad_correction(monkeypatch):
+    provider = ScriptedProvider('{"title": "Circ', "still not json")
+    monkeypatch.setattr(providers, "_provider", provider)
+    before = _counts("lesson")
+
+    with pytest.raises(LessonGenerationError) as excinfo:
+        await generation_service.parse_lesson_async(
+            await generation_service.generate_daily_lesson_async(8, "Science", str(uuid.uuid4())),
+            8,
+            "Science",
+        )
+
+    assert excinfo.value.status_code == 502
+    assert len(provider.contents) == 2
+    assert _counts("lesson")["failed"] == before["failed"] + 1
@@ -0,0 +1,71 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routers import lesson
+from services import lesson_service
+from services.cache import TTLCache
+from services.lesson_stream import LessonStreamParser
+from testing.testing_data import TEST_LESSON_OUTPUT
+
+
+def _collect(chunks):
+    parser = LessonStreamParser()
+    fields = {}
+    for chunk in chunks:
+        for field, delta in parser.feed(chunk):
+            fields[field] = fields.get(field, "") + delta
+    return fields
+
+
+def test_parser_extracts_streamed_fields_at_any_chunk_boundary():
+    text = json.dumps(
+        {
+            "title": 'Volts & "Amps" ⚡\U0001f50b',
+            "lesson_text": "Line one.\nLine \\ two\ttabbed.",
+            "visual_prompt": "not streamed",
+        }
+    )
+    expected = {k: v for k, v in json.loads(text).items() if k != "visual_prompt"}
+
+    for split in range(len(text)):
+        assert _collect([text[:split], text[split:]]) == expected
+    assert _collect(list(text)) == expected
+
+
+def test_parser_ignores_markdown_fences():
+    text = '```json\n{"title": "Circuits", "lesson_text": "Body"}\n```'
+    assert _collect([text]) == {"title": "Circuits", "lesson_text": "Body"}
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_lesson_stream_route_sends_deltas_then_final_lesson(monkeypatch):
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+    test_app = FastAPI()
+    test_app.include_router(lesson.router)
+
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post(
+            "/v1/lesson/stream", json={"year_group": 8, "subject": "Science"}
+        )
+
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(res.text)
+    expected = json.loads(TEST_LESSON_OUTPUT)
+
+    streamed_text = "".join(d["delta"] for e, d in events if e == "lesson_text")
+    assert streamed_text == expected["lesson_text"]
+    assert events[-1][0] == "lesson"
+    assert events[-1][1]["visual_prompt"] == expected["visual_prompt"]
+    assert events[-1][1]["year_group"] == 8
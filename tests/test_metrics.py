@@ -0,0 +1,112 @@
+import json
+import logging
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.logging_config import JsonFormatter, KeyValueFormatter
+from app.metrics import (
+    CACHE_LOOKUPS,
+    DB_OPERATION_SECONDS,
+    LLM_TOKENS,
+    LLM_UPSTREAM_SECONDS,
+    STAGE_SECONDS,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+)
+from app.routers import metrics, quiz
+from llm_core import providers
+from llm_core.generation_service import QUIZ_MODEL
+from llm_core.providers import LocalProfile, LocalProvider
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="parse")
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="parse",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{stage="parse"} 4.25' in lines
+    assert 'demo_seconds_count{stage="parse"} 4' in lines
+
+
+def test_counter_escapes_labels_and_checks_names():
+    counter = Counter("demo_total", "Demo.", ("name",))
+    counter.inc(2, name='say "hi"')
+
+    assert 'demo_total{name="say \\"hi\\""} 2' in counter.render()
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_stages_and_tokens(monkeypatch):
+    monkeypatch.setattr(providers, "_provider", LocalProvider(LocalProfile(output_tokens=120)))
+    test_app = FastAPI()
+    test_app.include_router(quiz.router)
+    test_app.include_router(metrics.router)
+    test_app.add_middleware(MetricsMiddleware)
+
+    tokens_before = LLM_TOKENS.value(endpoint="quiz", model=QUIZ_MODEL, kind="output")
+    calls_before = LLM_UPSTREAM_SECONDS.count(endpoint="quiz", model=QUIZ_MODEL, outcome="ok")
+    validated_before = STAGE_SECONDS.count(endpoint="quiz", stage="validate")
+    misses_before = CACHE_LOOKUPS.value(cache="quiz", result="miss")
+
+    lesson_text = f"Lesson {uuid.uuid4()} about circuits."
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(2):
+            res = await client.post("/v1/quiz", json={"lesson_text": lesson_text, "year_group": 8})
+            assert res.status_code == 200
+        res = await client.get("/metrics")
+
+    # The second request is a cache hit, so the upstream was called once.
+    assert LLM_TOKENS.value(endpoint="quiz", model=QUIZ_MODEL, kind="output") == tokens_before + 120
+    assert LLM_UPSTREAM_SECONDS.count(endpoint="quiz", model=QUIZ_MODEL, outcome="ok") == calls_before + 1
+    assert STAGE_SECONDS.count(endpoint="quiz", stage="validate") == validated_before + 1
+    assert CACHE_LOOKUPS.value(cache="quiz", result="miss") == misses_before + 1
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = res.text
+    assert "# TYPE llm_tokens_total counter" in body
+    assert f'llm_tokens_total{{endpoint="quiz",model="{QUIZ_MODEL}",kind="prompt"}}' in body
+    assert 'stage_duration_seconds_count{endpoint="quiz",stage="rate_limit_wait"}' in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/v1/quiz",status="200"}' in body
+
+
+@pytest.mark.asyncio
+async def test_db_operations_are_timed(app):
+    before = DB_OPERATION_SECONDS.count(operation="insert")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post(
+            "/scores", json={"subject": "Maths", "year_group": 8, "score": 2, "total_questions": 3}
+        )
+
+    assert res.status_code == 200
+    assert DB_OPERATION_SECONDS.count(operation="insert") == before + 1
+
+
+def test_formatters_include_extra_fields():
+    record = logging.LogRecord("app.test", logging.WARNING, __file__, 1, "quiz failed", None, None)
+    record.model = "m"
+    record.error = "bad json"
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "warning"
+    assert entry["msg"] == "quiz failed"
+    assert entry["model"] == "m"
+    assert entry["error"] == "bad json"
+
+    line = KeyValueFormatter().format(record)
+    assert 'logger="app.test"' in line
+    assert 'error="bad json"' in line
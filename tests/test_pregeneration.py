@@ -0,0 +1,77 @@
+import pytest
+
+from app.exceptions import LessonGenerationError, UpstreamUnavailableError
+from services import lesson_service, pregeneration
+from services.cache import TTLCache
+from services.pregeneration import Checkpoint, build_jobs, pregenerate
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=64))
+    monkeypatch.setattr(lesson_service, "quiz_cache", TTLCache(max_entries=64))
+
+
+def test_build_jobs_expands_matrix():
+    jobs = build_jobs([7, 8], ["Maths", "Science"], ["", "fractions"])
+    assert len(jobs) == 8
+    assert len({job.key for job in jobs}) == 8
+
+
+@pytest.mark.asyncio
+async def test_pregenerate_warms_caches_and_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    jobs = build_jobs([7, 8], ["Maths", "Science"])
+
+    report = await pregenerate(jobs, concurrency=3, checkpoint_path=checkpoint)
+
+    assert report.succeeded == 4
+    assert report.failed == 0
+    assert len(lesson_service.lesson_cache) == 4
+    assert Checkpoint(checkpoint).done == {job.key for job in jobs}
+
+    resumed = await pregenerate(jobs, concurrency=3, checkpoint_path=checkpoint)
+    assert resumed.skipped == 4
+    assert resumed.succeeded == 0
+
+
+@pytest.mark.asyncio
+async def test_pregenerate_counts_failures_and_does_not_checkpoint_them(tmp_path, monkeypatch):
+    async def flaky_lesson(year_group, subject, topic_idea):
+        if subject == "History":
+            raise LessonGenerationError("upstream down", status_code=502)
+        return {"title": "t", "lesson_text": subject, "visual_prompt": ""}
+
+    monkeypatch.setattr(pregeneration, "get_lesson", flaky_lesson)
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+
+    report = await pregenerate(
+        build_jobs([8], ["Maths", "History"]), checkpoint_path=checkpoint
+    )
+
+    assert report.succeeded == 1
+    assert report.failed == 1
+    assert report.failures[0]["subject"] == "History"
+    assert len(Checkpoint(checkpoint).done) == 1
+
+
+@pytest.mark.asyncio
+async def test_pregenerate_reports_upstream_errors_without_aborting(monkeypatch):
+    calls = []
+
+    async def lesson(year_group, subject, topic_idea):
+        calls.append(subject)
+        if subject == "History":
+            raise UpstreamUnavailableError("breaker open", retry_after=0)
+        return {"title": "t", "lesson_text": subject, "visual_prompt": ""}
+
+    monkeypatch.setattr(pregeneration, "get_lesson", lesson)
+
+    report = await pregenerate(
+        build_jobs([8], ["Maths", "History", "Science", "English"]), concurrency=1
+    )
+
+    assert len(calls) == 4
+    assert report.succeeded == 3
+    assert report.failed == 1
+    assert report.failures[0]["error"] == "breaker open"
@@ -0,0 +1,83 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.metrics import LLM_PROMPT_TOKENS_SAVED
+from llm_core import generation_service, prompt_budget, providers
+from llm_core.prompt_budget import condense_text
+from llm_core.rate_limiter import estimate_tokens
+from testing.testing_data import TEST_LESSON_OUTPUT, TEST_QUIZ_DATA_PERFECT
+
+LESSON_TEXT = json.loads(TEST_LESSON_OUTPUT)["lesson_text"]
+
+
+def test_condense_keeps_short_text_unchanged():
+    condensed = condense_text("Circuits need a power source.", 500)
+
+    assert condensed.text == "Circuits need a power source."
+    assert condensed.saved_tokens == 0
+
+
+def test_condense_fits_budget_and_keeps_sentence_order():
+    condensed = condense_text(LESSON_TEXT, 250)
+
+    assert condensed.tokens <= 250
+    assert condensed.original_tokens == estimate_tokens(LESSON_TEXT)
+    assert condensed.saved_tokens > 200
+    # Only whole sentences from the lesson, in the order they appeared.
+    sentences = [s for _, _, s in prompt_budget._sentences(condensed.text)]
+    positions = [LESSON_TEXT.index(s) for s in sentences]
+    assert positions == sorted(positions)
+    assert "circuit" in condensed.text
+
+
+def test_condense_cuts_a_single_overlong_sentence():
+    text = " ".join(["electrons"] * 1000)
+
+    condensed = condense_text(text, 0)
+
+    assert condensed.tokens <= prompt_budget.MIN_TEXT_TOKENS
+    assert condensed.text.startswith("electrons electrons")
+
+
+class RecordingProvider:
+    name = "recording"
+
+    def __init__(self):
+        self.contents = []
+
+    async def generate_content(self, model, contents, config=None):
+        self.contents.append(contents)
+        return SimpleNamespace(
+            text=json.dumps({"quiz_questions": TEST_QUIZ_DATA_PERFECT}), usage_metadata=None
+        )
+
+
+@pytest.mark.asyncio
+async def test_quiz_prompt_is_condensed_to_its_budget(monkeypatch):
+    provider = RecordingProvider()
+    monkeypatch.setattr(providers, "_provider", provider)
+    monkeypatch.setitem(prompt_budget.PROMPT_TOKEN_BUDGETS, "quiz", 600)
+    saved_before = LLM_PROMPT_TOKENS_SAVED.value(endpoint="quiz")
+    lesson_text = f"{LESSON_TEXT}\n\nLesson {uuid.uuid4()}."
+
+    quiz = await generation_service.generate_quiz_from_lesson_async(lesson_text, 8)
+
+    assert len(quiz.quiz_questions) == 3
+    prompt = [part["text"] for part in provider.contents[0][0]["parts"]]
+    assert estimate_tokens(*prompt) <= 600
+    assert LLM_PROMPT_TOKENS_SAVED.value(endpoint="quiz") > saved_before
+
+
+@pytest.mark.asyncio
+async def test_quiz_prompt_is_untouched_without_a_budget(monkeypatch):
+    provider = RecordingProvider()
+    monkeypatch.setattr(providers, "_provider", provider)
+    monkeypatch.setitem(prompt_budget.PROMPT_TOKEN_BUDGETS, "quiz", 0)
+    lesson_text = f"{LESSON_TEXT}\n\nLesson {uuid.uuid4()}."
+
+    await generation_service.generate_quiz_from_lesson_async(lesson_text, 8)
+
+    assert lesson_text in provider.contents[0][0]["parts"][1]["text"]
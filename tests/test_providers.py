@@ -0,0 +1,81 @@
+import json
+import random
+import time
+
+import pytest
+from google.genai.errors import ClientError, ServerError
+
+from app.exceptions import ConfigurationError
+from llm_core import generation_service, providers
+from llm_core.providers import LatencyProfile, LocalProfile, LocalProvider, create_provider
+from testing.testing_data import TEST_LESSON_OUTPUT
+
+CONTENTS = [{"role": "user", "parts": [{"text": "Write a lesson about circuits."}]}]
+
+
+def test_latency_profile_matches_median_and_p95():
+    profile = LatencyProfile(median_ms=200, p95_ms=800)
+    rng = random.Random(7)
+    samples = sorted(profile.sample(rng) for _ in range(5000))
+
+    assert samples[2500] == pytest.approx(0.2, rel=0.1)
+    assert samples[4750] == pytest.approx(0.8, rel=0.15)
+    assert LatencyProfile(median_ms=50).sample(rng) == 0.05
+    assert LatencyProfile().sample(rng) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_local_provider_sleeps_and_reports_usage():
+    provider = LocalProvider(LocalProfile(text_latency=LatencyProfile(median_ms=30), output_tokens=500))
+
+    started = time.perf_counter()
+    response = await provider.generate_content(model="m", contents=CONTENTS)
+
+    assert time.perf_counter() - started >= 0.03
+    assert response.text == TEST_LESSON_OUTPUT
+    assert response.usage_metadata.candidates_token_count == 500
+    assert response.usage_metadata.total_token_count > 500
+
+
+@pytest.mark.asyncio
+async def test_local_provider_streams_the_payload_in_chunks():
+    provider = LocalProvider(LocalProfile(stream_chunk_chars=100))
+
+    stream = await provider.generate_content_stream(model="m", contents=CONTENTS)
+    chunks = [chunk async for chunk in stream]
+
+    assert "".join(c.text for c in chunks) == TEST_LESSON_OUTPUT
+    assert len(chunks) == -(-len(TEST_LESSON_OUTPUT) // 100)
+    assert chunks[-1].usage_metadata.total_token_count > 0
+    assert chunks[0].usage_metadata is None
+
+
+@pytest.mark.asyncio
+async def test_local_provider_fails_like_the_sdk():
+    with pytest.raises(ServerError):
+        await LocalProvider(LocalProfile(error_rate=1.0)).generate_content(model="m", contents=CONTENTS)
+    with pytest.raises(ClientError) as exc_info:
+        await LocalProvider(LocalProfile(rate_limit_rate=1.0)).generate_images(model="m", prompt="x")
+    assert exc_info.value.code == 429
+
+
+@pytest.mark.asyncio
+async def test_generation_runs_through_the_selected_provider(monkeypatch):
+    provider = LocalProvider()
+    monkeypatch.setattr(providers, "_provider", provider)
+
+    lesson = await generation_service.generate_daily_lesson_async(7, "History", "castles")
+    quiz = await generation_service.generate_quiz_from_lesson_async("Castles.", 7)
+    page = await generation_service.generate_daily_page_async(7, "History", "castles")
+    image = await generation_service.generate_image_from_prompt_async("a castle")
+
+    assert json.loads(lesson)["title"]
+    assert len(quiz.quiz_questions) == 3
+    assert page.quiz_questions and page.lesson_text
+    assert image.startswith(b"<svg")
+    assert provider.calls == 4
+
+
+def test_unknown_provider_is_a_configuration_error():
+    with pytest.raises(ConfigurationError):
+        create_provider("carrier-pigeon")
@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.exceptions import RateLimitError
+from app.main import create_app
+from llm_core import generation_service, providers, rate_limiter
+from llm_core.rate_limiter import ModelLimiter, TokenBucket
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(60, clock)  # one per second
+    bucket.consume(60)
+
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 2.0
+    assert bucket.wait_time(2) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_max_in_flight_caps_concurrent_calls():
+    limiter = ModelLimiter("m", max_in_flight=2, queue_timeout=1)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.acquire():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert limiter.admitted == 6
+
+
+@pytest.mark.asyncio
+async def test_full_queue_fails_fast_with_retry_after():
+    limiter = ModelLimiter("m", max_in_flight=1, max_queue=1, queue_timeout=5)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.acquire():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    assert limiter.in_flight == 1
+    assert limiter.waiting == 1
+
+    with pytest.raises(RateLimitError) as exc_info:
+        async with limiter.acquire():
+            pass
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.retry_after >= 1
+    release.set()
+    await asyncio.gather(holder, waiter)
+
+
+@pytest.mark.asyncio
+async def test_budget_beyond_deadline_is_rejected():
+    limiter = ModelLimiter("m", rpm=1, queue_timeout=0.5)
+
+    async with limiter.acquire():
+        pass
+    with pytest.raises(RateLimitError) as exc_info:
+        async with limiter.acquire():
+            pass
+
+    assert exc_info.value.retry_after >= 59
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_over_budget_lesson_returns_429_with_retry_after(monkeypatch):
+    async def generate_content(**kwargs):
+        return SimpleNamespace(text="{}", usage_metadata=None)
+
+    fake_client = SimpleNamespace(
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    )
+    monkeypatch.setattr(providers, "get_genai_client", lambda: fake_client)
+    monkeypatch.setattr(providers, "_provider", providers.GeminiProvider())
+    monkeypatch.setattr(
+        rate_limiter,
+        "_limiters",
+        {generation_service.LESSON_MODEL: ModelLimiter("lesson", rpm=1, queue_timeout=0)},
+    )
+
+    async def live_lesson(**kwargs):
+        return await generation_service._generate_daily_lesson_async(
+            kwargs["year_group"], kwargs["subject"], kwargs["topic_idea"]
+        )
+
+    monkeypatch.setattr("services.lesson_service.generate_daily_lesson_async", live_lesson)
+    monkeypatch.setattr("services.lesson_service.lesson_cache.get", lambda key: None)
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post("/v1/lesson", json={"year_group": 8, "subject": "Maths"})
+
+    assert res.status_code == 429
+    assert int(res.headers["retry-after"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_daily_page_charges_the_output_allowance_once(monkeypatch):
+    charged = []
+
+    class RecordingLimiter(ModelLimiter):
+        def acquire(self, tokens: int = 0):
+            charged.append(tokens)
+            return super().acquire(tokens)
+
+    monkeypatch.setattr(providers, "_provider", providers.LocalProvider())
+    monkeypatch.setattr(
+        rate_limiter, "_limiters", {generation_service.LESSON_MODEL: RecordingLimiter("lesson")}
+    )
+
+    await generation_service._generate_daily_page_async(8, "Science", "Limiter charge")
+
+    contents = generation_service._daily_page_contents(8, "Science", "Limiter charge")
+    assert charged == [
+        generation_service._prompt_tokens(contents) + generation_service.OUTPUT_TOKEN_ALLOWANCE
+    ]
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+from google.genai.errors import ClientError, ServerError
+
+from app.exceptions import LessonGenerationError, RateLimitError, UpstreamUnavailableError
+from llm_core.resilience import CircuitBreaker, UpstreamPolicy, is_retryable
+from services import lesson_service
+from services.cache import TTLCache
+
+
+def _server_error():
+    return ServerError(503, {"error": {"message": "overloaded", "status": "UNAVAILABLE"}})
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker("m", failure_threshold=10))
+    kwargs.setdefault("base_delay", 0)
+    return UpstreamPolicy("test", **kwargs)
+
+
+def test_is_retryable():
+    assert is_retryable(_server_error())
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(ClientError(429, {"error": {"message": "quota"}}))
+    assert not is_retryable(ClientError(400, {"error": {"message": "bad request"}}))
+    assert not is_retryable(ValueError("bad json"))
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_then_succeeds():
+    policy = _policy(max_attempts=3)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise _server_error()
+        return "ok"
+
+    assert await policy.call(flaky) == "ok"
+    assert policy.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_non_retryable_errors():
+    policy = _policy(max_attempts=3)
+    attempts = 0
+
+    async def bad_request():
+        nonlocal attempts
+        attempts += 1
+        raise ClientError(400, {"error": {"message": "bad request"}})
+
+    with pytest.raises(ClientError):
+        await policy.call(bad_request)
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_per_call_timeout():
+    policy = _policy(timeout=0.01, max_attempts=1)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await policy.call(slow)
+    assert policy.timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_when_first_is_slow():
+    policy = _policy(hedge=True, hedge_min_samples=1)
+    policy.latency.record(0.01)
+    calls = 0
+
+    async def first_slow():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(1 if calls == 1 else 0)
+        return calls
+
+    assert await policy.call(first_slow) == 2
+    assert policy.hedged == 1
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_recovers(clock):
+    breaker = CircuitBreaker("m", failure_threshold=2, reset_timeout=30, clock=clock)
+    policy = _policy(breaker=breaker, max_attempts=1)
+
+    async def down():
+        raise _server_error()
+
+    async def up():
+        return "ok"
+
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            await policy.call(down)
+    assert breaker.state == "open"
+
+    with pytest.raises(UpstreamUnavailableError) as exc_info:
+        await policy.call(up)
+    assert exc_info.value.retry_after == 30
+
+    clock.now = 31
+    assert await policy.call(up) == "ok"
+    assert breaker.state == "closed"
+
+
+async def _half_open(clock):
+    breaker = CircuitBreaker("m", failure_threshold=1, reset_timeout=30, clock=clock)
+    policy = _policy(breaker=breaker, max_attempts=1)
+
+    async def down():
+        raise _server_error()
+
+    with pytest.raises(ServerError):
+        await policy.call(down)
+    clock.now = 31
+    return breaker, policy
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_lets_the_next_call_probe(clock):
+    breaker, policy = await _half_open(clock)
+    started = asyncio.Event()
+
+    async def hangs():
+        started.set()
+        await asyncio.sleep(10)
+
+    probe = asyncio.ensure_future(policy.call(hangs))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    async def up():
+        return "ok"
+
+    assert await policy.call(up) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_local_rate_limit_does_not_close_a_half_open_breaker(clock):
+    breaker, policy = await _half_open(clock)
+
+    async def limited():
+        raise RateLimitError("local budget exhausted")
+
+    with pytest.raises(RateLimitError):
+        await policy.call(limited)
+    assert breaker.state == "half_open"
+
+    async def up():
+        return "ok"
+
+    assert await policy.call(up) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_get_lesson_serves_stale_copy_when_upstream_fails(monkeypatch, clock):
+    cache = TTLCache(max_entries=8, ttl_seconds=10, stale_seconds=100, clock=clock)
+    monkeypatch.setattr(lesson_service, "lesson_cache", cache)
+    key = lesson_service.lesson_cache_key(8, "Science", "circuits")
+    cache.set(key, {"title": "Old", "lesson_text": "Old text", "visual_prompt": ""})
+    clock.now = 50
+
+    async def failing(**kwargs):
+        raise UpstreamUnavailableError("down", retry_after=5)
+
+    monkeypatch.setattr(lesson_service, "generate_daily_lesson_async", failing)
+
+    lesson = await lesson_service.get_lesson(8, "Science", "circuits")
+    assert lesson["title"] == "Old"
+    assert cache.stale_hits == 1
+
+    clock.now = 200
+    with pytest.raises(UpstreamUnavailableError):
+        await lesson_service.get_lesson(8, "Science", "circuits")
+
+    async def generation_error(**kwargs):
+        raise LessonGenerationError("boom", status_code=502)
+
+    monkeypatch.setattr(lesson_service, "generate_daily_lesson_async", generation_error)
+    with pytest.raises(LessonGenerationError):
+        await lesson_service.get_lesson(8, "Science", "circuits")
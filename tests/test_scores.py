@@ -0,0 +1,459 @@
+import httpx
+import pytest
+
+from app.db import DatabasePool, get_reader, init_db
+
+
+@pytest.fixture
+def client(app):
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_create_score_and_summary(client):
+    async with client:
+        for subject, score in [("Maths", 3), ("Maths", 1), ("Science", 2)]:
+            res = await client.post(
+                "/scores",
+                json={"subject": subject, "year_group": 8, "score": score, "total_questions": 3},
+            )
+            assert res.status_code == 200
+            assert res.json()["id"] > 0
+
+        summary = (await client.get("/scores/summary")).json()
+
+    assert summary["total_attempts"] == 3
+    assert summary["overall_avg_accuracy"] == pytest.approx(2 / 3)
+    maths = next(s for s in summary["by_subject"] if s["subject"] == "Maths")
+    assert maths["attempts"] == 2
+    assert maths["best_accuracy"] == pytest.approx(1.0)
+    assert maths["worst_accuracy"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.asyncio
+async def test_pool_uses_wal_and_read_only_readers(tmp_path, monkeypatch):
+    path = str(tmp_path / "scores.db")
+    monkeypatch.setattr("app.db.DB_PATH", path)
+    await init_db()
+
+    pool = DatabasePool(path, readers=2)
+    await pool.open()
+    try:
+        async with pool.writer() as db:
+            mode = await (await db.execute("PRAGMA journal_mode")).fetchone()
+            sync = await (await db.execute("PRAGMA synchronous")).fetchone()
+            assert mode[0] == "wal"
+            assert sync[0] == 1  # NORMAL
+
+        async with pool.reader() as db:
+            with pytest.raises(Exception):
+                await db.execute("DELETE FROM quiz_attempts")
+
+        # Exports read outside the pool: every pooled reader stays free.
+        async with pool.reader(), pool.reader(), pool.dedicated_reader() as export_db:
+            with pytest.raises(Exception):
+                await export_db.execute("DELETE FROM quiz_attempts")
+        with pytest.raises(ValueError):
+            await export_db.execute("SELECT 1")
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_subject_rollup_backfills_and_rebuilds(tmp_path):
+    import aiosqlite
+
+    from app.db import create_schema
+    from app.rollups import rebuild_rollups
+
+    path = str(tmp_path / "legacy.db")
+    async with aiosqlite.connect(path) as db:
+        # A database from before the rollup existed.
+        await db.execute(
+            """
+            CREATE TABLE quiz_attempts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL,
+                subject TEXT NOT NULL, year_group INTEGER NOT NULL, topic TEXT,
+                score INTEGER NOT NULL, total_questions INTEGER NOT NULL
+            )
+            """
+        )
+        await db.executemany(
+            "INSERT INTO quiz_attempts (created_at, subject, year_group, score, total_questions)"
+            " VALUES ('2026-01-01', ?, 8, ?, 4)",
+            [("Maths", 1), ("Maths", 3), ("Art", 4)],
+        )
+        await db.commit()
+
+        await create_schema(db)
+        rows = await (
+            await db.execute("SELECT * FROM subject_rollup ORDER BY subject")
+        ).fetchall()
+        assert rows == [("Art", 1, 1.0, 1.0, 1.0), ("Maths", 2, 1.0, 0.75, 0.25)]
+
+        # New inserts are rolled up by the trigger in the same transaction.
+        await db.execute(
+            "INSERT INTO quiz_attempts (created_at, subject, year_group, score, total_questions)"
+            " VALUES ('2026-01-02', 'Art', 8, 0, 4)"
+        )
+        await db.rollback()
+        (attempts,) = await (
+            await db.execute("SELECT attempts FROM subject_rollup WHERE subject = 'Art'")
+        ).fetchone()
+        assert attempts == 1
+
+        await db.execute("UPDATE subject_rollup SET attempts = 99")
+        await rebuild_rollups(db)
+        rows = await (
+            await db.execute("SELECT subject, attempts FROM subject_rollup ORDER BY subject")
+        ).fetchall()
+        assert rows == [("Art", 1), ("Maths", 2)]
+
+
+async def _insert_attempts(db, rows):
+    await db.executemany(
+        "INSERT INTO quiz_attempts (created_at, subject, year_group, topic, score, total_questions)"
+        " VALUES (?, ?, ?, ?, ?, 4)",
+        rows,
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_attempts_keyset_pagination_and_filters(client, db_conn):
+    # Two attempts share a timestamp so the id tie-breaker is exercised.
+    await _insert_attempts(
+        db_conn,
+        [
+            ("2026-01-01T09:00:00.000000+00:00", "Maths", 8, "fractions", 1),
+            ("2026-01-02T09:00:00.000000+00:00", "Maths", 8, None, 2),
+            ("2026-01-02T09:00:00.000000+00:00", "Science", 7, None, 3),
+            ("2026-01-03T09:00:00.000000+00:00", "Maths", 9, None, 4),
+            ("2026-01-04T09:00:00.000000+00:00", "Maths", 8, "fractions", 0),
+        ],
+    )
+
+    async with client:
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = (await client.get("/scores/attempts", params=params)).json()
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        maths_8 = (
+            await client.get("/scores/attempts", params={"subject": "Maths", "year_group": 8})
+        ).json()
+        window = (
+            await client.get(
+                "/scores/attempts",
+                params={"since": "2026-01-02T00:00:00Z", "until": "2026-01-04T00:00:00Z"},
+            )
+        ).json()
+        topic_summary = (await client.get("/scores/summary", params={"topic": "fractions"})).json()
+        bad_cursor = await client.get("/scores/attempts", params={"cursor": "not-a-cursor"})
+
+    assert seen == [5, 4, 3, 2, 1]
+    assert [i["id"] for i in maths_8["items"]] == [5, 2, 1]
+    assert maths_8["next_cursor"] is None
+    assert [i["id"] for i in window["items"]] == [4, 3, 2]
+    assert topic_summary["total_attempts"] == 2
+    assert topic_summary["overall_avg_accuracy"] == pytest.approx(0.125)
+    assert bad_cursor.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"subject": "Maths"},
+        {"year_group": 8},
+        {"subject": "Maths", "year_group": 8},
+        {"topic": "fractions"},
+        {"since": "2026-01-01T00:00:00"},
+        {"subject": "Maths", "since": "2026-01-01T00:00:00", "until": "2026-02-01T00:00:00"},
+    ],
+)
+async def test_attempt_listings_are_served_from_indexes(db_conn, filters):
+    from datetime import datetime
+
+    from app.score_queries import AttemptFilters, attempts_page_query, encode_cursor
+
+    for key in ("since", "until"):
+        if key in filters:
+            filters[key] = datetime.fromisoformat(filters[key])
+    cursor = encode_cursor("2026-01-15T00:00:00.000000+00:00", 10)
+
+    for page_cursor in (None, cursor):
+        sql, params = attempts_page_query(AttemptFilters(**filters), 50, page_cursor)
+        plan = " | ".join(
+            row[3]
+            for row in await (await db_conn.execute("EXPLAIN QUERY PLAN " + sql, params)).fetchall()
+        )
+        assert "USING INDEX idx_attempts_" in plan or "USING COVERING INDEX idx_attempts_" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filters", [{"subject": "Maths"}, {"year_group": 8}, {"topic": "x"}])
+async def test_filtered_summary_searches_an_index(db_conn, filters):
+    from app.score_queries import AttemptFilters, filtered_summary_query
+
+    sql, params = filtered_summary_query(AttemptFilters(**filters))
+    plan = [
+        row[3]
+        for row in await (await db_conn.execute("EXPLAIN QUERY PLAN " + sql, params)).fetchall()
+    ]
+    assert plan[0].startswith("SEARCH quiz_attempts USING INDEX idx_attempts_")
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_json_array_and_ndjson(client, db_conn, monkeypatch):
+    import json
+
+    monkeypatch.setattr("app.routers.scores.SCORES_BULK_CHUNK_SIZE", 2)
+    attempts = [
+        {"subject": "Maths", "year_group": 8, "score": i % 4, "total_questions": 4}
+        for i in range(5)
+    ]
+
+    async def trickle(body: bytes, size: int = 7):
+        # Split mid-token to exercise the incremental parser.
+        for start in range(0, len(body), size):
+            yield body[start : start + size]
+
+    async with client:
+        as_array = await client.post(
+            "/scores/bulk", content=trickle(json.dumps(attempts).encode())
+        )
+        as_ndjson = await client.post(
+            "/scores/bulk",
+            content=trickle("\n".join(json.dumps(a) for a in attempts).encode()),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        summary = (await client.get("/scores/summary")).json()
+
+    assert as_array.status_code == 200
+    assert as_array.json()["ids"] == [1, 2, 3, 4, 5]
+    assert as_ndjson.json()["ids"] == [6, 7, 8, 9, 10]
+    assert summary["total_attempts"] == 10
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_stops_at_first_invalid_item(client, db_conn, monkeypatch):
+    monkeypatch.setattr("app.routers.scores.SCORES_BULK_CHUNK_SIZE", 2)
+    good = {"subject": "Art", "year_group": 7, "score": 1, "total_questions": 2}
+
+    async with client:
+        invalid = await client.post(
+            "/scores/bulk", json=[good, good, good, {**good, "total_questions": 0}, good]
+        )
+        malformed = await client.post("/scores/bulk", content=b'[{"subject": "Art"')
+
+    assert invalid.status_code == 422
+    detail = invalid.json()["detail"]
+    assert detail["index"] == 3
+    # The first chunk was committed before the bad item was read.
+    assert detail["inserted_ids"] == [1, 2]
+    assert malformed.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_upload_fails_fast_on_a_malformed_item_mid_body(client, db_conn, monkeypatch):
+    import json
+
+    monkeypatch.setattr("app.routers.scores.SCORES_BULK_CHUNK_SIZE", 2)
+    monkeypatch.setattr("app.score_ingest.SCORES_BULK_MAX_ITEM_BYTES", 512)
+    good = json.dumps({"subject": "Art", "year_group": 7, "score": 1, "total_questions": 2})
+    body = ("[" + ",".join([good, good, '{"subject": Art}'] + [good] * 2000) + "]").encode()
+    sent = 0
+
+    async def trickle(size: int = 64):
+        nonlocal sent
+        for start in range(0, len(body), size):
+            sent += 1
+            yield body[start : start + size]
+
+    async with client:
+        res = await client.post("/scores/bulk", content=trickle())
+
+    assert res.status_code == 400
+    assert res.json()["detail"]["inserted_ids"] == [1, 2]
+    # Rejected once the bad item outgrew the limit, not at the end of the body.
+    assert sent < 20
+
+    (count,) = await (await db_conn.execute("SELECT COUNT(*) FROM quiz_attempts")).fetchone()
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_summary_etag_and_write_invalidation(app, client, monkeypatch):
+    from app.score_cache import summary_cache
+
+    monkeypatch.setattr(summary_cache, "enabled", True)
+    attempt = {"subject": "Maths", "year_group": 8, "score": 2, "total_questions": 4}
+    async with client:
+        await client.post("/scores", json=attempt)
+        first = await client.get("/scores/summary")
+        etag = first.headers["etag"]
+
+        # A matching poll is answered before any connection is checked out.
+        def no_db():
+            raise AssertionError("database used for a 304")
+
+        with monkeypatch.context() as m:
+            m.setitem(app.dependency_overrides, get_reader, _yield(no_db))
+            not_modified = await client.get("/scores/summary", headers={"If-None-Match": etag})
+
+        cached = await client.get("/scores/summary")
+        await client.post("/scores/bulk", json=[attempt])
+        after_write = await client.get("/scores/summary", headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert cached.headers["etag"] == etag
+    assert summary_cache.hits >= 1
+    assert after_write.status_code == 200
+    assert after_write.headers["etag"] != etag
+    assert after_write.json()["total_attempts"] == 2
+
+
+def _yield(value):
+    async def dependency():
+        yield value
+
+    return dependency
+
+
+@pytest.mark.asyncio
+async def test_trend_buckets_by_day_and_week(client, db_conn):
+    # 2026-03-02 is a Monday.
+    await _insert_attempts(
+        db_conn,
+        [
+            ("2026-03-02T08:00:00.000000+00:00", "Maths", 8, None, 4),
+            ("2026-03-02T23:59:59.999999+00:00", "Maths", 8, None, 2),
+            ("2026-03-08T12:00:00.000000+00:00", "Maths", 9, None, 0),
+            ("2026-03-09T12:00:00.000000+00:00", "Maths", 8, None, 3),
+            ("2026-03-04T12:00:00.000000+00:00", "Art", 8, None, 1),
+        ],
+    )
+
+    async with client:
+        daily = (await client.get("/scores/trend", params={"subject": "Maths"})).json()
+        weekly = (await client.get("/scores/trend", params={"bucket": "week"})).json()
+        year_8 = (
+            await client.get(
+                "/scores/trend",
+                params={"bucket": "week", "year_group": 8, "since": "2026-03-03"},
+            )
+        ).json()
+
+    assert [s["subject"] for s in daily["series"]] == ["Maths"]
+    assert [(p["period_start"], p["attempts"]) for p in daily["series"][0]["points"]] == [
+        ("2026-03-02", 2),
+        ("2026-03-08", 1),
+        ("2026-03-09", 1),
+    ]
+    assert daily["series"][0]["points"][0]["avg_accuracy"] == pytest.approx(0.75)
+
+    maths_weeks = next(s for s in weekly["series"] if s["subject"] == "Maths")["points"]
+    assert [(p["period_start"], p["attempts"]) for p in maths_weeks] == [
+        ("2026-03-02", 3),
+        ("2026-03-09", 1),
+    ]
+    assert maths_weeks[0]["avg_accuracy"] == pytest.approx(0.5)
+
+    assert {s["subject"]: [p["attempts"] for p in s["points"]] for s in year_8["series"]} == {
+        "Art": [1],
+        "Maths": [1],
+    }
+
+
+@pytest.mark.asyncio
+async def test_daily_rollup_backfills_on_upgrade(tmp_path):
+    import aiosqlite
+
+    from app.db import create_schema
+    from app.migrations import MIGRATIONS
+    from app.score_queries import trend_query
+
+    path = str(tmp_path / "v2.db")
+    async with aiosqlite.connect(path) as db:
+        # A database migrated up to the attempt indexes, with history.
+        for migration in MIGRATIONS[:2]:
+            await migration(db)
+        await db.execute("PRAGMA user_version = 2")
+        await db.executemany(
+            "INSERT INTO quiz_attempts (created_at, subject, year_group, score, total_questions)"
+            " VALUES (?, 'Maths', 8, ?, 4)",
+            [("2026-01-01T10:00:00.000000+00:00", 1), ("2026-01-01T11:00:00.000000+00:00", 3)],
+        )
+        await db.commit()
+
+        await create_schema(db)
+        rows = await (await db.execute("SELECT * FROM daily_rollup")).fetchall()
+        assert rows == [("2026-01-01", "Maths", 8, 2, 1.0)]
+
+        sql, params = trend_query("week", subject="Maths", year_group=8)
+        plan = " | ".join(
+            r[3] for r in await (await db.execute("EXPLAIN QUERY PLAN " + sql, params)).fetchall()
+        )
+        assert "idx_daily_rollup_subject_year_day" in plan
+
+
+@pytest.mark.asyncio
+async def test_export_streams_csv_and_ndjson(client, db_conn, monkeypatch):
+    import csv
+    import io
+    import json
+
+    await _insert_attempts(
+        db_conn,
+        [
+            ("2026-02-01T09:00:00.000000+00:00", "Maths", 8, "fractions, decimals", 1),
+            ("2026-02-02T09:00:00.000000+00:00", "Art", 8, None, 2),
+            ("2026-02-03T09:00:00.000000+00:00", "Maths", 9, None, 3),
+        ],
+    )
+    # Several fetchmany chunks even for a handful of rows.
+    monkeypatch.setattr("app.score_export.EXPORT_FETCH_SIZE", 1)
+
+    async with client:
+        as_csv = await client.get("/scores/export", params={"subject": "Maths"})
+        as_ndjson = await client.get(
+            "/scores/export", params={"format": "ndjson", "since": "2026-02-02"}
+        )
+
+    assert as_csv.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(as_csv.text)))
+    assert [(r["id"], r["topic"]) for r in rows] == [("1", "fractions, decimals"), ("3", "")]
+
+    lines = [json.loads(line) for line in as_ndjson.text.splitlines()]
+    assert [(r["id"], r["subject"], r["topic"]) for r in lines] == [(2, "Art", None), (3, "Maths", None)]
+
+
+def test_export_cli_writes_file(tmp_path):
+    import asyncio
+
+    import aiosqlite
+
+    from app.db import create_schema
+    from app.score_export import main
+
+    path = str(tmp_path / "scores.db")
+
+    async def seed():
+        async with aiosqlite.connect(path) as db:
+            await create_schema(db)
+            await _insert_attempts(db, [("2026-02-01T09:00:00.000000+00:00", "Maths", 8, None, 1)])
+
+    asyncio.run(seed())
+
+    out = tmp_path / "out.ndjson"
+    assert main(["--db", path, "--format", "ndjson", "--until", "2026-03-01", "-o", str(out)]) == 0
+    assert out.read_text().count("\n") == 1
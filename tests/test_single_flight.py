@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from llm_core import generation_service
+from llm_core.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight("test")
+    calls = 0
+    release = asyncio.Event()
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "lesson"
+
+    waiters = [asyncio.create_task(flight.do("key", upstream)) for _ in range(30)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert results == ["lesson"] * 30
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "collapsed": 29}
+
+
+@pytest.mark.asyncio
+async def test_all_waiters_receive_the_shared_error():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def upstream():
+        await release.wait()
+        raise RuntimeError("upstream down")
+
+    waiters = [asyncio.create_task(flight.do("key", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["calls"] == 1
+
+    # The failed call is forgotten, so the next request tries again.
+    async def recovered():
+        return "ok"
+
+    assert await flight.do("key", recovered) == "ok"
+    assert flight.stats()["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def upstream():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", upstream))
+    second = asyncio.create_task(flight.do("key", upstream))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_lesson_generation_coalesces_normalized_inputs(monkeypatch):
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_generate(year_group, subject, topic_idea):
+        calls.append(subject)
+        await release.wait()
+        return "{}"
+
+    monkeypatch.setattr(generation_service, "_generate_daily_lesson_async", fake_generate)
+
+    waiters = [
+        asyncio.create_task(generation_service.generate_daily_lesson_async(8, subject, "Circuits"))
+        for subject in ("Science", "science ", " SCIENCE")
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*waiters)
+
+    assert len(calls) == 1
@@ -0,0 +1,141 @@
+import json
+import random
+
+import pytest
+
+from app.cache_db import SqliteCacheTier
+from app.metrics import CACHE_LOOKUPS
+from services import lesson_service
+from services.cache import TTLCache
+from services.topic_index import TopicIndex, normalize_topic
+from testing.testing_data import TEST_LESSON_OUTPUT
+
+
+@pytest.mark.parametrize(
+    "topic, normalized",
+    [
+        ("Photosynthesis ", "photosynthesis"),
+        ("how does photosynthesis work?", "photosynthesis"),
+        ("What are the basics of magnets", "magnet"),
+        ("cells in plants", "cell plant"),
+        ("Batteries", "battery"),
+        ("work and energy", "energy work"),
+        ("", ""),
+    ],
+)
+def test_normalize_topic(topic, normalized):
+    assert normalize_topic(topic) == normalized
+
+
+def test_matches_near_duplicates_within_year_and_subject():
+    index = TopicIndex(threshold=0.8, enabled=True)
+    index.add("photo", 8, "Science", "photosynthesis")
+    index.add("somme", 9, "History", "Battle of the Somme 1916")
+
+    assert index.match(8, "Science", "How does photosynthesis work") == "photo"
+    assert index.match(8, " science", "Photosynthessis") == "photo"
+    assert index.match(7, "Science", "photosynthesis") is None
+    assert index.match(8, "Science", "respiration") is None
+    assert index.match(9, "History", "the battle of Somme, 1916") == "somme"
+    assert index.match(9, "History", "Battle of the Somme 1917") is None
+    assert index.stats()["exact_matches"] == 2
+    assert index.stats()["similar_matches"] == 1
+
+    # However similar the text, different numbers are different topics.
+    loose = TopicIndex(threshold=0.5, enabled=True)
+    loose.add("somme", 9, "History", "Battle of the Somme 1916")
+    assert loose.match(9, "History", "Battle of Somme 1917") is None
+    assert loose.match(9, "History", "Battle at the Somm 1916") == "somme"
+
+
+def test_discard_and_eviction():
+    index = TopicIndex(max_entries=2, enabled=True)
+    index.add("a", 8, "Science", "magnets")
+    index.add("b", 8, "Science", "circuits")
+    index.add("c", 8, "Science", "forces")
+
+    assert len(index) == 2
+    assert index.match(8, "Science", "magnet") is None
+    index.discard("b")
+    assert index.match(8, "Science", "circuit") is None
+    assert index.match(8, "Science", "force") == "c"
+
+
+def test_lookup_only_scores_a_few_candidates():
+    rng = random.Random(7)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8)) for _ in range(500)]
+    index = TopicIndex(enabled=True)
+    for i in range(2000):
+        index.add(str(i), 8, "Science", " ".join(rng.sample(words, 3)))
+
+    for _ in range(50):
+        index.match(8, "Science", " ".join(rng.sample(words, 3)))
+
+    assert index.stats()["candidates"] / index.stats()["lookups"] < 5
+
+
+@pytest.fixture
+def fake_generate(monkeypatch):
+    calls = []
+
+    async def generate(**kwargs):
+        calls.append(kwargs)
+        return TEST_LESSON_OUTPUT
+
+    monkeypatch.setattr(lesson_service, "generate_daily_lesson_async", generate)
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(lesson_service, "topic_index", TopicIndex(enabled=True))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_get_lesson_serves_similar_topic_from_cache(fake_generate):
+    similar_before = CACHE_LOOKUPS.value(cache="lesson", result="similar")
+
+    first = await lesson_service.get_lesson(8, "Science", "photosynthesis")
+    second = await lesson_service.get_lesson(8, "Science", "How does photosynthesis work?")
+    await lesson_service.get_lesson(8, "Science", "food chains")
+
+    assert first == second == json.loads(TEST_LESSON_OUTPUT)
+    assert [call["topic_idea"] for call in fake_generate] == ["photosynthesis", "food chains"]
+    assert CACHE_LOOKUPS.value(cache="lesson", result="similar") == similar_before + 1
+
+
+@pytest.mark.asyncio
+async def test_topics_are_reloaded_from_the_store(fake_generate, monkeypatch, tmp_path):
+    path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(lesson_service, "lesson_store", SqliteCacheTier(path, "lesson_cache", 60))
+    monkeypatch.setattr(lesson_service, "topic_store", SqliteCacheTier(path, "lesson_topics", 60))
+    await lesson_service.init_cache_stores()
+    await lesson_service.get_lesson(8, "Science", "magnets")
+
+    # A restart: empty memory cache and index, rebuilt from the store.
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(lesson_service, "topic_index", TopicIndex(enabled=True))
+    await lesson_service.init_cache_stores()
+    lesson = await lesson_service.get_lesson(8, "Science", "Magnet")
+
+    assert lesson == json.loads(TEST_LESSON_OUTPUT)
+    assert len(fake_generate) == 1
+    await lesson_service.close_cache_stores()
+
+
+@pytest.mark.asyncio
+async def test_edited_prompt_is_not_served_old_lessons(fake_generate, monkeypatch, tmp_path):
+    path = str(tmp_path / "cache.db")
+    monkeypatch.setattr(lesson_service, "lesson_store", SqliteCacheTier(path, "lesson_cache", 60))
+    monkeypatch.setattr(lesson_service, "topic_store", SqliteCacheTier(path, "lesson_topics", 60))
+    await lesson_service.init_cache_stores()
+    await lesson_service.get_lesson(8, "Science", "magnets")
+
+    # A restart after the lesson template changed.
+    monkeypatch.setattr(lesson_service, "LESSON_PROMPT_VERSION", "edited")
+    monkeypatch.setattr(lesson_service, "lesson_cache", TTLCache(max_entries=8))
+    monkeypatch.setattr(lesson_service, "topic_index", TopicIndex(enabled=True))
+    await lesson_service.init_cache_stores()
+    await lesson_service.get_lesson(8, "Science", "magnets")
+    await lesson_service.get_lesson(8, "Science", "Magnet")
+
+    assert len(lesson_service.topic_index) == 1
+    assert len(fake_generate) == 2
+    await lesson_service.close_cache_stores()
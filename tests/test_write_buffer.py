@@ -0,0 +1,141 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from app.score_queries import INSERT_ATTEMPT_SQL
+from app.write_buffer import GroupCommitBuffer
+
+
+def _row(i: int) -> tuple:
+    return ("2026-01-01T00:00:00.000000+00:00", "Maths", 8, None, i % 4, 4)
+
+
+def _writer_for(db_conn, entered: list):
+    @asynccontextmanager
+    async def writer():
+        entered.append(1)
+        yield db_conn
+
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_share_commits(db_conn):
+    entered = []
+    buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, flush_interval=0.02, max_rows=16)
+    buffer.start(_writer_for(db_conn, entered))
+    try:
+        ids = await asyncio.gather(*(buffer.submit(_row(i)) for i in range(50)))
+    finally:
+        await buffer.stop()
+
+    assert sorted(ids) == list(range(1, 51))
+    # Batches are capped at max_rows, and far fewer than one commit per row.
+    assert 4 <= buffer.flushes == len(entered) < 50
+    (count,) = await (await db_conn.execute("SELECT COUNT(*) FROM quiz_attempts")).fetchone()
+    assert count == 50
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_queued_rows(db_conn):
+    buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, flush_interval=10, max_rows=1000)
+    buffer.start(_writer_for(db_conn, []))
+    pending = [asyncio.create_task(buffer.submit(_row(i))) for i in range(5)]
+    await asyncio.sleep(0)
+
+    # The flush interval is far away; stopping must not wait for it.
+    await asyncio.wait_for(buffer.stop(), timeout=1)
+
+    assert [t.result() for t in pending] == [1, 2, 3, 4, 5]
+    assert not buffer.running
+    with pytest.raises(RuntimeError):
+        await buffer.submit(_row(0))
+
+
+class _MemoryDB:
+    """Just enough of a connection for executemany_returning_ids, with no thread."""
+
+    def __init__(self):
+        self.rows = 0
+
+    async def executemany(self, sql, rows):
+        self.rows += len(rows)
+
+    async def execute(self, sql):
+        rows = self.rows
+
+        class Cursor:
+            async def fetchone(self):
+                return (rows,)
+
+        return Cursor()
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_stop_with_a_full_queue_and_blocked_submitters():
+    db, release = _MemoryDB(), asyncio.Event()
+
+    @asynccontextmanager
+    async def slow_writer():
+        await release.wait()
+        yield db
+
+    buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, flush_interval=0, max_rows=1, max_queue=1)
+    buffer.start(slow_writer)
+    pending = [asyncio.create_task(buffer.submit(_row(i))) for i in range(6)]
+    await asyncio.sleep(0)  # the flusher holds one row; the rest fill the queue or wait on it
+
+    release.set()
+    stopping = asyncio.create_task(buffer.stop())
+    await asyncio.sleep(0)
+    with pytest.raises(RuntimeError):
+        await buffer.submit(_row(0))
+    await asyncio.wait_for(stopping, timeout=1)
+
+    done, _ = await asyncio.wait(pending, timeout=1)
+    assert sorted(t.result() for t in done) == list(range(1, 7))
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_reported_to_every_caller(db_conn):
+    buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, flush_interval=0.01)
+    buffer.start(_writer_for(db_conn, []))
+    try:
+        results = await asyncio.gather(
+            buffer.submit(_row(1)), buffer.submit(("bad",)), return_exceptions=True
+        )
+    finally:
+        await buffer.stop()
+
+    assert all(isinstance(r, Exception) for r in results)
+    assert buffer.failed_flushes == 1
+
+
+@pytest.mark.asyncio
+async def test_create_score_uses_buffer_when_running(app, db_conn, monkeypatch):
+    buffer = GroupCommitBuffer(INSERT_ATTEMPT_SQL, flush_interval=0.01)
+    monkeypatch.setattr("app.routers.scores.score_buffer", buffer)
+    buffer.start(_writer_for(db_conn, []))
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post(
+                        "/scores",
+                        json={"subject": "Art", "year_group": 7, "score": 1, "total_questions": 2},
+                    )
+                    for _ in range(10)
+                )
+            )
+    finally:
+        await buffer.stop()
+
+    assert sorted(r.json()["id"] for r in responses) == list(range(1, 11))
+    assert buffer.rows == 10